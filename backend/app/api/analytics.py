@@ -1,79 +1,81 @@
-﻿from fastapi import APIRouter, Depends, HTTPException
+﻿from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from .. import crud
-from .deps import get_db_dep, get_current_user
+from ..db import matviews
+from ..core.cache import analytics_cache
+from .deps import get_async_db_dep, get_business_access
 import logging
 
 router = APIRouter()
 
 
-@router.get('/summary/{business_id}')
-def summary(business_id: int, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
-    role = crud.get_user_business_role(db, current_user.id, business_id)
-    if role is None:
-        if not crud.get_business(db, business_id):
-            raise HTTPException(status_code=404, detail='Business not found')
-        raise HTTPException(status_code=403, detail='Not authorized')
-    # staff are not allowed to access financial summaries
-    if role == 'staff':
-        raise HTTPException(status_code=403, detail='Not authorized')
-    # Compute canonical financial totals using explicit sources:
-    # - Revenue: sum of Income transactions
-    # - Operating Expenses: sum of Expense transactions
-    # - COGS: sum of cost_amount from ml_transactions view
-    try:
-        # Revenue (Income transactions) - use COALESCE in SQL to ensure numeric 0 when no rows
-        rev_row = db.execute(text("SELECT COALESCE(SUM(amount),0) AS revenue FROM transactions WHERE business_id = :bid AND type = 'Income'"), {'bid': business_id}).fetchone()
-        total_income = float(rev_row._mapping['revenue'] if hasattr(rev_row, '_mapping') else (rev_row[0] if rev_row and len(rev_row) > 0 else 0.0))
+def _cached(db: Session, endpoint: str, business_id: int, role: str, compute):
+    """Serve `compute()` through the analytics cache.
+
+    The key carries the business data version, which every transaction and
+    inventory write bumps, so a cached result never outlives its data. Call
+    only after the role checks so unauthorized requests never reach it.
 
-        # Operating expenses (Expense transactions)
-        exp_row = db.execute(text("SELECT COALESCE(SUM(amount),0) AS expenses FROM transactions WHERE business_id = :bid AND type = 'Expense'"), {'bid': business_id}).fetchone()
-        total_expense = float(exp_row._mapping['expenses'] if hasattr(exp_row, '_mapping') else (exp_row[0] if exp_row and len(exp_row) > 0 else 0.0))
+    Like the *_payload helpers below it takes a sync Session; async routes
+    call those through `AsyncSession.run_sync`.
+    """
+    if not analytics_cache.enabled:
+        return compute()
+    key = (endpoint, business_id, role, crud.get_data_version(db, business_id))
+    return analytics_cache.get_or_compute(key, compute)
+
+
+def summary_payload(db: Session, business_id: int, role: str):
+    """Canonical financial totals served by `/summary` (cached)."""
+    def compute():
+        totals = crud.daily_totals(db, business_id)
+        total_income = totals['income']
+        total_expense = totals['operating_expense']
+        cogs = totals['cogs']
         # Log a warning if there are no expense transactions for this business
-        cnt_row = db.execute(text("SELECT COUNT(*) AS cnt FROM transactions WHERE business_id = :bid AND type = 'Expense'"), {'bid': business_id}).fetchone()
-        expense_count = int(cnt_row._mapping['cnt'] if hasattr(cnt_row, '_mapping') else (cnt_row[0] if cnt_row and len(cnt_row) > 0 else 0))
-        if expense_count == 0:
+        if totals['expense_count'] == 0:
             logging.getLogger(__name__).warning('No expense transactions found for business_id=%s; treating expenses as 0', business_id)
 
-        # COGS from ml_transactions view
-        cogs_row = db.execute(text("SELECT COALESCE(SUM(cost_amount),0) AS cogs FROM ml_transactions WHERE business_id = :bid"), {'bid': business_id}).fetchone()
-        cogs = float(cogs_row._mapping['cogs'] if hasattr(cogs_row, '_mapping') else (cogs_row[0] if cogs_row and len(cogs_row) > 0 else 0.0))
-
         # Safe profit calculation: ensure numeric operands
         profit = (total_income or 0.0) - (cogs or 0.0) - (total_expense or 0.0)
         # For display, show total expense as operating_expense + cogs
         display_expense = (total_expense or 0.0) + (cogs or 0.0)
-        # Temporary debug print for troubleshooting (can be removed later)
-        print({
-            'total_income': total_income,
-            'operating_expense': total_expense,
-            'cogs': cogs,
-            'display_expense': display_expense,
-            'profit': profit,
-        })
         logging.getLogger(__name__).info('analytics.summary values: %s', {'total_income': total_income, 'operating_expense': total_expense, 'cogs': cogs, 'display_expense': display_expense, 'profit': profit})
         return {'total_income': total_income, 'total_expense': display_expense, 'operating_expense': total_expense, 'cogs': cogs, 'profit': profit}
+
+    return _cached(db, 'summary', business_id, role, compute)
+
+
+@router.get('/summary/{business_id}')
+async def summary(business_id: int, db: AsyncSession = Depends(get_async_db_dep), access=Depends(get_business_access)):
+    role = access.role
+    # staff are not allowed to access financial summaries
+    if role == 'staff':
+        raise HTTPException(status_code=403, detail='Not authorized')
+    # Compute canonical financial totals from the daily rollup:
+    # - Revenue: sum of Income transactions
+    # - Operating Expenses: sum of Expense transactions
+    # - COGS: used_quantity * inventory cost for inventory-linked sales
+    try:
+        return await db.run_sync(summary_payload, business_id, role)
     except Exception:
         logging.exception('Error fetching analytics summary for business_id=%s', business_id)
         raise HTTPException(status_code=500, detail='Internal server error while fetching analytics summary')
 
 
 @router.get('/charts/{business_id}')
-def charts(business_id: int, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
-    role = crud.get_user_business_role(db, current_user.id, business_id)
-    if role is None:
-        if not crud.get_business(db, business_id):
-            raise HTTPException(status_code=404, detail='Business not found')
-        raise HTTPException(status_code=403, detail='Not authorized')
+async def charts(business_id: int, db: AsyncSession = Depends(get_async_db_dep), access=Depends(get_business_access)):
+    role = access.role
     # staff are not allowed to access operational/financial charts
     if role == 'staff':
         raise HTTPException(status_code=403, detail='Not authorized')
     logger = logging.getLogger(__name__)
     try:
-        income_vs_expense = crud.charts_income_expense_by_date(db, business_id)
-        top_selling = crud.top_selling_items(db, business_id)
-        category_sales = crud.category_sales(db, business_id)
+        income_vs_expense = await db.run_sync(crud.charts_income_expense_by_date, business_id)
+        top_selling = await db.run_sync(crud.top_selling_items, business_id)
+        category_sales = await db.run_sync(crud.category_sales, business_id)
         # Accountants may see aggregated category sales but must NOT receive item-level top_selling
         if role == 'accountant':
             return {'income_vs_expense': income_vs_expense, 'category_sales': category_sales}
@@ -84,18 +86,14 @@ def charts(business_id: int, db: Session = Depends(get_db_dep), current_user=Dep
 
 
 @router.get('/weekly/{business_id}')
-def weekly(business_id: int, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
+async def weekly(business_id: int, db: AsyncSession = Depends(get_async_db_dep), access=Depends(get_business_access)):
     # ensure access via business-specific role
-    role = crud.get_user_business_role(db, current_user.id, business_id)
-    if role is None:
-        if not crud.get_business(db, business_id):
-            raise HTTPException(status_code=404, detail='Business not found')
-        raise HTTPException(status_code=403, detail='Not authorized')
+    role = access.role
     # staff are not allowed to access historical analytics
     if role == 'staff':
         raise HTTPException(status_code=403, detail='Not authorized')
     # produce chart-ready structure: { labels: [...], income: [...], expense: [...] }
-    raw = crud.analytics_weekly(db, business_id)
+    raw = await db.run_sync(crud.analytics_weekly, business_id)
     labels = []
     income = []
     expense = []
@@ -118,69 +116,48 @@ def weekly(business_id: int, db: Session = Depends(get_db_dep), current_user=Dep
     return {'labels': labels, 'income': income, 'expense': expense}
 
 
+def monthly_payload(db: Session, business_id: int, role: str):
+    """Per-month income, operating expense, COGS and profit (cached)."""
+    def compute():
+        # Monthly revenue, COGS and operating expenses from the daily rollup
+        out = []
+        for row in crud.daily_totals(db, business_id, group_by='month'):
+            sales = row['income']
+            cogs = row['cogs']
+            expenses = row['operating_expense']
+            profit = sales - cogs - expenses
+            out.append({'month': row['month'], 'income': float(sales), 'expense': float(expenses), 'cogs': float(cogs), 'profit': float(profit)})
+        return out
+
+    return _cached(db, 'monthly', business_id, role, compute)
+
+
 @router.get('/monthly/{business_id}')
-def monthly(business_id: int, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
-    role = crud.get_user_business_role(db, current_user.id, business_id)
-    if role is None:
-        if not crud.get_business(db, business_id):
-            raise HTTPException(status_code=404, detail='Business not found')
-        raise HTTPException(status_code=403, detail='Not authorized')
+async def monthly(business_id: int, db: AsyncSession = Depends(get_async_db_dep), access=Depends(get_business_access)):
+    role = access.role
     if role == 'staff':
         raise HTTPException(status_code=403, detail='Not authorized')
     logger = logging.getLogger(__name__)
     try:
-        # Get monthly sales & cogs from analytics_monthly view (sales, cost)
-        sql_sales = text("SELECT month, sales, cost FROM analytics_monthly WHERE business_id = :bid ORDER BY month ASC")
-        sales_rows = db.execute(sql_sales, {'bid': business_id}).fetchall()
-        sales_map = {}
-        for row in sales_rows:
-            mapping = row._mapping if hasattr(row, '_mapping') else dict(row)
-            mon = mapping.get('month')
-            if mon is not None and not isinstance(mon, str):
-                try:
-                    mon = str(mon)
-                except Exception:
-                    mon = mapping.get('month')
-            sales_map[mon] = {'sales': float(mapping.get('sales') or 0.0), 'cogs': float(mapping.get('cost') or 0.0)}
-
-        # Get operating expenses grouped by month from transactions table
-        sql_exp = text("SELECT to_char(date_trunc('month', created_at),'YYYY-MM') AS month, COALESCE(SUM(amount),0) AS expenses FROM transactions WHERE business_id = :bid AND type = 'Expense' GROUP BY month ORDER BY month ASC")
-        exp_rows = db.execute(sql_exp, {'bid': business_id}).fetchall()
-        exp_map = {}
-        for row in exp_rows:
-            mapping = row._mapping if hasattr(row, '_mapping') else dict(row)
-            mon = mapping.get('month')
-            exp_map[mon] = float(mapping.get('expenses') or mapping.get('1') or 0.0)
-
-        months = sorted(set(list(sales_map.keys()) + list(exp_map.keys())))
-        out = []
-        for mon in months:
-            sales = sales_map.get(mon, {}).get('sales', 0.0)
-            cogs = sales_map.get(mon, {}).get('cogs', 0.0)
-            expenses = exp_map.get(mon, 0.0)
-            profit = sales - cogs - expenses
-            out.append({'month': mon, 'income': float(sales), 'expense': float(expenses), 'cogs': float(cogs), 'profit': float(profit)})
-        return out
+        return await db.run_sync(monthly_payload, business_id, role)
     except Exception:
         logger.exception('Error fetching monthly analytics for business_id=%s', business_id)
         raise HTTPException(status_code=500, detail='Internal server error while fetching monthly analytics')
 
 
 @router.get('/top-items/{business_id}')
-def top_items(business_id: int, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
+async def top_items(business_id: int, response: Response, db: AsyncSession = Depends(get_async_db_dep), access=Depends(get_business_access)):
     # ensure access via business-specific role
-    role = crud.get_user_business_role(db, current_user.id, business_id)
-    if role is None:
-        if not crud.get_business(db, business_id):
-            raise HTTPException(status_code=404, detail='Business not found')
-        raise HTTPException(status_code=403, detail='Not authorized')
+    role = access.role
     # Only owners may receive item-level top items (sensitive)
     if role != 'owner':
         raise HTTPException(status_code=403, detail='Only owner may view top items')
     logger = logging.getLogger(__name__)
     try:
-        sql = text("SELECT * FROM analytics_top_items WHERE business_id = :bid")
-        rows = db.execute(sql, {'bid': business_id}).fetchall()
+        # analytics_top_items is a materialized view indexed on (business_id, total_quantity)
+        sql = text("SELECT * FROM analytics_top_items WHERE business_id = :bid ORDER BY total_quantity DESC")
+        rows = (await db.execute(sql, {'bid': business_id})).fetchall()
+        response.headers.update(await db.run_sync(matviews.refreshed_at_header, 'analytics_top_items'))
         out = []
         for row in rows:
             mapping = row._mapping if hasattr(row, '_mapping') else dict(row)
@@ -198,102 +175,89 @@ def top_items(business_id: int, db: Session = Depends(get_db_dep), current_user=
 
 
 
+def categories_payload(db: Session, business_id: int, role: str):
+    return _cached(db, 'categories', business_id, role, lambda: crud.categories_by_business(db, business_id))
+
+
+def expense_categories_payload(db: Session, business_id: int, role: str):
+    return _cached(db, 'expense_categories', business_id, role, lambda: crud.expense_categories_by_business(db, business_id))
+
+
 @router.get('/categories/{business_id}')
-def categories(business_id: int, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
-    role = crud.get_user_business_role(db, current_user.id, business_id)
-    if role is None:
-        if not crud.get_business(db, business_id):
-            raise HTTPException(status_code=404, detail='Business not found')
-        raise HTTPException(status_code=403, detail='Not authorized')
+async def categories(business_id: int, db: AsyncSession = Depends(get_async_db_dep), access=Depends(get_business_access)):
+    role = access.role
     # both owner and accountant can view aggregated category sales
     if role == 'staff':
         raise HTTPException(status_code=403, detail='Not authorized')
-    return crud.categories_by_business(db, business_id)
+    return await db.run_sync(categories_payload, business_id, role)
 
 
 @router.get('/expense_categories/{business_id}')
-def expense_categories(business_id: int, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
-    role = crud.get_user_business_role(db, current_user.id, business_id)
-    if role is None:
-        if not crud.get_business(db, business_id):
-            raise HTTPException(status_code=404, detail='Business not found')
-        raise HTTPException(status_code=403, detail='Not authorized')
+async def expense_categories(business_id: int, db: AsyncSession = Depends(get_async_db_dep), access=Depends(get_business_access)):
+    role = access.role
     # both owner and accountant can view expense category breakdown
     if role == 'staff':
         raise HTTPException(status_code=403, detail='Not authorized')
     try:
-        return crud.expense_categories_by_business(db, business_id)
+        return await db.run_sync(expense_categories_payload, business_id, role)
     except Exception:
         logging.getLogger(__name__).exception('Error fetching expense categories for business_id=%s', business_id)
         raise HTTPException(status_code=500, detail='Internal server error while fetching expense categories')
 
 
+def profit_payload(db: Session, business_id: int, role: str):
+    """Owner profit totals served by `/profit` (cached)."""
+    def compute():
+        # Revenue, operating expenses and COGS from the daily rollup
+        totals = crud.daily_totals(db, business_id)
+        income = totals['income']
+        expense = totals['operating_expense']
+        cogs = totals['cogs']
+        return {'total_income': income, 'total_expense': expense, 'cogs': cogs, 'profit': income - cogs - expense}
+
+    return _cached(db, 'profit', business_id, role, compute)
+
+
 @router.get('/profit/{business_id}')
-def profit_trend(business_id: int, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
+async def profit_trend(business_id: int, db: AsyncSession = Depends(get_async_db_dep), access=Depends(get_business_access)):
     # only owner can request profit trend
-    role = crud.get_user_business_role(db, current_user.id, business_id)
-    if role is None:
-        if not crud.get_business(db, business_id):
-            raise HTTPException(status_code=404, detail='Business not found')
-        raise HTTPException(status_code=403, detail='Not authorized')
+    role = access.role
     if role != 'owner':
         raise HTTPException(status_code=403, detail='Only owner may view profit trend')
     # Provide aggregate totals as a safe, numeric response for owners.
     logger = logging.getLogger(__name__)
     try:
-        # Revenue from Income transactions
-        rev_row = db.execute(text("SELECT COALESCE(SUM(amount),0) AS revenue FROM transactions WHERE business_id = :bid AND type = 'Income'"), {'bid': business_id}).fetchone()
-        income = float(rev_row._mapping['revenue'] if hasattr(rev_row, '_mapping') else (rev_row[0] if rev_row and len(rev_row) > 0 else 0.0))
-        # Operating expenses from Expense transactions
-        exp_row = db.execute(text("SELECT COALESCE(SUM(amount),0) AS expenses FROM transactions WHERE business_id = :bid AND type = 'Expense'"), {'bid': business_id}).fetchone()
-        expense = float(exp_row._mapping['expenses'] if hasattr(exp_row, '_mapping') else (exp_row[0] if exp_row and len(exp_row) > 0 else 0.0))
-        # COGS from ml_transactions
-        cogs_row = db.execute(text("SELECT COALESCE(SUM(cost_amount),0) AS cogs FROM ml_transactions WHERE business_id = :bid"), {'bid': business_id}).fetchone()
-        cogs = float(cogs_row._mapping['cogs'] if hasattr(cogs_row, '_mapping') else (cogs_row[0] if cogs_row and len(cogs_row) > 0 else 0.0))
-        return {'total_income': income, 'total_expense': expense, 'cogs': cogs, 'profit': income - cogs - expense}
+        return await db.run_sync(profit_payload, business_id, role)
     except Exception:
         logger.exception('Error computing profit totals for business_id=%s', business_id)
         raise HTTPException(status_code=500, detail='Internal server error while computing profit')
 
 
+def profit_trend_payload(db: Session, business_id: int, role: str):
+    """Per-month profit series for plotting (cached)."""
+    def compute():
+        # Build profit series from the daily rollup using revenue (income),
+        # cogs and operating expenses per month.
+        out = []
+        for row in crud.daily_totals(db, business_id, group_by='month'):
+            profit = row['income'] - row['cogs'] - row['operating_expense']
+            out.append({'month': row['month'], 'profit': float(profit)})
+        return out
+
+    return _cached(db, 'profit_trend', business_id, role, compute)
+
+
 @router.get('/profit_trend/{business_id}')
-def profit_trend_series(business_id: int, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
+async def profit_trend_series(business_id: int, db: AsyncSession = Depends(get_async_db_dep), access=Depends(get_business_access)):
     # Return per-month profit series for plotting; kept separate to avoid
     # changing the totals contract used by other integrations.
+    role = access.role
+    if role != 'owner':
+        raise HTTPException(status_code=403, detail='Only owner may view profit trend')
     logger = logging.getLogger(__name__)
-    try:
-        # Build profit series using:
-        # revenue (income transactions per month), cogs (ml_transactions cost_amount per month),
-        # and operating expenses (transactions type Expense per month).
-        # Query ml_transactions for monthly sales/cost
-        sql_ml = text("SELECT month, COALESCE(SUM(sales_amount),0) AS sales, COALESCE(SUM(cost_amount),0) AS cost FROM ml_transactions WHERE business_id = :bid GROUP BY month ORDER BY month ASC")
-        ml_rows = db.execute(sql_ml, {'bid': business_id}).fetchall()
-        # Build a mapping month -> {sales, cost}
-        ml_map = {}
-        for row in ml_rows:
-            mapping = row._mapping if hasattr(row, '_mapping') else dict(row)
-            mon = mapping.get('month') or mapping.get(0)
-            ml_map[mon] = {'sales': float(mapping.get('sales') or 0.0), 'cost': float(mapping.get('cost') or 0.0)}
-
-        # Query expenses grouped by month from transactions (operating expenses)
-        sql_exp = text("SELECT to_char(date_trunc('month', created_at),'YYYY-MM') AS month, COALESCE(SUM(amount),0) AS expenses FROM transactions WHERE business_id = :bid AND type = 'Expense' GROUP BY month ORDER BY month ASC")
-        exp_rows = db.execute(sql_exp, {'bid': business_id}).fetchall()
-        exp_map = {}
-        for row in exp_rows:
-            mapping = row._mapping if hasattr(row, '_mapping') else dict(row)
-            mon = mapping.get('month') or mapping.get(0)
-            exp_map[mon] = float(mapping.get('expenses') or mapping.get('1') or 0.0)
 
-        # Merge months present in either source
-        months = sorted(set(list(ml_map.keys()) + list(exp_map.keys())))
-        out = []
-        for mon in months:
-            revenue = ml_map.get(mon, {}).get('sales', 0.0)
-            cogs = ml_map.get(mon, {}).get('cost', 0.0)
-            expenses = exp_map.get(mon, 0.0)
-            profit = revenue - cogs - expenses
-            out.append({'month': mon, 'profit': float(profit)})
-        return out
+    try:
+        return await db.run_sync(profit_trend_payload, business_id, role)
     except Exception:
         logger.exception('Error computing profit trend for business_id=%s', business_id)
         raise HTTPException(status_code=500, detail='Internal server error while computing profit trend')
@@ -62,9 +62,9 @@ def login(form_data: schemas.UserCreate, db: Session = Depends(get_db_dep)):
     return {'access_token': token, 'token_type': 'bearer'}
 
 
-from .deps import get_current_user
+from .deps import get_current_user_sync
 
 
 @router.get('/me', response_model=schemas.UserOut)
-def me(current_user=Depends(get_current_user)):
+def me(current_user=Depends(get_current_user_sync)):
     return current_user
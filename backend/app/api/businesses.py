@@ -1,40 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import logging
+from anyio import to_thread
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from .. import schemas, crud
-from .deps import get_db_dep, get_current_user
+from ..core.config import settings
+from ..db import matviews
+from . import analytics, ml
+from .deps import get_db_dep, get_async_db_dep, get_current_user_sync, get_business_access, get_business_access_sync
 
 router = APIRouter()
 
 
 @router.post('', response_model=schemas.BusinessOut)
-def create_business(b_in: schemas.BusinessCreate, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
+def create_business(b_in: schemas.BusinessCreate, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user_sync)):
     return crud.create_business(db, current_user.id, b_in.name, b_in.industry)
 
 
 @router.get('', response_model=list[schemas.BusinessWithRole])
-def list_businesses(db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
-    # return businesses the user owns or is a member of, including role for current user
-    bs = crud.list_businesses_for_user(db, current_user.id)
-    out = []
-    for b in bs:
-        role = crud.get_user_business_role(db, current_user.id, b.id)
-        out.append({
-            'id': b.id,
-            'owner_id': b.owner_id,
-            'name': b.name,
-            'industry': b.industry,
-            'created_at': b.created_at,
-            'role': role
-        })
-    return out
+def list_businesses(db: Session = Depends(get_db_dep), current_user=Depends(get_current_user_sync)):
+    # return businesses the user owns or is a member of, including role for
+    # current user (one joined query; rows already carry the role)
+    return crud.list_businesses_for_user(db, current_user.id)
 
 
 @router.post('/{business_id}/members', response_model=schemas.MemberOut)
-def add_member(business_id: int, m_in: schemas.MemberAdd, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
+def add_member(business_id: int, m_in: schemas.MemberAdd, db: Session = Depends(get_db_dep), access=Depends(get_business_access_sync)):
     # only owner of business can add members
-    from ..models import Business
-    biz = crud.get_business(db, business_id)
-    if not biz or biz.owner_id != current_user.id:
+    if access.role != 'owner':
         raise HTTPException(status_code=403, detail='Not authorized')
 
     # find user by username
@@ -62,27 +56,17 @@ def add_member(business_id: int, m_in: schemas.MemberAdd, db: Session = Depends(
 
 
 @router.get('/{business_id}/members', response_model=list[schemas.MemberOut])
-def list_members_route(business_id: int, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
+def list_members_route(business_id: int, db: Session = Depends(get_db_dep), access=Depends(get_business_access_sync)):
     # only owner can view members
-    biz = crud.get_business(db, business_id)
-    if not biz:
-        raise HTTPException(status_code=404, detail='Business not found')
-    if biz.owner_id != current_user.id:
+    if access.role != 'owner':
         raise HTTPException(status_code=403, detail='Not authorized')
-    ms = crud.list_members(db, business_id)
-    # enrich with username
-    out = []
-    for m in ms:
-        out.append({'id': m.id, 'business_id': m.business_id, 'user_id': m.user_id, 'role': m.role, 'username': getattr(m.user, 'username', None)})
-    return out
+    # usernames are joined in by the same query
+    return crud.list_members(db, business_id)
 
 
 @router.delete('/{business_id}/members/{user_id}')
-def delete_member_route(business_id: int, user_id: int, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
-    biz = crud.get_business(db, business_id)
-    if not biz:
-        raise HTTPException(status_code=404, detail='Business not found')
-    if biz.owner_id != current_user.id:
+def delete_member_route(business_id: int, user_id: int, db: Session = Depends(get_db_dep), access=Depends(get_business_access_sync)):
+    if access.role != 'owner':
         raise HTTPException(status_code=403, detail='Not authorized')
     ok = crud.delete_member(db, business_id, user_id)
     if not ok:
@@ -91,17 +75,16 @@ def delete_member_route(business_id: int, user_id: int, db: Session = Depends(ge
 
 
 @router.get('/{business_id}/dashboard', response_model=schemas.DashboardOut)
-def dashboard(business_id: int, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
-    # determine role relative to business
-    role = crud.get_user_business_role(db, current_user.id, business_id)
-    if role is None:
-        # distinguish not found vs forbidden
-        if not crud.get_business(db, business_id):
-            raise HTTPException(status_code=404, detail='Business not found')
-        raise HTTPException(status_code=403, detail='Not authorized')
-    biz = crud.get_business(db, business_id)
-    summary = crud.summary_for_business(db, business_id)
-    tx_count = crud.transactions_count_for_business(db, business_id)
+async def dashboard(business_id: int, db: AsyncSession = Depends(get_async_db_dep), access=Depends(get_business_access)):
+    # access carries both the business and the role relative to it
+    return await db.run_sync(dashboard_payload, access, access.role)
+
+
+def dashboard_payload(db: Session, biz, role: str):
+    """Role-filtered headline figures for the `/dashboard` card."""
+    totals = crud.daily_totals(db, biz.id)
+    summary = {'income': totals['income'], 'expense': totals['operating_expense']}
+    tx_count = totals['count']
 
     if role == 'owner':
         return {
@@ -126,3 +109,81 @@ def dashboard(business_id: int, db: Session = Depends(get_db_dep), current_user=
             'business_name': biz.name,
             'role': role
         }
+
+
+def _low_stock_payload(db: Session, business_id: int, threshold: int):
+    items = crud.list_low_stock_for_business(db, business_id, threshold)
+    return [schemas.InventoryOut.model_validate(i).model_dump() for i in items]
+
+
+# section name -> (roles allowed, builder(db, biz, role, threshold), offload);
+# the shapes match the standalone endpoints the dashboard used to call.
+# Offloaded sections do CPU-bound work (pandas, joblib, sklearn) and run on a
+# worker thread with a sync session; the rest are plain queries and run via
+# AsyncSession.run_sync.
+_BUNDLE_SECTIONS = {
+    'dashboard': ({'owner', 'accountant', 'staff'}, lambda db, biz, role, th: dashboard_payload(db, biz, role), False),
+    'summary': ({'owner', 'accountant'}, lambda db, biz, role, th: analytics.summary_payload(db, biz.id, role), False),
+    'monthly': ({'owner', 'accountant'}, lambda db, biz, role, th: analytics.monthly_payload(db, biz.id, role), False),
+    'profit_trend': ({'owner'}, lambda db, biz, role, th: analytics.profit_trend_payload(db, biz.id, role), False),
+    'categories': ({'owner', 'accountant'}, lambda db, biz, role, th: analytics.categories_payload(db, biz.id, role), False),
+    'expense_categories': ({'owner', 'accountant'}, lambda db, biz, role, th: analytics.expense_categories_payload(db, biz.id, role), False),
+    'low_stock': ({'owner', 'accountant', 'staff'}, lambda db, biz, role, th: _low_stock_payload(db, biz.id, th), False),
+    'predict_profit': ({'owner'}, lambda db, biz, role, th: ml.predict_profit_payload(db, biz.id), True),
+}
+
+
+def _build_in_thread(build, biz, role, threshold):
+    from ..db.session import SessionLocal
+    db = SessionLocal()
+    try:
+        return build(db, biz, role, threshold)
+    finally:
+        db.close()
+
+
+async def _run_section(bind, name, build, offload, biz, role, threshold):
+    # Sessions are not safe for concurrent use: every section gets its own.
+    # A failing section is reported instead of failing the whole bundle.
+    try:
+        if offload:
+            # keep the event loop free while the section computes
+            value = await to_thread.run_sync(_build_in_thread, build, biz, role, threshold)
+        else:
+            async with AsyncSession(bind=bind, autoflush=False, expire_on_commit=False) as db:
+                value = await db.run_sync(build, biz, role, threshold)
+        return name, value, None
+    except HTTPException as e:
+        return name, None, {'status_code': e.status_code, 'detail': e.detail}
+    except Exception:
+        logging.getLogger(__name__).exception('dashboard-bundle section %s failed for business_id=%s', name, biz.id)
+        return name, None, {'status_code': 500, 'detail': 'Internal server error'}
+
+
+@router.get('/{business_id}/dashboard-bundle')
+async def dashboard_bundle(business_id: int, response: Response, threshold: int | None = None, db: AsyncSession = Depends(get_async_db_dep), access=Depends(get_business_access)):
+    """Everything the dashboard page needs in one round trip.
+
+    Auth and role are resolved once; the sections the role may see are then
+    built concurrently, each on its own session and connection. Query-only
+    sections run on the event loop; the model prediction runs on a worker
+    thread so it neither blocks other requests nor serializes the bundle.
+    A failing section (e.g. no trained model yet) is reported under
+    `errors` instead of failing the whole bundle.
+    """
+    biz, role = access, access.role
+    th = int(threshold) if threshold is not None else getattr(settings, 'LOW_STOCK_THRESHOLD', 5)
+
+    results = await asyncio.gather(*(
+        _run_section(db.bind, name, build, offload, biz, role, th)
+        for name, (roles, build, offload) in _BUNDLE_SECTIONS.items() if role in roles
+    ))
+    out = {'business_id': business_id, 'role': role, 'errors': {}}
+    for name, value, error in results:
+        if error is not None:
+            out['errors'][name] = error
+        else:
+            out[name] = value
+    if 'predict_profit' in out:
+        response.headers.update(await db.run_sync(matviews.refreshed_at_header, 'analytics_monthly'))
+    return out
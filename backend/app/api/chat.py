@@ -1,24 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from .deps import get_db_dep, get_current_user
-from .. import crud
+from .deps import get_business_access_sync
 
 router = APIRouter()
 
 
 @router.post('/query')
-def chat_query(business_id: int, question: str, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
+def chat_query(business_id: int, question: str, access=Depends(get_business_access_sync)):
     """Simple role-restricted chatbot query endpoint.
 
     This endpoint enforces strict role-based access: owners may ask any
     question; accountants may ask financial questions (but not ML predictions);
     staff may ask operational/inventory availability questions only.
     """
-    role = crud.get_user_business_role(db, current_user.id, business_id)
-    if role is None:
-        if not crud.get_business(db, business_id):
-            raise HTTPException(status_code=404, detail='Business not found')
-        raise HTTPException(status_code=403, detail='Not authorized')
+    role = access.role
 
     q = (question or '').strip().lower()
     # classify question intent using simple keyword heuristics
@@ -0,0 +1,56 @@
+"""Cache, auth and pool internals for local debugging.
+
+Mounted under `/diagnostics` only when `DIAGNOSTICS_ENABLED` is true; the
+responses are unauthenticated and expose pool state, cache sizes and model
+versions, so keep the flag off in any shared environment.
+"""
+from fastapi import APIRouter
+
+router = APIRouter()
+
+
+@router.get('/cache')
+def cache_stats():
+    """Analytics result cache size and hit/miss counters."""
+    from ..core.cache import analytics_cache
+    return analytics_cache.stats()
+
+
+@router.get('/receipts')
+def receipt_stats():
+    """Receipt PDF cache hits vs. cold renders."""
+    from .. import receipts
+    return receipts.stats.snapshot()
+
+
+@router.get('/models')
+def model_stats():
+    """Loaded profit model cache size and hit/miss counters."""
+    from ..core.cache import model_cache
+    return model_cache.stats()
+
+
+@router.get('/auth')
+def auth_stats():
+    """User/membership cache hit rates and per-request auth latency."""
+    from ..core.cache import user_cache, membership_cache
+    from .deps import auth_timings
+    return {'user_cache': user_cache.stats(), 'membership_cache': membership_cache.stats(), 'latency': auth_timings.snapshot()}
+
+
+@router.get('/pool')
+async def pool_stats():
+    """DB pool usage/wait times and threadpool saturation."""
+    from anyio import to_thread
+    from ..db.pool import pool_status
+    from ..db.session import engine, async_engine
+    limiter = to_thread.current_default_thread_limiter()
+    return {
+        'sync_pool': pool_status(engine),
+        'async_pool': pool_status(async_engine.sync_engine),
+        'threadpool': {
+            'total_tokens': limiter.total_tokens,
+            'borrowed_tokens': limiter.borrowed_tokens,
+            'waiting': limiter.statistics().tasks_waiting,
+        },
+    }
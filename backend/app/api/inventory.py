@@ -5,14 +5,13 @@ import logging
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from .. import schemas, crud
-from .deps import get_db_dep, get_current_user
+from .deps import get_db_dep, get_current_user_sync, get_business_access_sync
 
 router = APIRouter()
 
 
 @router.post('', response_model=schemas.InventoryOut, status_code=201)
-def create_inventory(item_in: dict, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
-    from ..models import Business
+def create_inventory(item_in: dict, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user_sync)):
     # Accept flexible payloads from clients; perform explicit parsing and
     # validation here to return clear 400 errors instead of 422. This
     # prevents Unprocessable Entity logs when clients send slightly
@@ -26,12 +25,12 @@ def create_inventory(item_in: dict, db: Session = Depends(get_db_dep), current_u
     except Exception:
         raise HTTPException(status_code=400, detail='Invalid request payload')
 
-    # ensure business exists
-    biz = db.query(Business).filter(Business.id == business_id).first()
-    if not biz:
+    # ensure business exists (400 here, as clients of this endpoint expect)
+    # and current user is owner
+    access = crud.get_business_access(db, current_user.id, business_id)
+    if access is None:
         raise HTTPException(status_code=400, detail='Business not found')
-    # ensure current user is owner
-    if biz.owner_id != current_user.id:
+    if access.role != 'owner':
         raise HTTPException(status_code=403, detail='Not authorized for this business')
 
     # parse and validate numeric fields with friendly errors
@@ -77,14 +76,7 @@ def create_inventory(item_in: dict, db: Session = Depends(get_db_dep), current_u
 
 
 @router.get('', response_model=list[schemas.InventoryOut])
-def list_inventory(business_id: int, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
-    from ..models import Business
-    biz = db.query(Business).filter(Business.id == business_id).first()
-    if not biz:
-        raise HTTPException(status_code=404, detail='Business not found')
-    role = crud.get_user_business_role(db, current_user.id, business_id)
-    if role is None:
-        raise HTTPException(status_code=403, detail='Not authorized for this business')
+def list_inventory(business_id: int, db: Session = Depends(get_db_dep), access=Depends(get_business_access_sync)):
     # Return full inventory rows for all authorized roles (owner, accountant, staff).
     # Cost price is considered readable by staff for operational awareness but
     # write operations remain restricted (see create_inventory which requires owner).
@@ -93,31 +85,17 @@ def list_inventory(business_id: int, db: Session = Depends(get_db_dep), current_
 
 
 @router.get('/available', response_model=list[schemas.InventoryOut])
-def list_available_inventory(business_id: int, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
-    from ..models import Business
-    biz = db.query(Business).filter(Business.id == business_id).first()
-    if not biz:
-        raise HTTPException(status_code=404, detail='Business not found')
-    # owners and members can view available inventory
-    role = crud.get_user_business_role(db, current_user.id, business_id)
-    if role is None:
-        raise HTTPException(status_code=403, detail='Not authorized for this business')
+def list_available_inventory(business_id: int, db: Session = Depends(get_db_dep), access=Depends(get_business_access_sync)):
+    # owners and members can view available inventory (enforced by access)
     return crud.list_available_inventory_for_business(db, business_id)
 
 
 @router.get('/low_stock', response_model=list[schemas.InventoryOut])
-def low_stock_items(business_id: int, threshold: int | None = None, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
+def low_stock_items(business_id: int, threshold: int | None = None, db: Session = Depends(get_db_dep), access=Depends(get_business_access_sync)):
     """Return inventory items with quantity below `threshold` for a business.
 
     Threshold defaults to application configuration; owners and members can view.
     """
-    from ..models import Business
-    biz = db.query(Business).filter(Business.id == business_id).first()
-    if not biz:
-        raise HTTPException(status_code=404, detail='Business not found')
-    role = crud.get_user_business_role(db, current_user.id, business_id)
-    if role is None:
-        raise HTTPException(status_code=403, detail='Not authorized for this business')
     th = int(threshold) if threshold is not None else getattr(settings, 'LOW_STOCK_THRESHOLD', 5)
     try:
         items = crud.list_low_stock_for_business(db, business_id, th)
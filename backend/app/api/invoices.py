@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from .. import invoices
+from .deps import get_business_access
+
+router = APIRouter()
+
+
+@router.get('/{business_id}/{name}')
+async def get_invoice(business_id: int, name: str, request: Request, thumb: bool = False, access=Depends(get_business_access)):
+    """Serve an uploaded invoice (Range requests supported) or, with `thumb=true`, its thumbnail.
+
+    Image invoices whose thumbnail is not ready yet are served in full.
+    """
+    # invoices are financial records: owners and accountants may view them, staff may not
+    if access.role == 'staff':
+        raise HTTPException(status_code=403, detail='Not authorized')
+    path = invoices.resolve(business_id, name)
+    if path is None:
+        raise HTTPException(status_code=404, detail='Invoice not found')
+    is_thumb = False
+    if thumb and invoices.is_image(name):
+        small = invoices.thumbnail_path(business_id, name)
+        if small.exists():
+            path, is_thumb = small, True
+    # content-addressed files never change, so their hash is a strong ETag;
+    # legacy `<timestamp>_<filename>` uploads keep starlette's stat-based one
+    stem = name.split('.', 1)[0]
+    headers = {'Cache-Control': 'private, no-cache'}
+    if len(stem) == 64:
+        etag = f'"{stem}-thumb"' if is_thumb else f'"{stem}"'
+        headers = {'Cache-Control': 'private, max-age=31536000, immutable', 'ETag': etag}
+        if etag in [t.strip() for t in request.headers.get('if-none-match', '').split(',')]:
+            return Response(status_code=304, headers=headers)
+    if is_thumb:
+        return FileResponse(path, media_type='image/jpeg', headers=headers)
+    return FileResponse(path, headers=headers, filename=name, content_disposition_type='inline')
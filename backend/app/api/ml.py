@@ -1,33 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
-from .. import crud
-from .deps import get_db_dep, get_current_user
+from .. import crud, training_jobs
+from ..core.cache import analytics_cache
+from ..db import matviews
+from .deps import get_db_dep, get_current_user_sync, get_business_access_sync, require_business_access
 import logging
 
 router = APIRouter()
 
 
-@router.get('/predict-profit/{business_id}')
-def predict_profit(business_id: int, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
-    """Return next-month profit prediction using persisted model for a business.
+def predict_profit_payload(db: Session, business_id: int):
+    """Load the persisted model for a business and predict next month's profit.
 
-    Read-only: loads saved model and metadata, constructs features from the
-    latest month and returns a numeric prediction and model metrics.
-    """
-    role = crud.get_user_business_role(db, current_user.id, business_id)
-    if role is None:
-        if not crud.get_business(db, business_id):
-            raise HTTPException(status_code=404, detail='Business not found')
-        raise HTTPException(status_code=403, detail='Not authorized')
-    # Only owner may access ML/AI predictions
-    if role != 'owner':
-        raise HTTPException(status_code=403, detail='Only owner may access ML predictions')
+    Raises HTTPException for missing dependencies, untrained models and
+    insufficient data; callers are responsible for the role check.
 
+    Results are cached per (business, model version, business data version,
+    analytics_monthly refresh time): a retrained model, a transaction write
+    or a view refresh each lead to a fresh prediction.
+    """
     logger = logging.getLogger(__name__)
     try:
         # lazy imports from ml package (use absolute imports to avoid relative-import issues)
         from backend.ml import ensure_ml_dependencies
-        from backend.ml.data_loader import get_monthly_profit_dataset
         # run dependency check once (will raise ImportError if missing)
         ensure_ml_dependencies()
         # only now import model_store (it imports joblib at module level)
@@ -40,9 +35,9 @@ def predict_profit(business_id: int, db: Session = Depends(get_db_dep), current_
         logger.exception('ML utilities not available')
         raise HTTPException(status_code=500, detail='ML utilities not available')
 
-    # load model and metadata (raises FileNotFoundError if missing)
+    # model and metadata from the in-process model cache (raises FileNotFoundError if missing)
     try:
-        model, meta = model_store.load_profit_model(business_id)
+        loaded = model_store.get_profit_model(business_id)
     except FileNotFoundError:
         # Normalize missing model to a clear 404 for clients
         raise HTTPException(status_code=404, detail='Model not trained')
@@ -53,46 +48,80 @@ def predict_profit(business_id: int, db: Session = Depends(get_db_dep), current_
         logger.exception('Error loading model for business_id=%s', business_id)
         raise HTTPException(status_code=500, detail='Error loading model')
 
-    # perform prediction (may raise ValueError for insufficient data)
-    try:
-        predicted = model_store.predict_next_month_profit(db, business_id)
-    except ValueError as ve:
-        # insufficient data or prediction failure
-        raise HTTPException(status_code=400, detail=str(ve))
-    except ImportError as ie:
-        logger.exception('ML dependencies missing during prediction: %s', ie)
-        raise HTTPException(status_code=500, detail=f'ML dependencies not available: {ie}')
-    except FileNotFoundError:
-        raise HTTPException(status_code=404, detail='Model not trained')
-    except Exception:
-        logger.exception('Unexpected error during prediction for business_id=%s', business_id, exc_info=True)
-        raise HTTPException(status_code=500, detail='Internal server error while predicting')
+    def compute():
+        # one dataset read gives both the features and the target month
+        try:
+            predicted_month, predicted = model_store.predict_next_month(db, business_id, loaded=loaded)
+        except ValueError as ve:
+            # insufficient data or prediction failure
+            raise HTTPException(status_code=400, detail=str(ve))
+        except ImportError as ie:
+            logger.exception('ML dependencies missing during prediction: %s', ie)
+            raise HTTPException(status_code=500, detail=f'ML dependencies not available: {ie}')
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail='Model not trained')
+        except Exception:
+            logger.exception('Unexpected error during prediction for business_id=%s', business_id, exc_info=True)
+            raise HTTPException(status_code=500, detail='Internal server error while predicting')
+
+        metrics = loaded.meta.get('metrics') if isinstance(loaded.meta, dict) else None
+        return {
+            'business_id': int(business_id),
+            'predicted_month': predicted_month,
+            'predicted_profit': float(predicted),
+            'model_version': loaded.version,
+            'model_metrics': metrics or {}
+        }
+
+    if not analytics_cache.enabled:
+        return compute()
+    key = ('predict_profit', business_id, loaded.version, crud.get_data_version(db, business_id), matviews.last_refreshed_at(db, 'analytics_monthly'))
+    # copy so callers may add to the payload without touching the cached dict
+    return dict(analytics_cache.get_or_compute(key, compute))
 
-    # compute predicted_month based on latest data
+
+@router.get('/predict-profit/{business_id}')
+def predict_profit(business_id: int, response: Response, db: Session = Depends(get_db_dep), access=Depends(get_business_access_sync)):
+    """Return next-month profit prediction using persisted model for a business.
+
+    Read-only: loads saved model and metadata, constructs features from the
+    latest month and returns a numeric prediction and model metrics.
+    """
+    # Only owner may access ML/AI predictions
+    if access.role != 'owner':
+        raise HTTPException(status_code=403, detail='Only owner may access ML predictions')
+
+    out = predict_profit_payload(db, business_id)
+    response.headers['X-Model-Version'] = out['model_version']
+    # features come from the analytics_monthly materialized view
+    response.headers.update(matviews.refreshed_at_header(db, 'analytics_monthly'))
+    return out
+
+
+@router.post('/train/{business_id}', status_code=status.HTTP_202_ACCEPTED)
+def train_model(business_id: int, response: Response, db: Session = Depends(get_db_dep), access=Depends(get_business_access_sync)):
+    """Queue retraining of the business's profit model; poll `/ml/jobs/{id}`.
+
+    While a job for the business is queued or running, the same job is
+    returned instead of starting another fit.
+    """
+    # Only owner may access ML/AI predictions
+    if access.role != 'owner':
+        raise HTTPException(status_code=403, detail='Only owner may train ML models')
     try:
-        df = get_monthly_profit_dataset(db, business_id)
-        if df is None or len(df) == 0:
-            predicted_month = None
-        else:
-            last_month = str(df['month'].iloc[-1])
-            # expect YYYY-MM
-            parts = last_month.split('-')
-            if len(parts) == 2:
-                y = int(parts[0]); m = int(parts[1]);
-                nm = (m % 12) + 1
-                ny = y + 1 if nm == 1 and m == 12 else y
-                predicted_month = f"{ny:04d}-{nm:02d}"
-            else:
-                predicted_month = None
-    except Exception:
-        logger.exception('Error computing predicted_month for business_id=%s', business_id)
-        predicted_month = None
+        job, created = training_jobs.submit(db, business_id)
+    except training_jobs.TooManyJobs as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    response.headers['Location'] = f'/ml/jobs/{job.id}'
+    return {**training_jobs.job_dict(job), 'deduplicated': not created}
 
-    metrics = meta.get('metrics') if isinstance(meta, dict) else None
 
-    return {
-        'business_id': int(business_id),
-        'predicted_month': predicted_month,
-        'predicted_profit': float(predicted),
-        'model_metrics': metrics or {}
-    }
+@router.get('/jobs/{job_id}')
+def training_job(job_id: int, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user_sync)):
+    """Status, timing and metrics of a training job."""
+    job = training_jobs.get(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail='Job not found')
+    if require_business_access(db, current_user.id, job.business_id).role != 'owner':
+        raise HTTPException(status_code=403, detail='Only owner may train ML models')
+    return training_jobs.job_dict(job)
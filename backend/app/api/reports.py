@@ -1,78 +1,121 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from .. import crud
-from .deps import get_db_dep, get_current_user
+import tempfile
+from datetime import date, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import crud, statements
+from .deps import get_async_db_dep, get_business_access
 
 router = APIRouter()
 
+STATEMENT_BATCH_SIZE = 2000
+# statements above this size spill from memory to a temp file
+STATEMENT_SPOOL_BYTES = 8 * 1024 * 1024
+STATEMENT_CHUNK_BYTES = 64 * 1024
+
+
+def _with_owner_pnl(rpt: dict):
+    # include COGS for owner calculations: net_profit = income - cogs - operating_expense
+    cogs = float(rpt.pop('cogs', 0.0) or 0.0)
+    # operating_expense is the transaction-sourced expense from the report window
+    operating_expense = float(rpt.get('total_expense') or 0.0)
+    rpt['operating_expense'] = operating_expense
+    rpt['cogs'] = cogs
+    rpt['total_expense'] = operating_expense + cogs
+    rpt['net_profit'] = float(rpt.get('total_income', 0.0)) - cogs - operating_expense
+    return rpt
+
 
 @router.get('/weekly/{business_id}')
-def weekly_report(business_id: int, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
-    role = crud.get_user_business_role(db, current_user.id, business_id)
-    if role is None:
-        if not crud.get_business(db, business_id):
-            raise HTTPException(status_code=404, detail='Business not found')
-        raise HTTPException(status_code=403, detail='Not authorized')
+async def weekly_report(business_id: int, db: AsyncSession = Depends(get_async_db_dep), access=Depends(get_business_access)):
+    role = access.role
     # staff must not view reports or transaction history
     if role == 'staff':
         raise HTTPException(status_code=403, detail='Not authorized')
-    rpt = crud.report_weekly(db, business_id)
-    # include COGS for owner calculations: net_profit = income - cogs - operating_expense
+    rpt = await db.run_sync(crud.report_weekly, business_id, with_cogs=(role == 'owner'))
     if role == 'owner':
-        try:
-            # Recompute week boundaries to query ml_transactions for COGS in the same window
-            from datetime import datetime, timedelta
-            from sqlalchemy import text
-            now = datetime.utcnow()
-            start_of_week = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
-            start = start_of_week.date()
-            end = (start_of_week + timedelta(days=7)).date()
-            cogs_row = db.execute(text("SELECT COALESCE(SUM(cost_amount),0) AS cogs FROM ml_transactions WHERE business_id = :bid AND date >= :start AND date < :end"), {'bid': business_id, 'start': start, 'end': end}).fetchone()
-            cogs = float(cogs_row._mapping['cogs'] if hasattr(cogs_row, '_mapping') else (cogs_row[0] if cogs_row and len(cogs_row) > 0 else 0.0))
-        except Exception:
-            cogs = 0.0
-        # operating_expense is the transaction-sourced expense from the weekly report
-        operating_expense = float(rpt.get('total_expense') or 0.0)
-        display_expense = operating_expense + (cogs or 0.0)
-        rpt['operating_expense'] = operating_expense
-        rpt['cogs'] = cogs
-        rpt['total_expense'] = display_expense
-        rpt['net_profit'] = float(rpt.get('total_income', 0.0)) - (cogs or 0.0) - operating_expense
+        rpt = _with_owner_pnl(rpt)
     return rpt
 
 
 @router.get('/monthly/{business_id}')
-def monthly_report(business_id: int, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
-    role = crud.get_user_business_role(db, current_user.id, business_id)
-    if role is None:
-        if not crud.get_business(db, business_id):
-            raise HTTPException(status_code=404, detail='Business not found')
-        raise HTTPException(status_code=403, detail='Not authorized')
+async def monthly_report(business_id: int, db: AsyncSession = Depends(get_async_db_dep), access=Depends(get_business_access)):
+    role = access.role
     # staff must not view reports or transaction history
     if role == 'staff':
         raise HTTPException(status_code=403, detail='Not authorized')
-    rpt = crud.report_monthly(db, business_id)
+    rpt = await db.run_sync(crud.report_monthly, business_id, with_cogs=(role == 'owner'))
     if role == 'owner':
-        try:
-            from datetime import datetime
-            from sqlalchemy import text
-            now = datetime.utcnow()
-            month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0).date()
-            if month_start.month == 12:
-                next_month = month_start.replace(year=month_start.year+1, month=1, day=1)
-            else:
-                # increment month
-                nm = month_start.month + 1
-                ny = month_start.year
-                next_month = month_start.replace(month=nm, year=ny, day=1)
-            cogs_row = db.execute(text("SELECT COALESCE(SUM(cost_amount),0) AS cogs FROM ml_transactions WHERE business_id = :bid AND month >= :mstart AND month < :mend"), {'bid': business_id, 'mstart': month_start.strftime('%Y-%m'), 'mend': next_month.strftime('%Y-%m')}).fetchone()
-            cogs = float(cogs_row._mapping['cogs'] if hasattr(cogs_row, '_mapping') else (cogs_row[0] if cogs_row and len(cogs_row) > 0 else 0.0))
-        except Exception:
-            cogs = 0.0
-        operating_expense = float(rpt.get('total_expense') or 0.0)
-        display_expense = operating_expense + (cogs or 0.0)
-        rpt['operating_expense'] = operating_expense
-        rpt['cogs'] = cogs
-        rpt['total_expense'] = display_expense
-        rpt['net_profit'] = float(rpt.get('total_income', 0.0)) - (cogs or 0.0) - operating_expense
+        rpt = _with_owner_pnl(rpt)
     return rpt
+
+
+def _statement_pnl(totals: dict, role: str):
+    income = float(totals['income'])
+    operating_expense = float(totals['operating_expense'])
+    if role != 'owner':
+        # same visibility as the weekly/monthly reports: no COGS for accountants
+        return [('Total income', income), ('Total expense', operating_expense), ('Net', income - operating_expense)]
+    cogs = float(totals['cogs'])
+    return [
+        ('Total income', income),
+        ('Operating expense', operating_expense),
+        ('Cost of goods sold', cogs),
+        ('Net profit', income - operating_expense - cogs),
+    ]
+
+
+def buffered_statement(business_id: int, business_name: str, start: date, end: date, pnl_lines):
+    """Render the statement, then yield it in STATEMENT_CHUNK_BYTES pieces.
+
+    Runs after the route returns, so it uses its own session; rows are read
+    through a server-side cursor and drawn a page at a time, which bounds
+    memory. Pages are not sent as they are drawn: ReportLab writes the PDF
+    (page objects, then the xref table that points into them) only on
+    `save()`, so the whole file is rendered into a spooled temp file first
+    and the first byte goes out once the last page is done. The connection
+    is released before the file is sent.
+    """
+    from ..db.session import SessionLocal
+    with tempfile.SpooledTemporaryFile(max_size=STATEMENT_SPOOL_BYTES) as out:
+        db = SessionLocal()
+        try:
+            rows = crud.iter_transactions_with_items(db, business_id, batch_size=STATEMENT_BATCH_SIZE, start_date=start, end_date=end)
+            statements.render_statement(out, rows, business_name, start, end, pnl_lines)
+        finally:
+            db.close()
+        out.seek(0)
+        while chunk := out.read(STATEMENT_CHUNK_BYTES):
+            yield chunk
+
+
+@router.get('/statement/{business_id}')
+async def statement(
+    business_id: int,
+    start: date = Query(..., alias='from'),
+    end: date = Query(..., alias='to'),
+    db: AsyncSession = Depends(get_async_db_dep),
+    access=Depends(get_business_access),
+):
+    """PDF statement of every transaction from `from` to `to` (inclusive dates).
+
+    Each page ends with its income/expense subtotals and the last page with
+    the period P&L (COGS and net profit for owners only).
+
+    The response is buffered, not streamed page by page: the whole PDF is
+    rendered (see `buffered_statement`) before its first byte is sent, so
+    time to first byte is the full render time of the statement.
+    """
+    role = access.role
+    # staff must not view reports or transaction history
+    if role == 'staff':
+        raise HTTPException(status_code=403, detail='Not authorized')
+    if end < start:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    totals = await db.run_sync(crud.daily_totals, business_id, start, end + timedelta(days=1))
+    filename = f'statement_{business_id}_{start.isoformat()}_{end.isoformat()}.pdf'
+    return StreamingResponse(
+        buffered_statement(business_id, access.name, start, end, _statement_pnl(totals, role)),
+        media_type='application/pdf',
+        headers={'Content-Disposition': f'attachment; filename={filename}'},
+    )
@@ -1,17 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from .. import schemas, crud
-from .deps import get_db_dep, get_current_user
+from .deps import get_async_db_dep, get_business_access
 
 router = APIRouter()
 
 
 @router.get('/{business_id}', response_model=schemas.SummaryOut)
-def get_summary(business_id: int, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
-    role = crud.get_user_business_role(db, current_user.id, business_id)
-    if role is None:
-        # check if business exists
-        if not crud.get_business(db, business_id):
-            raise HTTPException(status_code=404, detail='Business not found')
-        raise HTTPException(status_code=403, detail='Not authorized for this business')
-    return crud.summary_for_business(db, business_id)
+async def get_summary(business_id: int, db: AsyncSession = Depends(get_async_db_dep), access=Depends(get_business_access)):
+    # any role in the business may see the summary; access raises 404/403
+    return await db.run_sync(crud.summary_for_business, business_id)
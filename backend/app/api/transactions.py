@@ -1,264 +1,238 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status
-from fastapi.responses import Response
-from io import BytesIO
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, UploadFile, File, Form, status
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from io import StringIO
+import csv
+import json
 import logging
 from sqlalchemy.orm import Session
-from .. import schemas, crud, models
-from .deps import get_db_dep, get_current_user
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import schemas, crud, models, invoices, receipts
+from .deps import get_db_dep, get_async_db_dep, get_current_user, get_current_user_sync, get_business_access_sync, require_business_access
 from typing import Optional
-import os
-from datetime import datetime
+from datetime import date, datetime
 
 router = APIRouter()
 
 
 @router.get("/{transaction_id}/receipt")
-def transaction_receipt(transaction_id: int, db: Session = Depends(get_db_dep), current_user: models.User = Depends(get_current_user)):
-    from ..models import Transaction, Business, Inventory
-
-    try:
-        # STEP 1 — safe transaction fetch
-        transaction = db.query(Transaction).filter(Transaction.id == transaction_id).first()
-        if not transaction:
-            raise HTTPException(status_code=404, detail='Transaction not found')
-
-        # business must exist
-        biz = db.query(Business).filter(Business.id == transaction.business_id).first()
-        if not biz:
-            raise HTTPException(status_code=404, detail='Business not found')
-
-        # verify user has access to this business (owner, accountant, or staff allowed)
-        role_for_business = crud.get_user_business_role(db, current_user.id, biz.id)
-        allowed_roles = {'owner', 'accountant', 'staff'}
-        if role_for_business is None or role_for_business not in allowed_roles:
-            raise HTTPException(status_code=403, detail='Not authorized for this business')
-
-        # STEP 2 — safely load inventory
-        inventory = None
-        item_name = 'Manual Transaction'
-        cost_price = 0.0
-        if transaction.inventory_id:
-            inventory = db.query(Inventory).filter(Inventory.id == transaction.inventory_id).first()
-        if inventory:
-            item_name = inventory.item_name or item_name
-            cost_price = float(inventory.cost_price or 0.0)
-        else:
-            item_name = 'Manual Transaction'
-            cost_price = 0.0
+async def transaction_receipt(transaction_id: int, db: AsyncSession = Depends(get_async_db_dep), current_user: models.User = Depends(get_current_user)):
+    # transaction + item in one query; the access check is served from the
+    # membership cache; the PDF itself from the receipt cache when possible
+    row = await db.run_sync(crud.get_receipt_row, transaction_id)
+    if not row:
+        raise HTTPException(status_code=404, detail='Transaction not found')
 
-        # STEP 3 — safe numeric calculations
-        quantity = int(transaction.used_quantity or 1)
-        selling_price = float(transaction.amount or 0.0)
-        try:
-            profit = selling_price - (quantity * cost_price)
-        except Exception:
-            profit = 0.0
+    # business must exist and the user must have access to it (owner, accountant, or staff allowed)
+    biz = await db.run_sync(require_business_access, current_user.id, row.business_id)
+    # cost and profit are only shown to owners and accountants
+    fields = receipts.receipt_fields(row, biz.name, biz.role)
 
-        # STEP 4 — protect role access: use the per-business role (owner/accountant/staff)
-        role = role_for_business
-        show_cost = role in ['owner', 'accountant']
-        show_profit = role in ['owner', 'accountant']
+    try:
+        pdf = await receipts.get_or_render(fields)
+    except ImportError:
+        logging.exception('ReportLab import failed')
+        raise HTTPException(status_code=500, detail='PDF generation dependency missing (reportlab)')
+    except Exception:
+        logging.exception('Receipt generation failed for tx %s', transaction_id)
+        raise HTTPException(status_code=500, detail='Receipt generation failed')
 
-        # STEP 5 — safe PDF generation
-        try:
-            from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-            from reportlab.lib.pagesizes import letter
-            from reportlab.lib.styles import getSampleStyleSheet
-        except ImportError:
-            logging.exception('ReportLab import failed')
-            raise HTTPException(status_code=500, detail='PDF generation dependency missing (reportlab)')
-
-        buffer = BytesIO()
-        try:
-            doc = SimpleDocTemplate(buffer, pagesize=letter)
-            styles = getSampleStyleSheet()
-            elements = []
-            elements.append(Paragraph('Transaction Receipt', styles['Title']))
-            elements.append(Spacer(1, 12))
-
-            elements.append(Paragraph(f'Business: {biz.name}', styles['Normal']))
-            elements.append(Paragraph(f'Transaction ID: {transaction.id}', styles['Normal']))
-            elements.append(Paragraph(f'Date: {transaction.created_at.isoformat() if transaction.created_at is not None else ""}', styles['Normal']))
-            elements.append(Spacer(1, 8))
-
-            elements.append(Paragraph(f'Item: {item_name}', styles['Normal']))
-            elements.append(Paragraph(f'Quantity: {quantity}', styles['Normal']))
-            elements.append(Paragraph(f'Selling Price: ₹{selling_price:.2f}', styles['Normal']))
-            elements.append(Paragraph(f'Total Amount: ₹{selling_price:.2f}', styles['Normal']))
-
-            if show_cost:
-                elements.append(Paragraph(f'Cost Price: ₹{cost_price:.2f}', styles['Normal']))
-
-            if show_profit:
-                elements.append(Paragraph(f'Profit: ₹{profit:.2f}', styles['Normal']))
-
-            doc.build(elements)
-            buffer.seek(0)
-            pdf_data = buffer.getvalue()
-        except Exception as e:
-            logging.exception('Receipt generation failed for tx %s', transaction_id)
-            raise HTTPException(status_code=500, detail='Receipt generation failed')
-        finally:
-            try:
-                buffer.close()
-            except Exception:
-                pass
-
-        # STEP 6 — return response
-        return Response(
-            pdf_data,
-            media_type='application/pdf',
-            headers={
-                'Content-Disposition': f'attachment; filename=transaction_{transaction_id}.pdf'
-            }
-        )
-    except HTTPException:
-        raise
-    except Exception as e:
-        # STEP 7 — add error logging
-        logging.exception('Receipt generation failed unexpectedly')
-        raise HTTPException(status_code=500, detail=str(e))
+    filename = f'transaction_{transaction_id}.pdf'
+    if isinstance(pdf, bytes):
+        return Response(pdf, media_type='application/pdf', headers={'Content-Disposition': f'attachment; filename={filename}'})
+    return FileResponse(pdf, media_type='application/pdf', filename=filename)
 
 
 @router.post('', status_code=status.HTTP_201_CREATED)
-def create_transaction(tx_in: schemas.TransactionCreate, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
+def create_transaction(tx_in: schemas.TransactionCreate, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user_sync)):
     # ensure business belongs to user (owner or member)
-    from ..models import Business, BusinessMember
-    biz = db.query(Business).filter(Business.id == tx_in.business_id).first()
-    if not biz:
-        raise HTTPException(status_code=404, detail='Business not found')
+    role = require_business_access(db, current_user.id, tx_in.business_id).role
     # allow only owner or staff to create transactions; accountants are denied
-    role = crud.get_user_business_role(db, current_user.id, tx_in.business_id)
-    if role is None:
-        raise HTTPException(status_code=403, detail='Not authorized for this business')
     if role == 'accountant':
         # accountants are not allowed to perform sales entry or inventory updates
         raise HTTPException(status_code=403, detail='Accountants are not allowed to create transactions')
+    # Ensure staff-created transactions have created_at set to server now to
+    # ensure 'today' semantics for staff; stamping it at creation keeps the
+    # daily rollup in the right bucket without a second commit.
+    created_at = datetime.utcnow() if role == 'staff' else None
     # if inventory info provided, use inventory-aware creation
     # create using the canonical CRUD functions so behavior matches for owner and staff
     try:
         if tx_in.inventory_id is not None or tx_in.used_quantity is not None or tx_in.source is not None:
-            tx = crud.create_transaction_with_inventory(db, tx_in.business_id, tx_in.type, tx_in.amount, tx_in.category, inventory_id=tx_in.inventory_id, used_quantity=tx_in.used_quantity, source=tx_in.source)
+            tx = crud.create_transaction_with_inventory(db, tx_in.business_id, tx_in.type, tx_in.amount, tx_in.category, inventory_id=tx_in.inventory_id, used_quantity=tx_in.used_quantity, source=tx_in.source, created_at=created_at)
         else:
-            tx = crud.create_transaction(db, tx_in.business_id, tx_in.type, tx_in.amount, tx_in.category)
+            tx = crud.create_transaction(db, tx_in.business_id, tx_in.type, tx_in.amount, tx_in.category, created_at=created_at)
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
 
-    # Ensure staff-created transactions have created_at defaulted to now (server time)
     if role == 'staff':
-        try:
-            # overwrite created_at to server now to ensure 'today' semantics for staff
-            tx.created_at = datetime.utcnow()
-            db.add(tx)
-            db.commit()
-            db.refresh(tx)
-        except Exception:
-            db.rollback()
-            # If we cannot update timestamp, still do not leak transaction data
+        # do not leak transaction data to staff
         return {'detail': 'Transaction created'}
     return tx
 
 
+@router.post('/batch', response_model=schemas.TransactionBatchOut, status_code=status.HTTP_201_CREATED)
+def create_transactions_batch(batch: schemas.TransactionBatchCreate, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user_sync)):
+    # same access rules as POST /transactions
+    role = require_business_access(db, current_user.id, batch.business_id).role
+    if role == 'accountant':
+        raise HTTPException(status_code=403, detail='Accountants are not allowed to create transactions')
+    result = crud.create_transactions_batch(db, batch.business_id, batch.transactions, atomic=(batch.mode == 'all_or_nothing'))
+    if not result.ids and result.errors:
+        raise HTTPException(status_code=400, detail={'created': 0, 'errors': result.errors})
+    # do not leak transaction ids to staff
+    return {'created': len(result.ids), 'ids': None if role == 'staff' else result.ids, 'errors': result.errors}
+
+
 @router.post('/upload')
-def upload_invoice(business_id: int = Form(...), file: UploadFile = File(...), db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
-    # Save uploaded file to backend/uploads/<business_id>/ and return URL path
-    from ..models import Business, BusinessMember
-    biz = db.query(Business).filter(Business.id == business_id).first()
-    if not biz:
-        raise HTTPException(status_code=404, detail='Business not found')
+def upload_invoice(background: BackgroundTasks, business_id: int = Form(...), file: UploadFile = File(...), db: Session = Depends(get_db_dep), current_user=Depends(get_current_user_sync)):
     # allow only owner to upload invoices; accountants and staff are denied
-    role = crud.get_user_business_role(db, current_user.id, business_id)
-    if role is None:
-        raise HTTPException(status_code=403, detail='Not authorized')
+    role = require_business_access(db, current_user.id, business_id).role
     if role != 'owner':
         raise HTTPException(status_code=403, detail='Only owner may upload invoices')
-    uploads_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'uploads')
-    uploads_dir = os.path.abspath(uploads_dir)
-    os.makedirs(uploads_dir, exist_ok=True)
-    business_dir = os.path.join(uploads_dir, str(business_id))
-    os.makedirs(business_dir, exist_ok=True)
-    filename = f"{int(__import__('time').time())}_{file.filename}"
-    path = os.path.join(business_dir, filename)
-    with open(path, 'wb') as f:
-        f.write(file.file.read())
+    # the request body was already capped by invoices.UploadSizeLimit. Stream
+    # into content-addressed storage (see app/invoices.py); the same file
+    # uploaded twice is stored once and gets the same URL
+    try:
+        name, created = invoices.store(business_id, file.file, file.filename)
+    except invoices.InvoiceTooLarge:
+        raise HTTPException(status_code=413, detail=f'Invoice larger than {invoices.MAX_BYTES} bytes')
+    if invoices.is_image(name):
+        background.add_task(invoices.make_thumbnail, business_id, name)
     # return a path relative to server root
-    return {'invoice_url': f'/uploads/{business_id}/{filename}'}
+    return {'invoice_url': f'/uploads/{business_id}/{name}', 'deduplicated': not created}
+
+
+def transaction_filters(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    type: Optional[str] = None,
+    category: Optional[str] = None,
+    inventory_id: Optional[int] = None,
+    source: Optional[str] = None,
+):
+    """Query parameters shared by the transaction listings and export (see `crud._filter_transactions`)."""
+    if type is not None:
+        try:
+            crud._normalize_tx_type(type)
+        except ValueError as ve:
+            raise HTTPException(status_code=400, detail=str(ve))
+    return {'start_date': start_date, 'end_date': end_date, 'ttype': type, 'category': category, 'inventory_id': inventory_id, 'source': source}
+
+
+def _list_page(list_fn, db: Session, business_id: int, filters: dict, limit: int, cursor: Optional[str], response: Response):
+    # the body stays a plain list; the keyset cursor for the next page, if
+    # any, travels in the X-Next-Cursor header
+    try:
+        rows, next_cursor = list_fn(db, business_id, limit=limit, cursor=cursor, **filters)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return rows
 
 
 @router.get('', response_model=list[schemas.TransactionOut])
-def list_transactions(business_id: int, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
-    from ..models import Business, BusinessMember
-    biz = db.query(Business).filter(Business.id == business_id).first()
-    if not biz:
-        raise HTTPException(status_code=404, detail='Business not found')
-    role = crud.get_user_business_role(db, current_user.id, business_id)
-    if role is None:
-        raise HTTPException(status_code=403, detail='Not authorized')
+def list_transactions(
+    business_id: int,
+    response: Response,
+    limit: int = Query(crud.TRANSACTION_PAGE_SIZE, ge=1, le=crud.TRANSACTION_PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    filters: dict = Depends(transaction_filters),
+    db: Session = Depends(get_db_dep),
+    access=Depends(get_business_access_sync),
+):
+    role = access.role
     # only owners and accountants may view transactions
     if role in ('owner', 'accountant'):
-        return crud.list_transactions_for_business(db, business_id)
+        return _list_page(crud.list_transactions_for_business, db, business_id, filters, limit, cursor, response)
     # staff are not allowed to view any transaction history
     raise HTTPException(status_code=403, detail='Not authorized')
 
 
 @router.get('/list')
-def list_transactions_joined(business_id: int, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
-    """Return transactions joined with inventory item names for display.
+def list_transactions_joined(
+    business_id: int,
+    response: Response,
+    limit: int = Query(crud.TRANSACTION_PAGE_SIZE, ge=1, le=crud.TRANSACTION_PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    filters: dict = Depends(transaction_filters),
+    db: Session = Depends(get_db_dep),
+    access=Depends(get_business_access_sync),
+):
+    """Return one page of transactions joined with inventory item names for display.
 
-    Returns JSON objects: date(created_at), item_name, used_quantity, amount, type
+    Returns JSON objects: date(created_at), item_name, used_quantity, amount, type.
+    Newest first, `limit` per page; pass the X-Next-Cursor response header back
+    as `cursor` for the next page.
     """
-    from sqlalchemy import select
-    from ..models import Transaction, Inventory
-    role = crud.get_user_business_role(db, current_user.id, business_id)
-    if role is None:
-        raise HTTPException(status_code=403, detail='Not authorized')
     # allow staff to list transactions for their business (frontend will hide sensitive columns)
-    q = (
-        db.query(
-            Transaction.id.label('id'),
-            Transaction.created_at.label('created_at'),
-            Inventory.item_name.label('item_name'),
-            Transaction.used_quantity,
-            Transaction.amount,
-            Transaction.type,
-            Transaction.category,
-            Transaction.invoice_url,
-            Transaction.source,
-            Transaction.inventory_id
-        )
-        .join(Inventory, Transaction.inventory_id == Inventory.id, isouter=True)
-        .filter(Transaction.business_id == business_id)
-        .order_by(Transaction.created_at.desc())
+    return _list_page(crud.list_transactions_with_items, db, business_id, filters, limit, cursor, response)
+
+
+EXPORT_BATCH_SIZE = 1000
+_EXPORT_MEDIA_TYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+
+def export_chunks(business_id: int, fmt: str, filters: dict):
+    """Yield the export body in chunks of about EXPORT_BATCH_SIZE rows.
+
+    Uses its own session because the body is produced after the route
+    returns; the rows are read through a server-side cursor.
+    """
+    from ..db.session import SessionLocal
+    db = SessionLocal()
+    try:
+        rows = crud.iter_transactions_with_items(db, business_id, batch_size=EXPORT_BATCH_SIZE, **filters)
+        buf = StringIO()
+        writer = None
+        if fmt == 'csv':
+            writer = csv.DictWriter(buf, fieldnames=crud.TRANSACTION_ROW_FIELDS)
+            writer.writeheader()
+        for i, row in enumerate(rows, 1):
+            if writer is not None:
+                writer.writerow(row)
+            else:
+                buf.write(json.dumps(row) + '\n')
+            if i % EXPORT_BATCH_SIZE == 0:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        if buf.tell():
+            yield buf.getvalue()
+    finally:
+        db.close()
+
+
+@router.get('/export')
+def export_transactions(
+    business_id: int,
+    format: str = Query('csv', pattern='^(csv|ndjson)$'),
+    filters: dict = Depends(transaction_filters),
+    access=Depends(get_business_access_sync),
+):
+    """Stream every matching transaction, oldest first, as CSV or NDJSON.
+
+    Accepts the same filters as `/transactions`; rows have the `/transactions/list` fields.
+    """
+    # same rule as GET /transactions: staff may not export transaction history
+    if access.role not in ('owner', 'accountant'):
+        raise HTTPException(status_code=403, detail='Not authorized')
+    filename = f'transactions_{business_id}.{format}'
+    return StreamingResponse(
+        export_chunks(business_id, format, filters),
+        media_type=_EXPORT_MEDIA_TYPES[format],
+        headers={'Content-Disposition': f'attachment; filename={filename}'},
     )
-    results = q.all()
-    out = []
-    for r in results:
-        out.append({
-            'id': int(r.id),
-            'created_at': r.created_at.isoformat() if r.created_at is not None else None,
-            'item_name': r.item_name,
-            'used_quantity': int(r.used_quantity or 0),
-            'amount': float(r.amount or 0.0),
-            'type': str(r.type) if r.type is not None else None,
-            'category': r.category,
-            'invoice_url': r.invoice_url,
-            'source': r.source,
-            'inventory_id': int(r.inventory_id) if r.inventory_id is not None else None
-        })
-    return out
 
 
 @router.put('/{tx_id}', response_model=schemas.TransactionOut)
-def update_transaction_route(tx_id: int, tx_in: schemas.TransactionUpdate, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
+def update_transaction_route(tx_id: int, tx_in: schemas.TransactionUpdate, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user_sync)):
     # only owner can edit
     tx = db.query(models.Transaction).filter(models.Transaction.id==tx_id).first()
     if not tx:
         raise HTTPException(status_code=404, detail='Transaction not found')
-    biz = db.query(models.Business).filter(models.Business.id==tx.business_id).first()
-    if not biz:
-        raise HTTPException(status_code=404, detail='Business not found')
     # only the business owner may edit transactions
-    if biz.owner_id != current_user.id:
+    if require_business_access(db, current_user.id, tx.business_id).role != 'owner':
         raise HTTPException(status_code=403, detail='Only owner may edit transactions')
     try:
         updated = crud.update_transaction(db, tx_id, type=tx_in.type, amount=tx_in.amount, category=tx_in.category, invoice_url=tx_in.invoice_url, inventory_id=tx_in.inventory_id, used_quantity=tx_in.used_quantity, source=tx_in.source)
@@ -270,13 +244,12 @@ def update_transaction_route(tx_id: int, tx_in: schemas.TransactionUpdate, db: S
 
 
 @router.delete('/{tx_id}')
-def delete_transaction_route(tx_id: int, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
+def delete_transaction_route(tx_id: int, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user_sync)):
     tx = db.query(models.Transaction).filter(models.Transaction.id==tx_id).first()
     if not tx:
         raise HTTPException(status_code=404, detail='Transaction not found')
-    biz = db.query(models.Business).filter(models.Business.id==tx.business_id).first()
     # only the business owner may delete transactions
-    if not biz or biz.owner_id != current_user.id:
+    if require_business_access(db, current_user.id, tx.business_id).role != 'owner':
         raise HTTPException(status_code=403, detail='Only owner may delete transactions')
     try:
         ok = crud.delete_transaction(db, tx_id)
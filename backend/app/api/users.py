@@ -1,18 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from .. import schemas, crud, security
-from .deps import get_db_dep, get_current_user
+from .deps import get_db_dep, get_current_user_sync
 
 router = APIRouter()
 
 
 @router.get('/me', response_model=schemas.UserOut)
-def users_me(current_user=Depends(get_current_user)):
+def users_me(current_user=Depends(get_current_user_sync)):
     return current_user
 
 
 @router.put('/me/password')
-def change_password(payload: schemas.PasswordChangeRequest, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user)):
+def change_password(payload: schemas.PasswordChangeRequest, db: Session = Depends(get_db_dep), current_user=Depends(get_current_user_sync)):
     # verify current password
     if not security.verify_password(payload.current_password, current_user.password_hash):
         raise HTTPException(status_code=400, detail='Current password is incorrect')
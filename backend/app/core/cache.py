@@ -0,0 +1,119 @@
+"""Small in-process caches for hot read paths.
+
+Entries are bounded both by count (least recently used entries are evicted
+first) and by age.
+
+- `analytics_cache`: analytics results. Callers put the business data
+  version in the key (see `crud.get_data_version`), so a write to a business
+  makes its old entries unreachable in every worker; the LRU bound and TTL
+  then reclaim them.
+- `user_cache`: token subject (username) -> authenticated user record for
+  `api.deps.get_current_user`. Invalidated explicitly by
+  `crud.change_user_password` / `crud.delete_user` in this process; the
+  short TTL bounds staleness in other workers.
+- `membership_cache`: (user id, business id) -> `crud.BusinessAccess` for
+  `crud.get_business_access`. Invalidated by `crud.create_business`,
+  `crud.add_member` and `crud.delete_member`; the TTL bounds staleness in
+  other workers as above.
+- `model_cache`: business id -> (file stamp, loaded profit model) for
+  `backend.ml.model_store.get_profit_model`. An entry is only used while the
+  model files keep the stamp (mtime and size) it was loaded with, so a
+  retrained model is picked up without a restart.
+"""
+from collections import OrderedDict
+import threading
+import time
+
+from .config import settings
+
+
+class TTLLRUCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl_seconds`."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                expires, value = item
+                if expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for `key`, computing and storing it on a miss."""
+        if not self.enabled:
+            return compute()
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._data),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': (self.hits / total) if total else 0.0,
+            }
+
+
+analytics_cache = TTLLRUCache(
+    max_entries=getattr(settings, 'ANALYTICS_CACHE_MAX_ENTRIES', 2048),
+    ttl_seconds=getattr(settings, 'ANALYTICS_CACHE_TTL_SECONDS', 600),
+    enabled=getattr(settings, 'ANALYTICS_CACHE_ENABLED', True),
+)
+
+user_cache = TTLLRUCache(
+    max_entries=getattr(settings, 'AUTH_CACHE_MAX_ENTRIES', 10000),
+    ttl_seconds=getattr(settings, 'AUTH_CACHE_TTL_SECONDS', 60),
+    enabled=getattr(settings, 'AUTH_CACHE_ENABLED', True),
+)
+
+membership_cache = TTLLRUCache(
+    max_entries=getattr(settings, 'MEMBERSHIP_CACHE_MAX_ENTRIES', 20000),
+    ttl_seconds=getattr(settings, 'MEMBERSHIP_CACHE_TTL_SECONDS', 60),
+    enabled=getattr(settings, 'MEMBERSHIP_CACHE_ENABLED', True),
+)
+
+model_cache = TTLLRUCache(
+    max_entries=getattr(settings, 'ML_MODEL_CACHE_MAX_ENTRIES', 64),
+    ttl_seconds=getattr(settings, 'ML_MODEL_CACHE_TTL_SECONDS', 3600),
+    enabled=getattr(settings, 'ML_MODEL_CACHE_ENABLED', True),
+)
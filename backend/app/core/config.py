@@ -45,6 +45,64 @@ class Settings(BaseSettings):
     # Stable development API port. Frontend dev server expects backend on port 8002.
     # Do not change this lightly; update frontend `.env` if you intentionally change it.
     API_PORT: int = 8002
+    # Materialized analytics views (ml_transactions, analytics_monthly,
+    # analytics_top_items) are refreshed every N seconds, or earlier once
+    # this many transaction writes have happened. 0 disables either trigger.
+    MATVIEW_REFRESH_INTERVAL_SECONDS: int = 300
+    MATVIEW_REFRESH_WRITE_THRESHOLD: int = 200
+    # In-process analytics result cache (keyed on endpoint, business, role and
+    # business data version). Set ANALYTICS_CACHE_ENABLED=false to debug.
+    ANALYTICS_CACHE_ENABLED: bool = True
+    ANALYTICS_CACHE_MAX_ENTRIES: int = 2048
+    ANALYTICS_CACHE_TTL_SECONDS: int = 600
+    # Token subject -> user cache used by get_current_user. Password change
+    # and user deletion invalidate it locally; other workers see the change
+    # within AUTH_CACHE_TTL_SECONDS.
+    AUTH_CACHE_ENABLED: bool = True
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    # (user, business) -> role cache behind the get_business_access
+    # dependency. Member and business writes invalidate it locally; other
+    # workers see the change within MEMBERSHIP_CACHE_TTL_SECONDS.
+    MEMBERSHIP_CACHE_ENABLED: bool = True
+    MEMBERSHIP_CACHE_MAX_ENTRIES: int = 20000
+    MEMBERSHIP_CACHE_TTL_SECONDS: int = 60
+    # Database pools (applied to the sync and the async engine alike) and the
+    # AnyIO threadpool running sync routes. THREADPOOL_TOKENS is capped at
+    # DB_POOL_SIZE + DB_MAX_OVERFLOW since each sync route holds a connection.
+    # DB_STATEMENT_TIMEOUT_MS=0 disables the per-connection statement_timeout.
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 30000
+    THREADPOOL_TOKENS: int = 30
+    # Rendered receipt PDFs are cached on disk (default backend/cache/receipts)
+    # per transaction, visibility variant and content hash. Cold renders run
+    # in RECEIPT_RENDER_WORKERS processes (0 renders on a thread instead).
+    RECEIPT_CACHE_ENABLED: bool = True
+    RECEIPT_CACHE_DIR: str | None = None
+    RECEIPT_RENDER_WORKERS: int = 2
+    # Uploaded invoices (default backend/uploads), stored once per business
+    # under their SHA-256; larger uploads are rejected with 413.
+    INVOICE_STORAGE_DIR: str | None = None
+    INVOICE_MAX_UPLOAD_BYTES: int = 20 * 1024 * 1024
+    # Loaded profit models kept in memory (LRU). Entries are revalidated
+    # against the model files' mtime on every use.
+    ML_MODEL_CACHE_ENABLED: bool = True
+    ML_MODEL_CACHE_MAX_ENTRIES: int = 64
+    ML_MODEL_CACHE_TTL_SECONDS: int = 3600
+    # POST /ml/train jobs: ML_TRAIN_WORKERS fits run at once in worker
+    # processes (0 runs them on a single background thread); at most
+    # ML_TRAIN_MAX_PENDING businesses may have a job waiting. A job with no
+    # result ML_TRAIN_JOB_TIMEOUT_SECONDS after it was queued is failed.
+    ML_TRAIN_WORKERS: int = 1
+    ML_TRAIN_MAX_PENDING: int = 50
+    ML_TRAIN_JOB_TIMEOUT_SECONDS: int = 3600
+    # Mount the unauthenticated /diagnostics endpoints (cache, receipt,
+    # model, auth and pool counters). For local debugging only.
+    DIAGNOSTICS_ENABLED: bool = False
 
     class Config:
         env_file = '.env'
@@ -1,10 +1,18 @@
+import base64
+from dataclasses import dataclass
 from sqlalchemy.orm import Session
 from . import models, security
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import func, text
+from sqlalchemy import func, text, Date, and_, or_, delete, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from .db.session import engine
+from .db import matviews
+from .core.cache import user_cache, membership_cache
+from . import receipts
 from .models import TransactionTypeEnum
 
 
@@ -91,6 +99,7 @@ def authenticate_user(db: Session, username: str, password: str):
 def create_business(db: Session, owner_id: int, name: str, industry: str = None):
     b = models.Business(owner_id=owner_id, name=name, industry=industry)
     db.add(b); db.commit(); db.refresh(b)
+    membership_cache.invalidate((owner_id, b.id))
     return b
 
 
@@ -98,38 +107,100 @@ def list_businesses_for_owner(db: Session, owner_id: int):
     return db.query(models.Business).filter(models.Business.owner_id == owner_id).all()
 
 
+@dataclass(frozen=True)
+class BusinessAccess:
+    """Detached snapshot of a business plus the user's role in it (None when
+    the user is neither owner nor member); safe to cache across requests."""
+    id: int
+    owner_id: int
+    name: str
+    industry: str = None
+    created_at: datetime = None
+    role: str = None
+
+
+def get_business_access(db: Session, user_id: int, business_id: int):
+    """Resolve a business and the user's role in it with one joined query.
+
+    Returns a `BusinessAccess`, or None when the business does not exist.
+    Results are kept in `membership_cache`; `create_business`, `add_member`
+    and `delete_member` invalidate the affected entry.
+    """
+    key = (user_id, business_id)
+    if membership_cache.enabled:
+        cached = membership_cache.get(key)
+        if cached is not None:
+            return cached
+    row = (
+        db.query(models.Business, models.BusinessMember.role)
+        .outerjoin(models.BusinessMember, and_(
+            models.BusinessMember.business_id == models.Business.id,
+            models.BusinessMember.user_id == user_id,
+        ))
+        .filter(models.Business.id == business_id)
+        .first()
+    )
+    if row is None:
+        return None
+    b, member_role = row
+    role = 'owner' if b.owner_id == user_id else getattr(member_role, 'value', member_role)
+    access = BusinessAccess(id=b.id, owner_id=b.owner_id, name=b.name, industry=b.industry, created_at=b.created_at, role=role)
+    if membership_cache.enabled:
+        membership_cache.set(key, access)
+    return access
+
+
 def list_businesses_for_user(db: Session, user_id: int):
-    # return businesses owned by user or where user is a member
+    """Businesses the user owns or is a member of, as `BusinessAccess` rows.
+
+    One outer-joined query returns each business with the user's role, so
+    listing does not cost a role lookup per business. The rows also warm
+    `membership_cache` for the dashboards the user is likely to open next.
+    """
     from sqlalchemy import or_
     from .models import Business, BusinessMember
-    member_subq = db.query(BusinessMember.business_id).filter(BusinessMember.user_id == user_id).subquery()
-    return db.query(Business).filter(or_(Business.owner_id == user_id, Business.id.in_(member_subq))).all()
+    rows = (
+        db.query(Business, BusinessMember.role)
+        .outerjoin(BusinessMember, and_(BusinessMember.business_id == Business.id, BusinessMember.user_id == user_id))
+        .filter(or_(Business.owner_id == user_id, BusinessMember.id.isnot(None)))
+        .order_by(Business.id)
+        .all()
+    )
+    out = []
+    for b, member_role in rows:
+        role = 'owner' if b.owner_id == user_id else getattr(member_role, 'value', member_role)
+        access = BusinessAccess(id=b.id, owner_id=b.owner_id, name=b.name, industry=b.industry, created_at=b.created_at, role=role)
+        if membership_cache.enabled:
+            membership_cache.set((user_id, b.id), access)
+        out.append(access)
+    return out
 
 
 def get_user_business_role(db: Session, user_id: int, business_id: int):
     """Return 'owner' | 'accountant' | 'staff' or None depending on user's relation to the business."""
-    b = db.query(models.Business).filter(models.Business.id == business_id).first()
-    if not b:
-        return None
-    if b.owner_id == user_id:
-        return 'owner'
-    m = db.query(models.BusinessMember).filter(models.BusinessMember.business_id == business_id, models.BusinessMember.user_id == user_id).first()
-    if m:
-        return m.role
-    return None
+    access = get_business_access(db, user_id, business_id)
+    return access.role if access is not None else None
 
 
-def create_transaction(db: Session, business_id: int, ttype: str, amount: float, category: str = None):
+def create_transaction(db: Session, business_id: int, ttype: str, amount: float, category: str = None, created_at: datetime = None):
     # Validate transaction type early and fail fast for invalid values.
     _ = _normalize_tx_type(ttype)
     # store original enum/string value into the DB model; SQLAlchemy will
     # coerce when using the SAEnum column type.
-    tx = models.Transaction(business_id=business_id, type=ttype, amount=amount, category=category)
-    db.add(tx); db.commit(); db.refresh(tx)
-    return tx
+    tx = models.Transaction(business_id=business_id, type=ttype, amount=amount, category=category, created_at=created_at)
+    try:
+        db.add(tx); db.flush()
+        _apply_daily_totals(db, tx)
+        bump_data_version(db, business_id)
+        db.commit(); db.refresh(tx)
+        matviews.note_write()
+        return tx
+    except Exception:
+        db.rollback()
+        raise
 
 
-def create_transaction_with_inventory(db: Session, business_id: int, ttype: str, amount: float, category: str = None, inventory_id: int = None, used_quantity: int = None, source: str = None):
+def create_transaction_with_inventory(db: Session, business_id: int, ttype: str, amount: float, category: str = None, inventory_id: int = None, used_quantity: int = None, source: str = None, created_at: datetime = None):
     """Create a transaction and, if linked to inventory, adjust inventory atomically.
 
         Business rules (inventory stock behavior):
@@ -178,18 +249,273 @@ def create_transaction_with_inventory(db: Session, business_id: int, ttype: str,
                 else:
                     # Do NOT auto-fill missing categories as 'Uncategorized'. Leave as None.
                     category = None
-        tx = models.Transaction(business_id=business_id, type=ttype, amount=tx_amount, category=category, inventory_id=inventory_id, used_quantity=used_quantity or 0, source=source)
+        tx = models.Transaction(business_id=business_id, type=ttype, amount=tx_amount, category=category, inventory_id=inventory_id, used_quantity=used_quantity or 0, source=source, created_at=created_at)
+        _snapshot_cost(tx, inv if inventory_id is not None else None)
         db.add(tx)
+        db.flush()
+        _apply_daily_totals(db, tx)
+        bump_data_version(db, business_id)
         db.commit()
         db.refresh(tx)
+        matviews.note_write()
         return tx
     except Exception:
         db.rollback()
         raise
 
 
-def list_transactions_for_business(db: Session, business_id: int):
-    return db.query(models.Transaction).filter(models.Transaction.business_id == business_id).order_by(models.Transaction.created_at.desc()).all()
+@dataclass
+class BatchResult:
+    """Outcome of `create_transactions_batch`.
+
+    `errors` holds {'index': position in the input, 'detail': message} for
+    every rejected row; `ids` are the created transaction ids.
+    """
+    ids: list
+    errors: list
+
+
+def create_transactions_batch(db: Session, business_id: int, items, atomic: bool = True, created_at: datetime = None) -> BatchResult:
+    """Create many transactions for one business in a single DB transaction.
+
+    `items` are mappings (or objects) with the `create_transaction_with_inventory`
+    fields: type, amount, category, inventory_id, used_quantity, source.
+    Rows are validated first; each linked inventory row is then locked once,
+    in id order, and checked/adjusted in input order with the same stock
+    rules as the single-row path. Surviving rows go in through one batched
+    INSERT, with one rollup upsert per (day, category) and one inventory
+    UPDATE per item.
+
+    With `atomic` any row error rejects the whole batch (nothing is written);
+    otherwise bad rows are skipped and reported.
+    """
+    def field(item, name):
+        return item.get(name) if isinstance(item, dict) else getattr(item, name, None)
+
+    errors = []
+    rows = []
+    for index, item in enumerate(items):
+        try:
+            ttype = field(item, 'type')
+            norm = _normalize_tx_type(ttype)
+            amount = field(item, 'amount')
+            if amount is None:
+                raise ValueError('amount is required')
+            uq = int(field(item, 'used_quantity') or 0)
+            if uq < 0:
+                raise ValueError('used_quantity must be non-negative')
+        except (TypeError, ValueError) as ve:
+            errors.append({'index': index, 'detail': str(ve)})
+            continue
+        rows.append({
+            'index': index, 'norm': norm, 'type': TransactionTypeEnum(norm.capitalize()), 'amount': Decimal(str(amount)),
+            'category': field(item, 'category'), 'inventory_id': field(item, 'inventory_id'), 'used_quantity': uq, 'source': field(item, 'source'),
+        })
+
+    try:
+        inv_ids = sorted({r['inventory_id'] for r in rows if r['inventory_id'] is not None})
+        inventory = {}
+        if inv_ids:
+            # one SELECT .. FOR UPDATE in id order, so concurrent batches
+            # touching the same items cannot deadlock
+            q = (
+                db.query(models.Inventory)
+                .filter(models.Inventory.business_id == business_id, models.Inventory.id.in_(inv_ids))
+                .order_by(models.Inventory.id)
+                .with_for_update()
+            )
+            inventory = {inv.id: inv for inv in q.all()}
+        stock = {inv_id: inv.quantity for inv_id, inv in inventory.items()}
+
+        accepted = []
+        for r in rows:
+            inv = None
+            if r['inventory_id'] is not None:
+                inv = inventory.get(r['inventory_id'])
+                if inv is None:
+                    errors.append({'index': r['index'], 'detail': 'Inventory item not found'})
+                    continue
+                uq = r['used_quantity']
+                if r['norm'] == 'income' and uq > 0:
+                    if stock[inv.id] < uq:
+                        errors.append({'index': r['index'], 'detail': 'Insufficient inventory quantity'})
+                        continue
+                    stock[inv.id] -= uq
+                elif r['norm'] == 'expense':
+                    stock[inv.id] += uq
+                if r['category'] is None or (isinstance(r['category'], str) and r['category'].strip() == ''):
+                    inv_cat = getattr(inv, 'category', None)
+                    r['category'] = inv_cat if isinstance(inv_cat, str) and inv_cat.strip() != '' else None
+            r['inventory'] = inv
+            accepted.append(r)
+        errors.sort(key=lambda e: e['index'])
+
+        if (errors and atomic) or not accepted:
+            db.rollback()
+            return BatchResult(ids=[], errors=errors)
+
+        created_at = created_at or datetime.utcnow()
+        values = []
+        buckets = {}
+        for r in accepted:
+            tx = SimpleNamespace(type=r['type'], inventory_id=r['inventory_id'], used_quantity=r['used_quantity'])
+            _snapshot_cost(tx, r['inventory'])
+            values.append({
+                'business_id': business_id, 'type': r['type'], 'amount': r['amount'], 'category': r['category'],
+                'inventory_id': r['inventory_id'], 'used_quantity': r['used_quantity'], 'source': r['source'],
+                'unit_cost': tx.unit_cost, 'cost_amount': tx.cost_amount, 'created_at': created_at,
+            })
+            b = buckets.setdefault(_rollup_category(r['category'], r['inventory']), dict.fromkeys(_DAILY_TOTAL_FIELDS, 0))
+            if r['norm'] == 'income':
+                b['income'] += r['amount']
+                b['income_count'] += 1
+                b['units_sold'] += r['used_quantity']
+                b['cogs'] += tx.cost_amount or 0
+            else:
+                b['operating_expense'] += r['amount']
+                b['expense_count'] += 1
+
+        for inv_id, inv in inventory.items():
+            if stock[inv_id] != inv.quantity:
+                inv.quantity = stock[inv_id]
+        db.flush()
+        # executemany with RETURNING is sent as multi-row INSERT .. VALUES batches
+        tx_table = models.Transaction.__table__
+        ids = list(db.execute(tx_table.insert().returning(tx_table.c.id), values).scalars())
+
+        _lock_business_rollup(db, business_id)
+        table = models.BusinessDailyTotal.__table__
+        stmt = pg_insert(table).values([{'business_id': business_id, 'day': created_at.date(), 'category': cat, **b} for cat, b in buckets.items()])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['business_id', 'day', 'category'],
+            set_={k: table.c[k] + stmt.excluded[k] for k in _DAILY_TOTAL_FIELDS},
+        )
+        db.execute(stmt)
+        bump_data_version(db, business_id)
+        db.commit()
+        matviews.note_write(len(ids))
+        return BatchResult(ids=ids, errors=errors)
+    except Exception:
+        db.rollback()
+        raise
+
+
+TRANSACTION_PAGE_SIZE = 100
+TRANSACTION_PAGE_SIZE_MAX = 500
+
+
+def encode_transaction_cursor(created_at, tx_id: int) -> str:
+    """Opaque keyset cursor for the (created_at, id) position of a transaction."""
+    raw = f"{created_at.isoformat() if created_at is not None else ''}|{tx_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_transaction_cursor(cursor: str):
+    """Inverse of `encode_transaction_cursor`; raises ValueError for a malformed token."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        ts, tx_id = raw.rsplit('|', 1)
+        return (datetime.fromisoformat(ts) if ts else None), int(tx_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def _filter_transactions(q, business_id: int, cursor: str = None, start_date=None, end_date=None, ttype=None, category=None, inventory_id=None, source=None):
+    """Apply the listing filters and keyset position to a Transaction query.
+
+    Every filter is an equality or range on a column that leads, after
+    business_id, one of the `ix_transactions_business_*` indexes, so a page
+    is an index range scan rather than a sort of the whole history.
+    start_date/end_date are inclusive dates.
+
+    Rows without `created_at` sort first (PostgreSQL's default for DESC,
+    made explicit so sqlite agrees); a cursor inside that block continues
+    with the rest of the block and then every dated row.
+    """
+    T = models.Transaction
+    q = q.filter(T.business_id == business_id)
+    if start_date is not None:
+        q = q.filter(T.created_at >= datetime.combine(_as_date(start_date), datetime.min.time()))
+    if end_date is not None:
+        q = q.filter(T.created_at < datetime.combine(_as_date(end_date), datetime.min.time()) + timedelta(days=1))
+    if ttype is not None:
+        q = q.filter(T.type == TransactionTypeEnum(_normalize_tx_type(ttype).capitalize()))
+    if category is not None:
+        q = q.filter(T.category == category)
+    if inventory_id is not None:
+        q = q.filter(T.inventory_id == inventory_id)
+    if source is not None:
+        q = q.filter(T.source == source)
+    if cursor:
+        created_at, tx_id = decode_transaction_cursor(cursor)
+        if created_at is None:
+            q = q.filter(or_(and_(T.created_at.is_(None), T.id < tx_id), T.created_at.isnot(None)))
+        else:
+            q = q.filter(tuple_(T.created_at, T.id) < tuple_(created_at, tx_id))
+    return q.order_by(T.created_at.desc().nulls_first(), T.id.desc())
+
+
+def _page(q, limit: int):
+    """Run a keyset-ordered query for one page; returns (rows, next_cursor or None)."""
+    limit = max(1, min(int(limit or TRANSACTION_PAGE_SIZE), TRANSACTION_PAGE_SIZE_MAX))
+    rows = q.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_transaction_cursor(rows[-1].created_at, rows[-1].id)
+
+
+def list_transactions_for_business(db: Session, business_id: int, limit: int = TRANSACTION_PAGE_SIZE, cursor: str = None, **filters):
+    """One page of a business's transactions, newest first.
+
+    Returns (transactions, next_cursor); next_cursor is None on the last
+    page. `filters` are the keyword filters of `_filter_transactions`.
+    """
+    return _page(_filter_transactions(db.query(models.Transaction), business_id, cursor, **filters), limit)
+
+
+TRANSACTION_ROW_FIELDS = ('id', 'created_at', 'item_name', 'used_quantity', 'amount', 'type', 'category', 'invoice_url', 'source', 'inventory_id')
+
+
+def _transaction_rows_query(db: Session):
+    T = models.Transaction
+    return (
+        db.query(T.id, T.created_at, models.Inventory.item_name, T.used_quantity, T.amount, T.type, T.category, T.invoice_url, T.source, T.inventory_id)
+        .outerjoin(models.Inventory, T.inventory_id == models.Inventory.id)
+    )
+
+
+def _transaction_row(r) -> dict:
+    return {
+        'id': int(r.id),
+        'created_at': r.created_at.isoformat() if r.created_at is not None else None,
+        'item_name': r.item_name,
+        'used_quantity': int(r.used_quantity or 0),
+        'amount': float(r.amount or 0.0),
+        'type': (r.type.value if hasattr(r.type, 'value') else str(r.type)) if r.type is not None else None,
+        'category': r.category,
+        'invoice_url': r.invoice_url,
+        'source': r.source,
+        'inventory_id': int(r.inventory_id) if r.inventory_id is not None else None
+    }
+
+
+def list_transactions_with_items(db: Session, business_id: int, limit: int = TRANSACTION_PAGE_SIZE, cursor: str = None, **filters):
+    """Like `list_transactions_for_business`, as display dicts carrying the inventory item name."""
+    rows, next_cursor = _page(_filter_transactions(_transaction_rows_query(db), business_id, cursor, **filters), limit)
+    return [_transaction_row(r) for r in rows], next_cursor
+
+
+def iter_transactions_with_items(db: Session, business_id: int, batch_size: int = 1000, **filters):
+    """Yield every matching transaction, oldest first, as `list_transactions_with_items` dicts.
+
+    Rows come from a server-side cursor (`yield_per`) in batches of
+    `batch_size`, so memory use does not grow with the history size.
+    """
+    q = _filter_transactions(_transaction_rows_query(db), business_id, **filters)
+    q = q.order_by(None).order_by(models.Transaction.created_at.asc().nulls_last(), models.Transaction.id.asc())
+    for r in q.yield_per(batch_size):
+        yield _transaction_row(r)
 
 
 def create_inventory(db: Session, business_id: int, item_name: str, quantity: int, cost_price: float, category: str = None):
@@ -204,6 +530,7 @@ def create_inventory(db: Session, business_id: int, item_name: str, quantity: in
     it = models.Inventory(business_id=business_id, item_name=item_name, quantity=int(quantity), cost_price=cost_price, category=category)
     try:
         db.add(it)
+        bump_data_version(db, business_id)
         db.commit()
         db.refresh(it)
         return it
@@ -226,33 +553,351 @@ def list_inventory_for_business(db: Session, business_id: int):
 
 
 def summary_for_business(db: Session, business_id: int):
-    """Return separated totals. Unknown/invalid types are ignored to avoid
-    accidentally mixing income and expense values.
+    """Return separated income and expense totals for a business."""
+    totals = daily_totals(db, business_id)
+    return {'income': totals['income'], 'expense': totals['operating_expense']}
+
+
+def _rollup_category(category, inventory=None) -> str:
+    # Resolve the rollup category the same way analytics does: the
+    # transaction's own category first, then the linked inventory category.
+    for c in (category, getattr(inventory, 'category', None)):
+        if isinstance(c, str) and c.strip() != '':
+            return c.strip()
+    return ''
+
+
+def _snapshot_cost(tx, inventory=None, unit_cost=None):
+    """Set `unit_cost` / `cost_amount` on a transaction about to be written.
+
+    Only inventory-linked Income (sales) carry a cost; the unit cost comes
+    from `unit_cost` when given, else from the inventory's current
+    `cost_price`. Quantity follows the COGS formula COALESCE(used_quantity, 1).
     """
-    income = 0.0
-    expense = 0.0
-    txs = db.query(models.Transaction).filter(models.Transaction.business_id == business_id).all()
-    for t in txs:
-        try:
-            norm = _normalize_tx_type(t.type)
-        except ValueError:
-            # ignore unexpected transaction types
-            continue
-        if norm == 'income':
-            income += float(t.amount)
-        elif norm == 'expense':
-            expense += float(t.amount)
-    return {'income': income, 'expense': expense}
+    if _normalize_tx_type(tx.type) != 'income' or tx.inventory_id is None:
+        tx.unit_cost = None
+        tx.cost_amount = None
+        return
+    if unit_cost is None:
+        unit_cost = getattr(inventory, 'cost_price', None) or 0
+    unit_cost = Decimal(str(unit_cost))
+    qty = tx.used_quantity if tx.used_quantity is not None else 1
+    tx.unit_cost = unit_cost
+    tx.cost_amount = unit_cost * int(qty)
+
+
+def backfill_transaction_costs(db: Session, business_id: int = None) -> int:
+    """Snapshot `unit_cost` / `cost_amount` on sales written before they existed.
+
+    Uses each item's current `cost_price`, i.e. exactly what COGS reported
+    until now. Rows that already carry a snapshot are left alone. Commits and
+    returns the number of transactions updated.
+    """
+    T = models.Transaction
+    I = models.Inventory
+    unit_cost = select(func.coalesce(I.cost_price, 0)).where(I.id == T.inventory_id).scalar_subquery()
+    stmt = (
+        T.__table__.update()
+        .where(T.type == TransactionTypeEnum.Income, T.inventory_id.isnot(None), T.cost_amount.is_(None))
+        .values(unit_cost=unit_cost, cost_amount=func.coalesce(T.used_quantity, 1) * unit_cost)
+    )
+    if business_id is not None:
+        stmt = stmt.where(T.business_id == business_id)
+    try:
+        res = db.execute(stmt)
+        db.commit()
+        return int(res.rowcount or 0)
+    except Exception:
+        db.rollback()
+        raise
+
+
+# pg advisory lock class for per-business rollup locks (key: class, business_id)
+_ROLLUP_LOCK_KEY = 0x62697A02
+
+
+def _lock_business_rollup(db: Session, business_id: int, exclusive: bool = False):
+    """Take a business's rollup lock until the end of the DB transaction.
+
+    Incremental writers take it shared, so they never wait for each other;
+    `rebuild_daily_totals` takes it exclusive for the business it rebuilds,
+    leaving other businesses' writers alone. No-op outside PostgreSQL.
+    """
+    if db.get_bind().dialect.name != 'postgresql':
+        return
+    fn = 'pg_advisory_xact_lock' if exclusive else 'pg_advisory_xact_lock_shared'
+    db.execute(text(f'SELECT {fn}(:k, :bid)'), {'k': _ROLLUP_LOCK_KEY, 'bid': int(business_id)})
+
+
+def _apply_daily_totals(db: Session, tx, sign: int = 1):
+    """Add (sign=1) or remove (sign=-1) a transaction's contribution to
+    `business_daily_totals` inside the caller's DB transaction.
+
+    Uses INSERT .. ON CONFLICT DO UPDATE so concurrent writers touching the
+    same (business, day, category) bucket never lose increments.
+    """
+    norm = _normalize_tx_type(tx.type)
+    category = _rollup_category(tx.category)
+    if category == '' and tx.inventory_id is not None:
+        category = _rollup_category(None, get_inventory_by_id(db, tx.inventory_id))
+    amount = Decimal(str(tx.amount or 0)) * sign
+    values = {'income': 0, 'operating_expense': 0, 'cogs': 0, 'units_sold': 0, 'income_count': 0, 'expense_count': 0}
+    if norm == 'income':
+        values['income'] = amount
+        values['income_count'] = sign
+        values['units_sold'] = int(tx.used_quantity or 0) * sign
+        values['cogs'] = Decimal(str(tx.cost_amount or 0)) * sign
+    else:
+        values['operating_expense'] = amount
+        values['expense_count'] = sign
+    day = (tx.created_at or datetime.utcnow()).date()
+    _lock_business_rollup(db, tx.business_id)
+    table = models.BusinessDailyTotal.__table__
+    stmt = pg_insert(table).values(business_id=tx.business_id, day=day, category=category, **values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['business_id', 'day', 'category'],
+        set_={k: table.c[k] + stmt.excluded[k] for k in values},
+    )
+    db.execute(stmt)
+
+
+_DAILY_TOTAL_FIELDS = ('income', 'operating_expense', 'cogs', 'units_sold', 'income_count', 'expense_count')
+
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _daily_totals_from_row(row):
+    out = {
+        'income': float(row.income or 0.0),
+        'operating_expense': float(row.operating_expense or 0.0),
+        'cogs': float(row.cogs or 0.0),
+        'units_sold': int(row.units_sold or 0),
+        'income_count': int(row.income_count or 0),
+        'expense_count': int(row.expense_count or 0),
+    }
+    out['count'] = out['income_count'] + out['expense_count']
+    return out
+
+
+def daily_totals(db: Session, business_id: int, start=None, end=None, group_by: str = None):
+    """Sum the `business_daily_totals` rollup for a business.
+
+    `start` (inclusive) and `end` (exclusive) are optional dates/datetimes
+    and are applied at day granularity. With `group_by=None` a single totals
+    dict is returned; with 'day', 'month' ('YYYY-MM') or 'category' a list of
+    totals dicts ordered by that key, each carrying the key under its name.
+    Reads O(days x categories) rows instead of scanning `transactions`.
+    """
+    T = models.BusinessDailyTotal
+    sums = [func.coalesce(func.sum(getattr(T, k)), 0).label(k) for k in _DAILY_TOTAL_FIELDS]
+    if group_by == 'day':
+        key = T.day
+    elif group_by == 'month':
+        key = func.to_char(func.date_trunc('month', T.day), 'YYYY-MM')
+    elif group_by == 'category':
+        key = T.category
+    elif group_by is None:
+        key = None
+    else:
+        raise ValueError(f"Invalid group_by '{group_by}'. allowed: day, month, category")
+    q = db.query(key.label('key'), *sums) if key is not None else db.query(*sums)
+    q = q.filter(T.business_id == business_id)
+    if start is not None:
+        q = q.filter(T.day >= _as_date(start))
+    if end is not None:
+        q = q.filter(T.day < _as_date(end))
+    if key is None:
+        return _daily_totals_from_row(q.one())
+    # buckets whose transactions were all deleted linger as zero rows; skip them
+    rows = q.group_by(key).having(func.sum(T.income_count + T.expense_count) > 0).order_by(key).all()
+    out = []
+    for row in rows:
+        entry = _daily_totals_from_row(row)
+        entry[group_by] = row.key
+        out.append(entry)
+    return out
+
+
+def period_totals(db: Session, business_id: int, periods: dict):
+    """Rollup totals for several date windows in one aggregate query.
+
+    `periods` maps a name to `(start, end)` (either may be None, meaning
+    unbounded); returns `{name: totals}` with the same keys as `daily_totals`.
+    Each window becomes a set of FILTERed SUMs over a single scan.
+    """
+    T = models.BusinessDailyTotal
+    cols = []
+    for name, (start, end) in periods.items():
+        conds = []
+        if start is not None:
+            conds.append(T.day >= _as_date(start))
+        if end is not None:
+            conds.append(T.day < _as_date(end))
+        for k in _DAILY_TOTAL_FIELDS:
+            total = func.sum(getattr(T, k))
+            if conds:
+                total = total.filter(and_(*conds))
+            cols.append(func.coalesce(total, 0).label(f'{name}__{k}'))
+    row = db.execute(select(*cols).where(T.business_id == business_id)).one()._mapping
+    return {
+        name: _daily_totals_from_row(SimpleNamespace(**{k: row[f'{name}__{k}'] for k in _DAILY_TOTAL_FIELDS}))
+        for name in periods
+    }
+
+
+def _transaction_totals_columns():
+    # One aggregate pass over `transactions`: each total is a filtered SUM /
+    # COUNT so income and expense are computed side by side without loading
+    # ORM rows. Labelled like the rollup columns (`_DAILY_TOTAL_FIELDS`).
+    T = models.Transaction
+    is_income = T.type == TransactionTypeEnum.Income
+    is_expense = T.type == TransactionTypeEnum.Expense
+    return [
+        func.coalesce(func.sum(T.amount).filter(is_income), 0).label('income'),
+        func.coalesce(func.sum(T.amount).filter(is_expense), 0).label('operating_expense'),
+        func.coalesce(func.sum(T.cost_amount).filter(is_income), 0).label('cogs'),
+        func.coalesce(func.sum(T.used_quantity).filter(is_income), 0).label('units_sold'),
+        func.count(T.id).filter(is_income).label('income_count'),
+        func.count(T.id).filter(is_expense).label('expense_count'),
+    ]
+
+
+def transaction_totals(db: Session, business_id: int, start=None, end=None):
+    """Totals for a business aggregated straight from `transactions` in one query.
+
+    Same keys as `daily_totals`; `start` (inclusive) and `end` (exclusive)
+    are optional datetimes compared against `created_at`. The API reads the
+    rollup instead, which is rebuilt from the same aggregate columns; this
+    is the rollup-free path that `scripts/bench_aggregations.py` measures.
+    """
+    T = models.Transaction
+    q = db.query(*_transaction_totals_columns()).filter(T.business_id == business_id)
+    if start is not None:
+        q = q.filter(T.created_at >= start)
+    if end is not None:
+        q = q.filter(T.created_at < end)
+    return _daily_totals_from_row(q.one())
+
+
+def _daily_totals_source(business_id: int = None):
+    """SELECT recomputing rollup rows from raw transactions (for rebuild/verify)."""
+    T = models.Transaction
+    I = models.Inventory
+    day = func.date(T.created_at, type_=Date)
+    category = func.coalesce(func.nullif(func.trim(T.category), ''), func.nullif(func.trim(I.category), ''), '')
+    stmt = (
+        select(
+            T.business_id.label('business_id'),
+            day.label('day'),
+            category.label('category'),
+            *_transaction_totals_columns(),
+        )
+        .select_from(T)
+        .outerjoin(I, I.id == T.inventory_id)
+        .where(T.created_at.isnot(None))
+        .group_by(T.business_id, day, category)
+    )
+    if business_id is not None:
+        stmt = stmt.where(T.business_id == business_id)
+    return stmt
+
+
+def rebuild_daily_totals(db: Session, business_id: int = None) -> int:
+    """Recompute `business_daily_totals` from raw transactions and commit.
+
+    Rebuilds one business, or every business when `business_id` is None.
+    Returns the number of rollup rows written.
+    """
+    T = models.BusinessDailyTotal
+    try:
+        # block concurrent rollup writers so no increment lands between the
+        # DELETE and the re-aggregation below: only the rebuilt business's
+        # writers wait, unless every business is rebuilt
+        if business_id is not None:
+            _lock_business_rollup(db, business_id, exclusive=True)
+        elif db.bind.dialect.name == 'postgresql':
+            db.execute(text('LOCK TABLE business_daily_totals IN EXCLUSIVE MODE'))
+        stmt = delete(T)
+        if business_id is not None:
+            stmt = stmt.where(T.business_id == business_id)
+        db.execute(stmt)
+        cols = ['business_id', 'day', 'category', *_DAILY_TOTAL_FIELDS]
+        res = db.execute(T.__table__.insert().from_select(cols, _daily_totals_source(business_id)))
+        # the rebuilt figures may differ from what readers cached
+        bids = [business_id] if business_id is not None else [b for (b,) in db.query(models.Business.id).all()]
+        for bid in bids:
+            bump_data_version(db, bid)
+        db.commit()
+        return int(res.rowcount or 0)
+    except Exception:
+        db.rollback()
+        raise
+
+
+def verify_daily_totals(db: Session, business_id: int = None):
+    """Compare the rollup with raw transactions without modifying anything.
+
+    Returns a list of drift records: {business_id, day, category, field,
+    expected, actual}. An empty list means the rollup is consistent.
+    """
+    expected = {}
+    for row in db.execute(_daily_totals_source(business_id)).fetchall():
+        expected[(row.business_id, _as_date(row.day), row.category)] = _daily_totals_from_row(row)
+    T = models.BusinessDailyTotal
+    q = db.query(T)
+    if business_id is not None:
+        q = q.filter(T.business_id == business_id)
+    actual = {(r.business_id, r.day, r.category): _daily_totals_from_row(r) for r in q.all()}
+    zero = {k: 0 for k in _DAILY_TOTAL_FIELDS}
+    drift = []
+    for key in sorted(set(expected) | set(actual), key=lambda k: (k[0], k[1], k[2])):
+        exp = expected.get(key, zero)
+        act = actual.get(key, zero)
+        for field in _DAILY_TOTAL_FIELDS:
+            if abs(float(exp[field]) - float(act[field])) > 0.005:
+                drift.append({'business_id': key[0], 'day': key[1], 'category': key[2], 'field': field, 'expected': exp[field], 'actual': act[field]})
+    return drift
+
+
+def bump_data_version(db: Session, business_id: int):
+    """Increment the business data version inside the caller's DB transaction.
+
+    Every transaction and inventory write path calls this so analytics
+    cache entries keyed on the previous version stop matching.
+    """
+    table = models.BusinessDataVersion.__table__
+    stmt = pg_insert(table).values(business_id=business_id, version=1)
+    stmt = stmt.on_conflict_do_update(index_elements=['business_id'], set_={'version': table.c.version + 1})
+    db.execute(stmt)
+
+
+def get_data_version(db: Session, business_id: int) -> int:
+    v = db.query(models.BusinessDataVersion.version).filter(models.BusinessDataVersion.business_id == business_id).scalar()
+    return int(v or 0)
 
 
 def add_member(db: Session, business_id: int, user_id: int, role: str):
     m = models.BusinessMember(business_id=business_id, user_id=user_id, role=role)
     db.add(m); db.commit(); db.refresh(m)
+    membership_cache.invalidate((user_id, business_id))
     return m
 
 
 def list_members(db: Session, business_id: int):
-    return db.query(models.BusinessMember).filter(models.BusinessMember.business_id == business_id).all()
+    """Members of a business with their usernames, joined in one query."""
+    rows = (
+        db.query(models.BusinessMember, models.User.username)
+        .join(models.User, models.User.id == models.BusinessMember.user_id)
+        .filter(models.BusinessMember.business_id == business_id)
+        .order_by(models.BusinessMember.id)
+        .all()
+    )
+    return [
+        {'id': m.id, 'business_id': m.business_id, 'user_id': m.user_id, 'role': getattr(m.role, 'value', m.role), 'username': username}
+        for m, username in rows
+    ]
 
 
 def get_business(db: Session, business_id: int):
@@ -268,13 +913,10 @@ def delete_member(db: Session, business_id: int, user_id: int):
     if not m:
         return False
     db.delete(m); db.commit()
+    membership_cache.invalidate((user_id, business_id))
     return True
 
 
-def transactions_count_for_business(db: Session, business_id: int):
-    return db.query(models.Transaction).filter(models.Transaction.business_id==business_id).count()
-
-
 def update_transaction(db: Session, tx_id: int, **fields):
     tx = db.query(models.Transaction).filter(models.Transaction.id == tx_id).first()
     if not tx:
@@ -287,6 +929,9 @@ def update_transaction(db: Session, tx_id: int, **fields):
         # transaction that consumes `used_quantity` reduces stock. Thus:
         #  - restore old consumed quantity (add back)
         #  - deduct new consumed quantity (subtract)
+        # remove the transaction's current contribution from the daily rollup;
+        # the updated values are re-applied after the fields change below
+        _apply_daily_totals(db, tx, sign=-1)
         old_inv_id = tx.inventory_id
         old_used = int(tx.used_quantity or 0)
         # previous and new transaction types (may be Enum or str)
@@ -338,10 +983,21 @@ def update_transaction(db: Session, tx_id: int, **fields):
         for k, v in fields.items():
             if v is not None and hasattr(tx, k):
                 setattr(tx, k, v)
+        # Keep the original unit cost while the sale stays linked to the same
+        # item; re-snapshot only when it is relinked (or becomes a sale).
+        if tx.inventory_id != old_inv_id or tx.unit_cost is None:
+            _snapshot_cost(tx, get_inventory_by_id(db, tx.inventory_id) if tx.inventory_id is not None else None)
+        else:
+            _snapshot_cost(tx, None, unit_cost=tx.unit_cost)
         # Do NOT use inventory rows to override or compute transaction amounts.
         # Transaction.amount is authoritative for financial analytics.
         db.add(tx)
+        db.flush()
+        _apply_daily_totals(db, tx)
+        bump_data_version(db, tx.business_id)
         db.commit(); db.refresh(tx)
+        matviews.note_write()
+        receipts.invalidate(tx_id)
         return tx
     except Exception:
         db.rollback()
@@ -367,14 +1023,34 @@ def delete_transaction(db: Session, tx_id: int):
                         raise ValueError('Cannot delete purchase transaction: inventory already used')
                     inv.quantity = inv.quantity - int(tx.used_quantity or 0)
                 db.add(inv)
+        _apply_daily_totals(db, tx, sign=-1)
+        bump_data_version(db, tx.business_id)
         db.delete(tx)
         db.commit()
+        matviews.note_write()
+        receipts.invalidate(tx_id)
         return True
     except Exception:
         db.rollback()
         raise
 
 
+def get_receipt_row(db: Session, tx_id: int):
+    """Transaction fields shown on its receipt, with the linked item's name and cost, in one query.
+
+    `unit_cost` / `cost_amount` are the sale's cost snapshot; the item's
+    current `cost_price` is only a fallback for rows that predate it.
+    """
+    T = models.Transaction
+    I = models.Inventory
+    return (
+        db.query(T.id, T.business_id, T.created_at, T.used_quantity, T.amount, T.unit_cost, T.cost_amount, I.item_name, I.cost_price)
+        .outerjoin(I, I.id == T.inventory_id)
+        .filter(T.id == tx_id)
+        .first()
+    )
+
+
 def get_inventory_by_id(db: Session, inventory_id: int):
     return db.query(models.Inventory).filter(models.Inventory.id == inventory_id).first()
 
@@ -390,6 +1066,22 @@ def change_user_password(db: Session, user_id: int, new_password: str):
     pw_hash = security.get_password_hash(new_password)
     user.password_hash = pw_hash
     db.add(user); db.commit(); db.refresh(user)
+    user_cache.invalidate(user.username)
+    return True
+
+
+def delete_user(db: Session, user_id: int):
+    user = get_user_by_id(db, user_id)
+    if not user:
+        return False
+    username = user.username
+    try:
+        db.delete(user)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    user_cache.invalidate(username)
     return True
 
 
@@ -398,86 +1090,46 @@ def analytics_weekly(db: Session, business_id: int):
     from datetime import datetime, timedelta
     end = datetime.utcnow()
     start = end - timedelta(days=6)
-    # fetch transactions in the window and aggregate in Python to avoid SQL function compatibility issues
-    # IMPORTANT: aggregate strictly from `transactions` table only. Do NOT
-    # consult inventory rows here — inventory represents stock state only.
-    txs = db.query(models.Transaction).filter(models.Transaction.business_id == business_id, models.Transaction.created_at >= start).all()
-    sums = {}
-    for t in txs:
-        d = t.created_at.date()
-        entry = sums.setdefault(d, {'income': 0.0, 'expense': 0.0})
-        try:
-            norm = _normalize_tx_type(t.type)
-        except ValueError:
-            # ignore unexpected transaction types
-            continue
-        if norm == 'income':
-            entry['income'] += float(t.amount)
-        elif norm == 'expense':
-            entry['expense'] += float(t.amount)
+    # Read from the daily rollup (maintained from `transactions` on every
+    # write); inventory stock state never affects these totals.
+    sums = {r['day']: r for r in daily_totals(db, business_id, start=start, group_by='day')}
     out = []
     for i in range(7):
         d = (start + timedelta(days=i)).date()
         label = d.strftime('%a')
-        s = sums.get(d, {'income': 0.0, 'expense': 0.0})
+        s = sums.get(d, {'income': 0.0, 'operating_expense': 0.0})
         out.append({
             'date': d.isoformat(),
             'label': label,
             'income': float(s['income']),
-            'expense': float(s['expense'])
+            'expense': float(s['operating_expense'])
         })
     return out
 
 
+def _month_range(first: str, last: str):
+    # inclusive list of 'YYYY-MM' strings from first to last
+    y, m = (int(x) for x in first.split('-'))
+    out = []
+    while f"{y:04d}-{m:02d}" <= last:
+        out.append(f"{y:04d}-{m:02d}")
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return out
+
+
 def analytics_monthly(db: Session, business_id: int):
-    # Use SQL to generate a continuous series of months between the
-    # earliest and latest transaction for the business and LEFT JOIN
-    # aggregated sums so months with no transactions are returned with
-    # zero values. This ensures the API is a faithful reflection of DB history.
-    from sqlalchemy import text
-    sql = text("""
-        WITH bounds AS (
-            SELECT date_trunc('month', MIN(created_at))::date AS min_month,
-                         date_trunc('month', MAX(created_at))::date AS max_month
-            FROM transactions
-            WHERE business_id = :bid
-        ), months AS (
-            SELECT generate_series(min_month, max_month, interval '1 month')::date AS month
-            FROM bounds
-        ), agg AS (
-            SELECT date_trunc('month', created_at)::date AS month,
-                         SUM(CASE WHEN type = 'Income' THEN amount ELSE 0 END) AS income,
-                         SUM(CASE WHEN type = 'Expense' THEN amount ELSE 0 END) AS expense
-            FROM transactions
-            WHERE business_id = :bid
-            GROUP BY month
-        )
-        SELECT to_char(months.month, 'YYYY-MM') AS month, COALESCE(agg.income, 0) AS income, COALESCE(agg.expense, 0) AS expense
-        FROM months
-        LEFT JOIN agg ON months.month = agg.month
-        ORDER BY months.month ASC
-        """)
-    res = db.execute(sql, {'bid': business_id}).fetchall()
+    # Return a continuous series of months between the earliest and latest
+    # transaction for the business, with zero values for months without
+    # transactions, so the API is a faithful reflection of DB history.
+    # Each row carries income, operating expense and COGS from the rollup.
+    rows = {r['month']: r for r in daily_totals(db, business_id, group_by='month')}
     out = []
-    try:
-        for row in res:
-            # support different Row types (Row, RowMapping)
-            mapping = None
-            if hasattr(row, '_mapping'):
-                mapping = row._mapping
-            else:
-                try:
-                    mapping = dict(row)
-                except Exception:
-                    mapping = {0: row[0], 1: row[1], 2: row[2]}
-            month = mapping.get('month') or mapping.get(0)
-            income = mapping.get('income') or mapping.get(1) or 0.0
-            expense = mapping.get('expense') or mapping.get(2) or 0.0
-            out.append({'month': month, 'income': float(income or 0.0), 'expense': float(expense or 0.0)})
+    if not rows:
         return out
-    except Exception as e:
-        logging.exception('analytics_monthly: error processing query results')
-        return []
+    for month in _month_range(min(rows), max(rows)):
+        r = rows.get(month, {})
+        out.append({'month': month, 'income': float(r.get('income', 0.0)), 'expense': float(r.get('operating_expense', 0.0)), 'cogs': float(r.get('cogs', 0.0))})
+    return out
 
 
 def charts_income_expense_by_date(db: Session, business_id: int, start_date=None, end_date=None):
@@ -515,20 +1167,19 @@ def top_selling_items(db: Session, business_id: int, limit: int = 10):
     return [{'item_name': r.item_name, 'total_sold': int(r.total_sold or 0)} for r in results]
 
 
+def _rollup_by_category(db: Session, business_id: int, field: str, count_field: str, category_rows=None):
+    # rollup category totals for one measure, largest first; '' -> 'Uncategorized'.
+    # `category_rows` lets callers reuse one daily_totals(group_by='category') result.
+    if category_rows is None:
+        category_rows = daily_totals(db, business_id, group_by='category')
+    rows = [r for r in category_rows if r[count_field] > 0]
+    rows.sort(key=lambda r: r[field], reverse=True)
+    return [{'category': r['category'] or 'Uncategorized', 'amount': float(r[field])} for r in rows]
+
+
 def category_sales(db: Session, business_id: int):
     """Return category-wise sales amounts (Income only)."""
-    from sqlalchemy import func
-    q = (
-        db.query(models.Transaction.category.label('category'), func.sum(models.Transaction.amount).label('amount'))
-        .filter(models.Transaction.business_id == business_id, models.Transaction.type == models.TransactionTypeEnum.Income)
-        .group_by(models.Transaction.category)
-        .order_by(func.sum(models.Transaction.amount).desc())
-    )
-    results = q.all()
-    out = []
-    for row in results:
-        cat = row.category or 'Uncategorized'
-        out.append({'category': cat, 'amount': float(row.amount or 0.0)})
+    out = _rollup_by_category(db, business_id, 'income', 'income_count')
     # If there are no operating-expense categories from transactions,
     # fall back to using inventory COGS grouped by inventory.category
     if len(out) == 0:
@@ -545,92 +1196,45 @@ def category_sales(db: Session, business_id: int):
     return out
 
 
-def expense_categories_by_business(db: Session, business_id: int):
-    """Return inventory-category cost totals using the ml_transactions view.
+def expense_categories_by_business(db: Session, business_id: int, category_rows=None):
+    """Return COGS totals per category from the daily rollup.
 
     Returns a list of dicts: [{ 'category': name, 'total': number }, ...]
     """
-    sql = text("""
-        SELECT COALESCE(i.category, 'Uncategorized') AS category,
-               COALESCE(SUM(mt.cost_amount), 0) AS total
-        FROM ml_transactions mt
-        JOIN inventory i ON mt.inventory_id = i.id
-        WHERE mt.business_id = :bid
-        GROUP BY COALESCE(i.category, 'Uncategorized')
-        ORDER BY total DESC
-    """)
-    rows = db.execute(sql, {'bid': business_id}).fetchall()
-    out = []
-    for row in rows:
-        mapping = row._mapping if hasattr(row, '_mapping') else dict(row)
-        cat = mapping.get('category') or 'Uncategorized'
-        out.append({'category': cat, 'total': float(mapping.get('total') or 0.0)})
-    return out
+    if category_rows is None:
+        category_rows = daily_totals(db, business_id, group_by='category')
+    rows = [r for r in category_rows if r['cogs'] != 0]
+    rows.sort(key=lambda r: r['cogs'], reverse=True)
+    return [{'category': r['category'] or 'Uncategorized', 'total': float(r['cogs'])} for r in rows]
 
 
-def categories_by_business(db: Session, business_id: int):
+def categories_by_business(db: Session, business_id: int, category_rows=None):
     # For analytics we use transactions as the sole source of truth. Inventory
     # rows represent stock state only and must NOT be used to classify or
-    # aggregate financial categories. Group by the transaction.category and
-    # consider only Expense transactions for the expense category pie chart.
-    # Resolve category from transaction first, then inventory when present.
-    # Treat empty or whitespace-only category strings as missing. Only
-    # Expense transactions are considered and all expense rows are included.
-    # This prevents using inventory.item_name as a category.
-    # SQL expression: COALESCE(NULLIF(TRIM(transaction.category), ''), NULLIF(TRIM(inventory.category), ''))
-    category_expr = func.coalesce(
-        func.nullif(func.trim(models.Transaction.category), ''),
-        func.nullif(func.trim(models.Inventory.category), '')
-    ).label('category')
-
-    q = (
-        db.query(
-            category_expr,
-            func.sum(models.Transaction.amount).label('amount')
-        )
-        .outerjoin(models.Inventory, models.Inventory.id == models.Transaction.inventory_id)
-        .filter(models.Transaction.business_id == business_id, models.Transaction.type == models.TransactionTypeEnum.Expense)
-        .group_by(category_expr)
-        .order_by(func.sum(models.Transaction.amount).desc())
-    )
-    results = q.all()
-    out = []
-    for row in results:
-        cat = row.category or 'Uncategorized'
-        out.append({'category': cat, 'amount': float(row.amount or 0.0)})
-    return out
+    # aggregate financial categories. Only Expense transactions are
+    # considered for the expense category pie chart. The rollup category is
+    # resolved from the transaction first, then the linked inventory
+    # category, treating empty or whitespace-only strings as missing.
+    return _rollup_by_category(db, business_id, 'operating_expense', 'expense_count', category_rows)
 
 
-def categories_for_accountant(db: Session, business_id: int):
+def categories_for_accountant(db: Session, business_id: int, category_rows=None):
     """Return expense categories for the accountant view.
 
     Behavior:
-    1) Query operating expense categories from transactions (type='Expense') grouped by transaction.category.
-    2) If the result is empty, fall back to inventory COGS grouped by inventory.category (ml_transactions join).
+    1) Operating expense categories (type='Expense') from the daily rollup.
+    2) If the result is empty, fall back to COGS grouped by category.
 
     Returns list of {'category': str, 'amount': float}
     """
-    from sqlalchemy import func
-    # Query operating expense categories (transaction.category only)
-    q = (
-        db.query(
-            func.nullif(func.trim(models.Transaction.category), '').label('category'),
-            func.coalesce(func.sum(models.Transaction.amount), 0).label('amount')
-        )
-        .filter(models.Transaction.business_id == business_id, models.Transaction.type == models.TransactionTypeEnum.Expense)
-        .group_by(func.nullif(func.trim(models.Transaction.category), ''))
-        .order_by(func.sum(models.Transaction.amount).desc())
-    )
-    results = q.all()
-    out = []
-    for row in results:
-        cat = row.category or 'Uncategorized'
-        out.append({'category': cat, 'amount': float(row.amount or 0.0)})
+    if category_rows is None:
+        category_rows = daily_totals(db, business_id, group_by='category')
+    out = categories_by_business(db, business_id, category_rows)
     if len(out) > 0:
         return out
-    # Fallback to COGS grouped by inventory.category
+    # Fallback to COGS grouped by category
     try:
-        cogs = expense_categories_by_business(db, business_id)
+        cogs = expense_categories_by_business(db, business_id, category_rows)
         # expense_categories_by_business returns [{'category', 'total'}]
         fb = []
         for r in cogs:
@@ -640,53 +1244,41 @@ def categories_for_accountant(db: Session, business_id: int):
         return []
 
 
-def report_weekly(db: Session, business_id: int):
-    """Return totals for the last 7 days (income, expense)."""
-    from datetime import datetime, timedelta, timezone
-    # Calculate current week boundaries in UTC: start of week (Monday 00:00:00) to start of next week
+def current_week_bounds():
+    """Return (start, end) of the current UTC week: Monday 00:00 to next Monday."""
     now = datetime.utcnow()
-    # start of current week (Monday)
-    start_of_week = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
-    start = start_of_week
-    end = start + timedelta(days=7)
-    # Use transactions only; inventory is stock-state and should not affect totals
-    txs = db.query(models.Transaction).filter(models.Transaction.business_id == business_id, models.Transaction.created_at >= start, models.Transaction.created_at < end).all()
-    income = 0.0
-    expense = 0.0
-    for t in txs:
-        try:
-            norm = _normalize_tx_type(t.type)
-        except ValueError:
-            continue
-        if norm == 'income':
-            income += float(t.amount)
-        elif norm == 'expense':
-            expense += float(t.amount)
-    return {'total_income': income, 'total_expense': expense}
+    start = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+    return start, start + timedelta(days=7)
 
 
-def report_monthly(db: Session, business_id: int):
-    """Return totals for the current month (income, expense)."""
-    from datetime import datetime, timedelta
+def current_month_bounds():
+    """Return (start, end) of the current UTC month: day 1 00:00 to next month."""
     now = datetime.utcnow()
-    # start of current month in UTC
     month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    # compute start of next month
     if month_start.month == 12:
         next_month = month_start.replace(year=month_start.year+1, month=1)
     else:
         next_month = month_start.replace(month=month_start.month+1)
-    # Use transactions only; inventory is stock-state and should not affect totals
-    txs = db.query(models.Transaction).filter(models.Transaction.business_id == business_id, models.Transaction.created_at >= month_start, models.Transaction.created_at < next_month).all()
-    income = 0.0
-    expense = 0.0
-    for t in txs:
-        try:
-            norm = _normalize_tx_type(t.type)
-        except ValueError:
-            continue
-        if norm == 'income':
-            income += float(t.amount)
-        elif norm == 'expense':
-            expense += float(t.amount)
-    return {'total_income': income, 'total_expense': expense}
+    return month_start, next_month
+
+
+def _report_totals(db: Session, business_id: int, start, end, with_cogs: bool):
+    # Use transactions only (via the rollup); inventory is stock-state and
+    # should not affect totals
+    totals = daily_totals(db, business_id, start=start, end=end)
+    out = {'total_income': totals['income'], 'total_expense': totals['operating_expense']}
+    if with_cogs:
+        out['cogs'] = totals['cogs']
+    return out
+
+
+def report_weekly(db: Session, business_id: int, with_cogs: bool = False):
+    """Return totals for the current week (income, expense, optionally cogs)."""
+    start, end = current_week_bounds()
+    return _report_totals(db, business_id, start, end, with_cogs)
+
+
+def report_monthly(db: Session, business_id: int, with_cogs: bool = False):
+    """Return totals for the current month (income, expense, optionally cogs)."""
+    start, end = current_month_bounds()
+    return _report_totals(db, business_id, start, end, with_cogs)
@@ -0,0 +1,155 @@
+"""Materialized analytics views: versioned creation and background refresh.
+
+`ml_transactions`, `analytics_monthly` and `analytics_top_items` are
+defined in `sql/create_ml_view.sql`. `ensure_materialized_views` applies
+that file when the version recorded in `matview_meta` differs from
+`MATVIEWS_VERSION`. `RefreshScheduler` refreshes the views concurrently
+every `MATVIEW_REFRESH_INTERVAL_SECONDS`, or sooner once
+`MATVIEW_REFRESH_WRITE_THRESHOLD` transaction writes have been noted via
+`note_write()`. Readers use `last_refreshed_at()` to report data freshness.
+"""
+from pathlib import Path
+import logging
+import threading
+from sqlalchemy import text
+
+# Bump when sql/create_ml_view.sql changes so deployed databases pick it up.
+MATVIEWS_VERSION = 3
+# Refresh order matters: the aggregate views read from ml_transactions.
+MATVIEWS = ('ml_transactions', 'analytics_monthly', 'analytics_top_items')
+SQL_PATH = Path(__file__).resolve().parents[2] / 'sql' / 'create_ml_view.sql'
+# pg advisory lock key so only one worker creates/refreshes at a time
+_LOCK_KEY = 0x62697A01
+
+_logger = logging.getLogger(__name__)
+
+
+def ensure_materialized_views(engine):
+    """Create or upgrade the materialized views if their version is stale."""
+    with engine.begin() as conn:
+        conn.execute(text('SELECT pg_advisory_xact_lock(:k)'), {'k': _LOCK_KEY})
+        conn.execute(text(
+            'CREATE TABLE IF NOT EXISTS matview_meta ('
+            ' name VARCHAR PRIMARY KEY,'
+            ' version INTEGER NOT NULL,'
+            ' refreshed_at TIMESTAMP WITH TIME ZONE)'
+        ))
+        versions = dict(conn.execute(text('SELECT name, version FROM matview_meta')).fetchall())
+        if all(versions.get(name) == MATVIEWS_VERSION for name in MATVIEWS):
+            return False
+        _logger.info('Applying materialized views version %s from %s', MATVIEWS_VERSION, SQL_PATH)
+        conn.exec_driver_sql(SQL_PATH.read_text(encoding='utf-8'))
+        for name in MATVIEWS:
+            conn.execute(text(
+                'INSERT INTO matview_meta (name, version, refreshed_at) VALUES (:n, :v, now()) '
+                'ON CONFLICT (name) DO UPDATE SET version = EXCLUDED.version, refreshed_at = EXCLUDED.refreshed_at'
+            ), {'n': name, 'v': MATVIEWS_VERSION})
+        return True
+
+
+def refresh_materialized_views(engine) -> bool:
+    """Refresh every view concurrently (readers are never blocked).
+
+    Returns False without doing anything when another worker is already
+    refreshing.
+    """
+    with engine.connect() as conn:
+        if not conn.execute(text('SELECT pg_try_advisory_lock(:k)'), {'k': _LOCK_KEY}).scalar():
+            conn.rollback()
+            return False
+        try:
+            for name in MATVIEWS:
+                conn.exec_driver_sql(f'REFRESH MATERIALIZED VIEW CONCURRENTLY {name}')
+                conn.execute(text('UPDATE matview_meta SET refreshed_at = now() WHERE name = :n'), {'n': name})
+                conn.commit()
+        finally:
+            conn.execute(text('SELECT pg_advisory_unlock(:k)'), {'k': _LOCK_KEY})
+            conn.commit()
+    return True
+
+
+def last_refreshed_at(db, name: str):
+    """Return the last refresh time of a view (timezone-aware) or None."""
+    try:
+        return db.execute(text('SELECT refreshed_at FROM matview_meta WHERE name = :n'), {'n': name}).scalar()
+    except Exception:
+        _logger.exception('Could not read matview_meta for %s', name)
+        db.rollback()
+        return None
+
+
+def refreshed_at_header(db, name: str) -> dict:
+    """Response headers exposing when `name` was last refreshed."""
+    ts = last_refreshed_at(db, name)
+    return {'X-Data-Refreshed-At': ts.isoformat()} if ts is not None else {}
+
+
+class RefreshScheduler:
+    """Background thread refreshing the views on an interval or write threshold."""
+
+    def __init__(self, engine, interval_seconds: int = 300, write_threshold: int = 200):
+        self.engine = engine
+        self.interval_seconds = interval_seconds
+        self.write_threshold = write_threshold
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def note_write(self, n: int = 1):
+        with self._lock:
+            self._writes += n
+            due = self.write_threshold > 0 and self._writes >= self.write_threshold
+        if due:
+            self._wake.set()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='matview-refresh', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(timeout=self.interval_seconds if self.interval_seconds > 0 else None)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            with self._lock:
+                self._writes = 0
+            try:
+                refresh_materialized_views(self.engine)
+            except Exception:
+                _logger.exception('Materialized view refresh failed')
+
+
+_scheduler = None
+
+
+def start_refresh_scheduler(engine, interval_seconds: int, write_threshold: int):
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = RefreshScheduler(engine, interval_seconds, write_threshold)
+        _scheduler.start()
+    return _scheduler
+
+
+def stop_refresh_scheduler():
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.stop()
+        _scheduler = None
+
+
+def note_write(n: int = 1):
+    """Record transaction writes; triggers an early refresh at the threshold."""
+    if _scheduler is not None:
+        _scheduler.note_write(n)
@@ -0,0 +1,31 @@
+"""Run independent read queries concurrently on separate pooled connections.
+
+A SQLAlchemy Session is not thread-safe, so each task gets its own short
+lived session bound to the caller's engine (tests bind to their own engine
+this way too). The shared executor is bounded; since every worker holds one
+pooled connection while it runs, `MAX_WORKERS` also caps how much of the
+pool fan-out queries can take from regular requests.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.orm import Session
+
+MAX_WORKERS = 8
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='db-fanout')
+
+
+def _run(bind, fn):
+    db = Session(bind=bind, autoflush=False)
+    try:
+        return fn(db)
+    finally:
+        db.close()
+
+
+def run_parallel(bind, tasks: dict) -> dict:
+    """Run `{name: fn(db)}` concurrently and return `{name: result}`.
+
+    Waits for every task; the first exception (in `tasks` order) is re-raised.
+    """
+    futures = {name: _executor.submit(_run, bind, fn) for name, fn in tasks.items()}
+    return {name: f.result() for name, f in futures.items()}
@@ -0,0 +1,116 @@
+"""Connection pool sizing from Settings, plus pool/threadpool diagnostics.
+
+Both engines (sync psycopg2 and async asyncpg) are built with
+`engine_options()`, so pool size, overflow, recycle, pre-ping, checkout
+timeout and the per-connection `statement_timeout` come from one place.
+Their pools are the `Timed*` subclasses below, which record how long
+callers waited to obtain a connection.
+"""
+import logging
+import threading
+import time
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+from ..core.config import settings
+
+_logger = logging.getLogger(__name__)
+
+
+class PoolWaitStats:
+    """Thread-safe count / total / max of connection checkout waits."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += seconds
+            if seconds > self.max_wait:
+                self.max_wait = seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'avg_wait_ms': (self.total_wait / self.checkouts * 1000) if self.checkouts else 0.0,
+                'max_wait_ms': self.max_wait * 1000,
+            }
+
+
+class TimedQueuePool(QueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.wait_stats.record(time.perf_counter() - t0)
+
+    def recreate(self):
+        new = super().recreate()
+        new.wait_stats = self.wait_stats
+        return new
+
+
+class TimedAsyncAdaptedQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_capacity() -> int:
+    return int(getattr(settings, 'DB_POOL_SIZE', 10)) + int(getattr(settings, 'DB_MAX_OVERFLOW', 20))
+
+
+def engine_options(is_async: bool = False) -> dict:
+    """Keyword arguments for create_engine / create_async_engine."""
+    opts = {
+        'poolclass': TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool,
+        'pool_size': int(getattr(settings, 'DB_POOL_SIZE', 10)),
+        'max_overflow': int(getattr(settings, 'DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': float(getattr(settings, 'DB_POOL_TIMEOUT_SECONDS', 30)),
+        'pool_recycle': int(getattr(settings, 'DB_POOL_RECYCLE_SECONDS', 1800)),
+        'pool_pre_ping': bool(getattr(settings, 'DB_POOL_PRE_PING', True)),
+    }
+    timeout_ms = int(getattr(settings, 'DB_STATEMENT_TIMEOUT_MS', 30000))
+    if timeout_ms > 0:
+        if is_async:
+            opts['connect_args'] = {'server_settings': {'statement_timeout': str(timeout_ms)}}
+        else:
+            opts['connect_args'] = {'options': f'-c statement_timeout={timeout_ms}'}
+    return opts
+
+
+def threadpool_tokens() -> int:
+    """AnyIO threadpool size, capped at what the sync pool can serve.
+
+    Every sync route holds one pooled connection while it runs, so threads
+    beyond pool_size + max_overflow would only queue for a connection.
+    """
+    tokens = int(getattr(settings, 'THREADPOOL_TOKENS', 30))
+    capacity = pool_capacity()
+    if tokens > capacity:
+        _logger.warning('THREADPOOL_TOKENS=%s exceeds DB pool capacity %s; using %s', tokens, capacity, capacity)
+        tokens = capacity
+    return tokens
+
+
+def pool_status(engine) -> dict:
+    pool = engine.pool
+    out = {
+        'size': pool.size(),
+        'checked_out': pool.checkedout(),
+        'checked_in': pool.checkedin(),
+        'overflow': pool.overflow(),
+        # both engines are built from engine_options(), i.e. these settings
+        'max_overflow': int(getattr(settings, 'DB_MAX_OVERFLOW', 20)),
+    }
+    stats = getattr(pool, 'wait_stats', None)
+    if stats is not None:
+        out.update(stats.snapshot())
+    return out
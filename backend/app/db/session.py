@@ -1,7 +1,9 @@
 
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from ..core.config import settings
+from .pool import engine_options
 
 # Fail fast with clear error if DATABASE_URL is not configured or points to
 # SQLite — we require PostgreSQL for this deployment to avoid accidental
@@ -34,7 +36,7 @@ except Exception:
     # If parsing fails, continue and let create_engine produce a clear error
     dbname = None
 
-engine = create_engine(dsn, future=True)
+engine = create_engine(dsn, future=True, **engine_options())
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
 
 def get_db():
@@ -43,3 +45,29 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def _async_url(dsn: str):
+    """Same database through asyncpg; libpq's `sslmode` becomes asyncpg's `ssl`."""
+    url = make_url(dsn)
+    connect_args = {}
+    sslmode = url.query.get('sslmode')
+    if sslmode:
+        url = url.difference_update_query(['sslmode'])
+        connect_args['ssl'] = sslmode
+    return url.set(drivername='postgresql+asyncpg'), connect_args
+
+
+# Async engine for the read-heavy routers (analytics, reports, summary,
+# dashboard). Connections are only opened on first use. It has its own pool
+# with the same sizing as the sync one.
+_async_dsn, _async_connect_args = _async_url(dsn)
+_async_options = engine_options(is_async=True)
+_async_options['connect_args'] = {**_async_options.get('connect_args', {}), **_async_connect_args}
+async_engine = create_async_engine(_async_dsn, **_async_options)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
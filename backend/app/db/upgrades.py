@@ -0,0 +1,33 @@
+"""Idempotent in-place schema upgrades applied on startup.
+
+`Base.metadata.create_all` only creates missing tables; columns and indexes
+added to existing tables are listed here as `ADD COLUMN IF NOT EXISTS` /
+`CREATE INDEX IF NOT EXISTS` statements (PostgreSQL) so deployed databases
+pick them up without a manual migration.
+`sql/create_tables.sql` carries the same DDL for fresh installs.
+"""
+import logging
+from sqlalchemy import text
+
+SCHEMA_UPGRADES = (
+    # cost snapshot on sales (see models.Transaction.unit_cost)
+    'ALTER TABLE transactions ADD COLUMN IF NOT EXISTS unit_cost NUMERIC(12,2)',
+    'ALTER TABLE transactions ADD COLUMN IF NOT EXISTS cost_amount NUMERIC(14,2)',
+    # keyset-paginated transaction listings (see models.Transaction.__table_args__)
+    'CREATE INDEX IF NOT EXISTS ix_transactions_business_created ON transactions (business_id, created_at, id)',
+    'CREATE INDEX IF NOT EXISTS ix_transactions_business_type_created ON transactions (business_id, type, created_at, id)',
+    'CREATE INDEX IF NOT EXISTS ix_transactions_business_category_created ON transactions (business_id, category, created_at, id)',
+    'CREATE INDEX IF NOT EXISTS ix_transactions_business_inventory_created ON transactions (business_id, inventory_id, created_at, id)',
+    'CREATE INDEX IF NOT EXISTS ix_transactions_business_source_created ON transactions (business_id, source, created_at, id)',
+)
+
+_logger = logging.getLogger(__name__)
+
+
+def apply_schema_upgrades(engine):
+    if engine.dialect.name != 'postgresql':
+        return
+    with engine.begin() as conn:
+        for stmt in SCHEMA_UPGRADES:
+            _logger.debug('schema upgrade: %s', stmt)
+            conn.execute(text(stmt))
@@ -0,0 +1,159 @@
+"""Invoice upload storage: streamed, size-limited and content addressed.
+
+An upload is copied in `CHUNK_BYTES` pieces into a temp file while its
+SHA-256 is computed, then moved to `<INVOICE_STORAGE_DIR>/<business id>/<sha256><ext>`.
+Uploading the same invoice again finds the file already there and stores
+nothing. Files are served by `GET /uploads/{business_id}/{name}` (see
+`api/invoices.py`), which is also where the pre-hash
+`<timestamp>_<filename>` uploads still live.
+
+Image invoices get a JPEG thumbnail under `thumbs/`, generated after the
+upload response is sent (`make_thumbnail`, needs Pillow).
+
+FastAPI receives and spools the whole multipart body before the upload
+route runs, so `UploadSizeLimit` caps the request body while it arrives;
+`store` then enforces `MAX_BYTES` on the file itself.
+"""
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from fastapi import HTTPException
+
+from .core.config import settings
+
+_logger = logging.getLogger(__name__)
+
+STORAGE_DIR = Path(getattr(settings, 'INVOICE_STORAGE_DIR', None) or Path(__file__).resolve().parents[1] / 'uploads')
+MAX_BYTES = int(getattr(settings, 'INVOICE_MAX_UPLOAD_BYTES', 20 * 1024 * 1024))
+CHUNK_BYTES = 1024 * 1024
+# multipart framing around the file: boundaries, part headers, business_id
+MULTIPART_OVERHEAD = 64 * 1024
+THUMBNAIL_SIZE = (320, 320)
+IMAGE_EXTENSIONS = frozenset({'.png', '.jpg', '.jpeg', '.gif', '.webp', '.bmp'})
+
+_EXTENSION = re.compile(r'^\.[a-z0-9]{1,8}$')
+
+
+class InvoiceTooLarge(ValueError):
+    pass
+
+
+class UploadSizeLimit:
+    """ASGI middleware answering 413 once the body to `path` passes the limit.
+
+    A declared Content-Length is checked before anything is read; a chunked
+    upload is counted as it arrives, so neither is spooled past
+    `MAX_BYTES + MULTIPART_OVERHEAD`.
+    """
+
+    def __init__(self, app, path: str):
+        self.app = app
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] != self.path:
+            await self.app(scope, receive, send)
+            return
+        limit = MAX_BYTES + MULTIPART_OVERHEAD
+        declared = dict(scope['headers']).get(b'content-length', b'')
+        received = 0
+
+        def too_large():
+            # raised inside the route's body parsing, so FastAPI's exception
+            # handling (and CORS) produce the response
+            return HTTPException(status_code=413, detail=f'Invoice larger than {MAX_BYTES} bytes')
+
+        async def limited_receive():
+            nonlocal received
+            if declared.isdigit() and int(declared) > limit:
+                raise too_large()
+            message = await receive()
+            received += len(message.get('body', b''))
+            if received > limit:
+                raise too_large()
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def _extension(filename: str) -> str:
+    ext = os.path.splitext(filename or '')[1].lower()
+    return ext if _EXTENSION.match(ext) else ''
+
+
+def store(business_id: int, fileobj, filename: str):
+    """Copy `fileobj` into the business's invoice folder.
+
+    Returns `(name, created)`; `created` is False when an identical file was
+    already stored. Raises `InvoiceTooLarge` past `MAX_BYTES`.
+    """
+    folder = STORAGE_DIR / str(business_id)
+    folder.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while chunk := fileobj.read(CHUNK_BYTES):
+                size += len(chunk)
+                if size > MAX_BYTES:
+                    raise InvoiceTooLarge(f'invoice exceeds {MAX_BYTES} bytes')
+                digest.update(chunk)
+                out.write(chunk)
+        name = digest.hexdigest() + _extension(filename)
+        path = folder / name
+        if path.exists():
+            os.unlink(tmp)
+            return name, False
+        os.replace(tmp, path)
+        return name, True
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def resolve(business_id: int, name: str):
+    """Path of a stored invoice, or None for unknown or unsafe names."""
+    if not name or name.startswith('.') or '/' in name or '\\' in name:
+        return None
+    path = STORAGE_DIR / str(business_id) / name
+    return path if path.is_file() else None
+
+
+def is_image(name: str) -> bool:
+    return _extension(name) in IMAGE_EXTENSIONS
+
+
+def thumbnail_path(business_id: int, name: str) -> Path:
+    return STORAGE_DIR / str(business_id) / 'thumbs' / (os.path.splitext(name)[0] + '.jpg')
+
+
+def make_thumbnail(business_id: int, name: str):
+    """Write the thumbnail of an image invoice unless it already exists."""
+    source = resolve(business_id, name)
+    if source is None or not is_image(name):
+        return
+    target = thumbnail_path(business_id, name)
+    if target.exists():
+        return
+    try:
+        from PIL import Image
+    except ImportError:
+        _logger.warning('Pillow is not installed; invoice thumbnails are disabled')
+        return
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f'.{target.name}.{os.getpid()}.tmp')
+    try:
+        with Image.open(source) as im:
+            im.thumbnail(THUMBNAIL_SIZE)
+            im.convert('RGB').save(tmp, 'JPEG', quality=80)
+        os.replace(tmp, target)
+    except Exception:
+        _logger.exception('Thumbnail generation failed for %s/%s', business_id, name)
+        if tmp.exists():
+            tmp.unlink()
@@ -10,13 +10,20 @@ from fastapi.responses import JSONResponse
 from .core.config import settings
 from .db.session import engine
 from .db.base import Base
+from .invoices import UploadSizeLimit
 
 from .api import auth, businesses, transactions, summary, inventory, analytics, users, reports, ml
 from .api import chat
 from .api import accountant, staff
+from .api import invoices
+from .api import diagnostics
 
 app = FastAPI(title='BizAnalyzer AI')
 
+# Cap invoice upload bodies while they are received, not after FastAPI has
+# spooled them (see app/invoices.py).
+app.add_middleware(UploadSizeLimit, path='/transactions/upload')
+
 # Development-only CORS: allow the Vite dev server origins explicitly.
 # Do NOT use '*' in production — this is intentionally restrictive to local dev hosts.
 app.add_middleware(
@@ -32,6 +39,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["Authorization", "Content-Type"],
+    # keyset cursor of the paginated transaction listings
+    expose_headers=["X-Next-Cursor", "X-Model-Version"],
 )
 
 
@@ -62,6 +71,43 @@ async def _handle_unexpected_exception(request: Request, exc: Exception):
 def on_startup():
     # create tables
     Base.metadata.create_all(bind=engine)
+    # add columns introduced after the tables were first created
+    from .db.upgrades import apply_schema_upgrades
+    apply_schema_upgrades(engine)
+    # One-time backfills on databases that predate the sale cost snapshot and
+    # the daily rollup; afterwards the transaction write paths keep both current.
+    try:
+        from .db.session import SessionLocal
+        from . import crud, models
+        db = SessionLocal()
+        try:
+            # uses current cost_price, i.e. what COGS reported so far, so an
+            # existing rollup stays consistent
+            updated = crud.backfill_transaction_costs(db)
+            if updated:
+                import logging
+                logging.info('Backfilled cost snapshot on %s sales transactions', updated)
+            if db.query(models.BusinessDailyTotal.id).first() is None and db.query(models.Transaction.id).first() is not None:
+                import logging
+                logging.info('business_daily_totals is empty; rebuilding from transactions')
+                crud.rebuild_daily_totals(db)
+        finally:
+            db.close()
+    except Exception:
+        import logging
+        logging.exception('Could not backfill transaction costs / business_daily_totals')
+    # Materialized analytics views: create/upgrade, then keep them fresh
+    try:
+        from .db import matviews
+        matviews.ensure_materialized_views(engine)
+        matviews.start_refresh_scheduler(
+            engine,
+            getattr(settings, 'MATVIEW_REFRESH_INTERVAL_SECONDS', 300),
+            getattr(settings, 'MATVIEW_REFRESH_WRITE_THRESHOLD', 200),
+        )
+    except Exception:
+        import logging
+        logging.exception('Could not set up materialized analytics views')
     # Safe dev-only verification log: print DB type, database name and user (no password).
     try:
         # engine.url is a SQLAlchemy URL object
@@ -77,6 +123,26 @@ def on_startup():
         pass
 
 
+@app.on_event('startup')
+async def configure_threadpool():
+    # Size the AnyIO threadpool that runs sync routes/dependencies; must be
+    # done from the event loop.
+    from anyio import to_thread
+    from .db.pool import threadpool_tokens
+    to_thread.current_default_thread_limiter().total_tokens = threadpool_tokens()
+
+
+@app.on_event('shutdown')
+async def on_shutdown():
+    from .db import matviews
+    from .db.session import async_engine
+    from . import receipts, training_jobs
+    matviews.stop_refresh_scheduler()
+    receipts.shutdown()
+    training_jobs.shutdown()
+    await async_engine.dispose()
+
+
 app.include_router(auth.router, prefix='/auth', tags=['auth'])
 app.include_router(businesses.router, prefix='/businesses', tags=['businesses'])
 app.include_router(transactions.router, prefix='/transactions', tags=['transactions'])
@@ -89,6 +155,10 @@ app.include_router(reports.router, prefix='/reports', tags=['reports'])
 app.include_router(chat.router, prefix='/chat', tags=['chat'])
 app.include_router(accountant.router, prefix='/accountant', tags=['accountant'])
 app.include_router(staff.router, prefix='/staff', tags=['staff'])
+app.include_router(invoices.router, prefix='/uploads', tags=['invoices'])
+# unauthenticated cache/pool/auth internals: opt-in, never on by default
+if getattr(settings, 'DIAGNOSTICS_ENABLED', False):
+    app.include_router(diagnostics.router, prefix='/diagnostics', tags=['diagnostics'])
 
 
 @app.get('/')
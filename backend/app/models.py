@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, Enum as SAEnum, Text, CheckConstraint, UniqueConstraint, func
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, Float, ForeignKey, Numeric, Enum as SAEnum, Text, JSON, CheckConstraint, UniqueConstraint, Index, func, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .db.base import Base
@@ -60,6 +60,16 @@ class BusinessMember(Base):
 
 class Transaction(Base):
     __tablename__ = 'transactions'
+    # Keyset pagination of the transaction listings: (created_at, id) per
+    # business, optionally behind one equality filter. Mirrored in
+    # db/upgrades.py for databases created before these existed.
+    __table_args__ = (
+        Index('ix_transactions_business_created', 'business_id', 'created_at', 'id'),
+        Index('ix_transactions_business_type_created', 'business_id', 'type', 'created_at', 'id'),
+        Index('ix_transactions_business_category_created', 'business_id', 'category', 'created_at', 'id'),
+        Index('ix_transactions_business_inventory_created', 'business_id', 'inventory_id', 'created_at', 'id'),
+        Index('ix_transactions_business_source_created', 'business_id', 'source', 'created_at', 'id'),
+    )
     id = Column(Integer, primary_key=True, index=True)
     business_id = Column(Integer, ForeignKey('businesses.id'), nullable=False)
     type = Column(SAEnum(TransactionTypeEnum), nullable=False)
@@ -68,6 +78,12 @@ class Transaction(Base):
     source = Column(String, nullable=True)
     inventory_id = Column(Integer, ForeignKey('inventory.id'), nullable=True)
     used_quantity = Column(Integer, nullable=True, default=0)
+    # Cost snapshot taken when an inventory-linked Income (sale) is written:
+    # inventory.cost_price at that time and COALESCE(used_quantity, 1) * unit_cost.
+    # NULL for expenses and manual income. Later cost_price edits do not
+    # rewrite historical COGS.
+    unit_cost = Column(Numeric(12,2), nullable=True)
+    cost_amount = Column(Numeric(14,2), nullable=True)
     invoice_url = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
@@ -97,3 +113,64 @@ class Inventory(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     business = relationship('Business', back_populates='inventory')
+
+
+class BusinessDailyTotal(Base):
+    """Per-business daily rollup of transactions, maintained on every write.
+
+    One row per (business_id, day, category). `category` is the resolved
+    transaction category (transaction first, then linked inventory) and is
+    '' when neither is set. COGS is the sum of the transactions' snapshotted
+    `cost_amount`, matching the `ml_transactions` view.
+    """
+    __tablename__ = 'business_daily_totals'
+    __table_args__ = (
+        UniqueConstraint('business_id', 'day', 'category', name='uix_business_daily_totals_key'),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    business_id = Column(Integer, ForeignKey('businesses.id', ondelete='CASCADE'), nullable=False)
+    day = Column(Date, nullable=False)
+    category = Column(String, nullable=False, default='')
+    income = Column(Numeric(14,2), nullable=False, default=0)
+    operating_expense = Column(Numeric(14,2), nullable=False, default=0)
+    cogs = Column(Numeric(14,2), nullable=False, default=0)
+    units_sold = Column(Integer, nullable=False, default=0)
+    income_count = Column(Integer, nullable=False, default=0)
+    expense_count = Column(Integer, nullable=False, default=0)
+
+
+class BusinessDataVersion(Base):
+    """Monotonic per-business counter bumped by every transaction/inventory write.
+
+    Used as part of analytics cache keys so cached results are invalidated
+    across all workers as soon as the business's data changes.
+    """
+    __tablename__ = 'business_data_versions'
+    business_id = Column(Integer, ForeignKey('businesses.id', ondelete='CASCADE'), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+
+class TrainingJob(Base):
+    """An on-demand profit model fit (`POST /ml/train/{business_id}`).
+
+    Shared by every API worker: any of them can report a job's status, and
+    the partial unique index allows one queued/running job per business.
+    `status` is 'queued', 'running', 'succeeded' or 'failed'.
+    """
+    __tablename__ = 'training_jobs'
+    __table_args__ = (
+        Index(
+            'uix_training_jobs_active_business', 'business_id', unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+            sqlite_where=text("status IN ('queued', 'running')"),
+        ),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    business_id = Column(Integer, ForeignKey('businesses.id', ondelete='CASCADE'), nullable=False)
+    status = Column(String, nullable=False, default='queued')
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+    seconds = Column(Float, nullable=True)
+    metrics = Column(JSON, nullable=True)
+    model_version = Column(String, nullable=True)
+    error = Column(Text, nullable=True)
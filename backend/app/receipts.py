@@ -0,0 +1,189 @@
+"""Transaction receipt PDFs: field assembly, rendering and an on-disk cache.
+
+A rendered receipt is stored as `<RECEIPT_CACHE_DIR>/<tx id>/<variant>-<hash>.pdf`
+where `variant` is the role-based visibility ('full' shows cost and profit,
+'basic' does not) and `hash` is a digest of every displayed field. A
+reprint is therefore a file read, and a receipt whose content changed (e.g.
+the item was renamed) can never be served from a stale file; storing the new
+render deletes the older files of that variant. `crud.update_transaction` /
+`crud.delete_transaction` call `invalidate()` to drop a transaction's files.
+
+Cold renders run in a small process pool (`RECEIPT_RENDER_WORKERS`, 0 renders
+on a worker thread instead) so reportlab's CPU work does not hold the GIL
+that the API threads need.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+from anyio import to_thread
+
+from .core.config import settings
+
+_logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(getattr(settings, 'RECEIPT_CACHE_DIR', None) or Path(__file__).resolve().parents[1] / 'cache' / 'receipts')
+CACHE_ENABLED = getattr(settings, 'RECEIPT_CACHE_ENABLED', True)
+RENDER_WORKERS = int(getattr(settings, 'RECEIPT_RENDER_WORKERS', 2))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class _ReceiptStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.renders = 0
+
+    def record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.renders += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            total = self.hits + self.renders
+            return {'enabled': CACHE_ENABLED, 'render_workers': RENDER_WORKERS, 'hits': self.hits, 'renders': self.renders, 'hit_ratio': (self.hits / total) if total else 0.0}
+
+
+stats = _ReceiptStats()
+
+
+def receipt_fields(row, business_name: str, role: str) -> dict:
+    """Everything a receipt displays, from a `crud.get_receipt_row` row.
+
+    Cost and profit are only included for owners and accountants. They come
+    from the sale's cost snapshot, so editing the item's `cost_price` later
+    does not change an existing receipt.
+    """
+    item_name = row.item_name or 'Manual Transaction'
+    if row.unit_cost is not None:
+        cost_price = float(row.unit_cost)
+    else:
+        cost_price = float(row.cost_price or 0.0) if row.item_name is not None else 0.0
+    quantity = int(row.used_quantity or 1)
+    selling_price = float(row.amount or 0.0)
+    cost_amount = float(row.cost_amount) if row.cost_amount is not None else quantity * cost_price
+    fields = {
+        'variant': 'full' if role in ('owner', 'accountant') else 'basic',
+        'business': business_name,
+        'transaction_id': int(row.id),
+        'date': row.created_at.isoformat() if row.created_at is not None else '',
+        'item_name': item_name,
+        'quantity': quantity,
+        'selling_price': selling_price,
+    }
+    if fields['variant'] == 'full':
+        fields['cost_price'] = cost_price
+        fields['profit'] = selling_price - cost_amount
+    return fields
+
+
+def render_receipt_pdf(fields: dict) -> bytes:
+    """Build the receipt PDF. Runs in the render pool, so it must stay picklable and DB-free."""
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+
+    buffer = BytesIO()
+    try:
+        doc = SimpleDocTemplate(buffer, pagesize=letter)
+        styles = getSampleStyleSheet()
+        elements = []
+        elements.append(Paragraph('Transaction Receipt', styles['Title']))
+        elements.append(Spacer(1, 12))
+
+        elements.append(Paragraph(f"Business: {fields['business']}", styles['Normal']))
+        elements.append(Paragraph(f"Transaction ID: {fields['transaction_id']}", styles['Normal']))
+        elements.append(Paragraph(f"Date: {fields['date']}", styles['Normal']))
+        elements.append(Spacer(1, 8))
+
+        elements.append(Paragraph(f"Item: {fields['item_name']}", styles['Normal']))
+        elements.append(Paragraph(f"Quantity: {fields['quantity']}", styles['Normal']))
+        elements.append(Paragraph(f"Selling Price: ₹{fields['selling_price']:.2f}", styles['Normal']))
+        elements.append(Paragraph(f"Total Amount: ₹{fields['selling_price']:.2f}", styles['Normal']))
+
+        if 'cost_price' in fields:
+            elements.append(Paragraph(f"Cost Price: ₹{fields['cost_price']:.2f}", styles['Normal']))
+        if 'profit' in fields:
+            elements.append(Paragraph(f"Profit: ₹{fields['profit']:.2f}", styles['Normal']))
+
+        doc.build(elements)
+        return buffer.getvalue()
+    finally:
+        buffer.close()
+
+
+def cache_path(fields: dict) -> Path:
+    digest = hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()[:20]
+    return CACHE_DIR / str(fields['transaction_id']) / f"{fields['variant']}-{digest}.pdf"
+
+
+def _write_atomic(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _store(path: Path, data: bytes):
+    _write_atomic(path, data)
+    # older renders of the same variant show content that has since changed
+    variant = path.name.split('-', 1)[0]
+    for old in path.parent.glob(f'{variant}-*.pdf'):
+        if old != path:
+            old.unlink(missing_ok=True)
+
+
+def _render_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that runs threads (anyio, matview refresh) is unsafe
+            _pool = ProcessPoolExecutor(max_workers=RENDER_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+async def render(fields: dict) -> bytes:
+    if RENDER_WORKERS <= 0:
+        return await to_thread.run_sync(render_receipt_pdf, fields)
+    return await asyncio.get_running_loop().run_in_executor(_render_pool(), render_receipt_pdf, fields)
+
+
+async def get_or_render(fields: dict):
+    """Return the receipt as a cached file path, or as bytes when the cache is disabled."""
+    if not CACHE_ENABLED:
+        stats.record(hit=False)
+        return await render(fields)
+    path = cache_path(fields)
+    if path.exists():
+        stats.record(hit=True)
+        return path
+    pdf = await render(fields)
+    await to_thread.run_sync(_store, path, pdf)
+    stats.record(hit=False)
+    return path
+
+
+def invalidate(tx_id: int):
+    """Drop every cached receipt of a transaction (all variants and versions)."""
+    shutil.rmtree(CACHE_DIR / str(tx_id), ignore_errors=True)
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+from typing import Literal, Optional
 from datetime import datetime
 
 
@@ -54,6 +54,33 @@ class TransactionCreate(BaseModel):
     source: Optional[str] = None
 
 
+class TransactionBatchItem(BaseModel):
+    type: str
+    amount: float
+    category: Optional[str] = None
+    inventory_id: Optional[int] = None
+    used_quantity: Optional[int] = None
+    source: Optional[str] = None
+
+
+class TransactionBatchCreate(BaseModel):
+    business_id: int
+    transactions: list[TransactionBatchItem] = Field(..., min_length=1, max_length=5000)
+    # all_or_nothing: any bad row rejects the batch; best_effort: bad rows are skipped
+    mode: Literal['all_or_nothing', 'best_effort'] = 'all_or_nothing'
+
+
+class TransactionBatchError(BaseModel):
+    index: int
+    detail: str
+
+
+class TransactionBatchOut(BaseModel):
+    created: int
+    ids: Optional[list[int]] = None
+    errors: list[TransactionBatchError] = []
+
+
 class TransactionUpdate(BaseModel):
     type: Optional[str]
     amount: Optional[float]
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""Snapshot unit_cost / cost_amount on sales transactions that lack them.
+
+Inventory-linked Income transactions store the item's cost at sale time
+(`transactions.unit_cost`, `transactions.cost_amount`) so COGS no longer
+follows later `cost_price` edits. Rows written before those columns existed
+are filled from the item's current `cost_price`, which is what COGS showed
+for them until now. The API runs the same backfill on startup; use this
+script to run it by hand, e.g. after importing data with raw SQL.
+
+Usage (from the backend folder):
+
+```powershell
+python -m app.scripts.backfill_transaction_costs
+python -m app.scripts.backfill_transaction_costs --business-id 3
+```
+"""
+import argparse
+from app.db.session import SessionLocal, engine
+from app.db.upgrades import apply_schema_upgrades
+from app import crud
+
+
+def main():
+    p = argparse.ArgumentParser(description='Backfill cost snapshots on sales transactions')
+    p.add_argument('--business-id', type=int, default=None, help='limit to one business (default: all)')
+    args = p.parse_args()
+
+    apply_schema_upgrades(engine)
+    db = SessionLocal()
+    try:
+        updated = crud.backfill_transaction_costs(db, args.business_id)
+        print(f"Transactions updated: {updated}")
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -27,7 +27,7 @@ Do NOT use backslash `\\` as a line continuation in PowerShell.
 """
 from sqlalchemy import func
 from app.db.session import SessionLocal
-from app import models
+from app import models, crud
 
 
 def main():
@@ -67,6 +67,10 @@ def main():
 
         if total_updated > 0:
             db.commit()
+            # categories feed the business_daily_totals rollup; rebuild the
+            # affected businesses so category breakdowns pick up the change
+            for bid in sorted({tx.business_id for tx in txs}):
+                crud.rebuild_daily_totals(db, bid)
         else:
             db.rollback()
 
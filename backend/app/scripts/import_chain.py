@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""Import many store CSVs, one business each, in parallel.
+
+Each business is handled by one worker process: it parses and validates its
+files, then loads them with the `import_dataset --bulk` path on its own
+database connection. Files of the same business run one after another in
+the same worker so they never contend for the same inventory rows; different
+businesses run concurrently, at most `--workers` at a time.
+
+The file -> business mapping comes from either
+
+- a manifest CSV with `file,business_id` columns (paths relative to the
+  manifest's folder are allowed), or
+- a directory of CSVs whose names end in the business id, e.g.
+  `store_12.csv` or `12.csv`.
+
+Usage (from the backend folder):
+
+```powershell
+python -m app.scripts.import_chain --manifest onboarding/stores.csv --workers 6
+python -m app.scripts.import_chain --dir onboarding/stores --workers 6
+```
+
+Every file keeps its own `<file>.checkpoint.json`, so re-running the same
+command after a failure resumes the unfinished files and skips the rows
+already loaded. A combined summary is printed at the end; the exit status
+is 1 when any file failed.
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from app.scripts.import_dataset import SUMMARY_LABELS, bulk_import, validate_dataset
+
+_BUSINESS_ID_IN_NAME = re.compile(r'(\d+)$')
+
+
+def read_manifest(path: Path):
+    """[(file, business_id)] from a manifest CSV with `file,business_id` columns."""
+    out = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            try:
+                filepath = Path((row.get('file') or '').strip())
+                business_id = int(row.get('business_id'))
+            except (TypeError, ValueError):
+                raise SystemExit(f"{path}:{line}: expected `file,business_id`, got {row}")
+            if not filepath.is_absolute():
+                filepath = path.parent / filepath
+            out.append((filepath.resolve(), business_id))
+    return out
+
+
+def scan_directory(path: Path):
+    """[(file, business_id)] for every `*.csv` in `path` whose name ends in a business id."""
+    out = []
+    for filepath in sorted(path.glob('*.csv')):
+        m = _BUSINESS_ID_IN_NAME.search(filepath.stem)
+        if not m:
+            print(f"Skipping {filepath.name}: no business id at the end of the file name")
+            continue
+        out.append((filepath.resolve(), int(m.group(1))))
+    return out
+
+
+def import_business(business_id: int, files, chunk_size: int):
+    """Worker: validate then bulk-load every file of one business. Returns one result per file."""
+    from app.db.session import SessionLocal
+    from app import models
+
+    def log(msg):
+        print(f"[business {business_id}] {msg}", flush=True)
+
+    results = []
+    db = SessionLocal()
+    exists = None
+    try:
+        for filepath in files:
+            result = {'business_id': business_id, 'file': str(filepath), 'status': 'ok', 'error': None, 'seconds': 0.0}
+            t0 = time.perf_counter()
+            try:
+                if exists is None:
+                    exists = db.query(models.Business.id).filter(models.Business.id == business_id).first() is not None
+                if not exists:
+                    raise ValueError('business not found')
+                check = validate_dataset(filepath)
+                if check['errors']:
+                    raise ValueError('; '.join(check['errors']))
+                log(f"{filepath.name}: {check['rows']} rows ({check['undated']} undated, {check['missing_item'] + check['missing_category']} without item/category)")
+                checkpoint_path = filepath.with_name(filepath.name + '.checkpoint.json')
+                result.update(bulk_import(db, business_id, filepath, chunk_size, checkpoint_path, log=log))
+            except BaseException as e:  # SystemExit from bulk_import included
+                db.rollback()
+                result['status'] = 'failed'
+                result['error'] = (str(e).strip().splitlines() or [e.__class__.__name__])[0]
+                log(f"{filepath.name}: FAILED: {result['error']}")
+            result['seconds'] = time.perf_counter() - t0
+            results.append(result)
+    finally:
+        db.close()
+    return results
+
+
+def print_report(results, elapsed: float):
+    keys = [k for k, _ in SUMMARY_LABELS]
+    print()
+    print(f"{'business':>8}  {'status':<6} {'rows':>9} {'created':>9} {'dupes':>7} {'failed':>7} {'seconds':>8}  file")
+    totals = defaultdict(int)
+    for r in sorted(results, key=lambda r: (r['business_id'], r['file'])):
+        for k in keys:
+            totals[k] += r.get(k, 0)
+        print(f"{r['business_id']:>8}  {r['status']:<6} {r.get('rows_processed', 0):>9} {r.get('transactions_created', 0):>9} "
+              f"{r.get('duplicates', 0):>7} {r.get('failed', 0):>7} {r['seconds']:>8.1f}  {Path(r['file']).name}"
+              + (f"  ({r['error']})" if r['error'] else ''))
+    failed_files = sum(1 for r in results if r['status'] != 'ok')
+    print()
+    print(f"Files: {len(results)} ({failed_files} failed), businesses: {len({r['business_id'] for r in results})}, wall time: {elapsed:.1f}s")
+    for key, label in SUMMARY_LABELS:
+        print(f"{label}: {totals[key]}")
+    return failed_files
+
+
+def main():
+    p = argparse.ArgumentParser(description='Import many dataset CSVs (one business each) in parallel')
+    src = p.add_mutually_exclusive_group(required=True)
+    src.add_argument('--manifest', help='CSV with file,business_id columns')
+    src.add_argument('--dir', help='folder of CSVs named <anything>_<business_id>.csv')
+    p.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1), help='businesses imported concurrently (one DB connection each)')
+    p.add_argument('--chunk-size', type=int, default=5000, help='rows per committed chunk')
+    args = p.parse_args()
+
+    pairs = read_manifest(Path(args.manifest)) if args.manifest else scan_directory(Path(args.dir))
+    missing = [str(f) for f, _ in pairs if not f.exists()]
+    if missing:
+        raise SystemExit('Files not found:\n  ' + '\n  '.join(missing))
+    by_business = defaultdict(list)
+    for filepath, business_id in pairs:
+        by_business[business_id].append(filepath)
+    if not by_business:
+        raise SystemExit('Nothing to import')
+
+    workers = max(1, min(args.workers, len(by_business)))
+    print(f"Importing {len(pairs)} files for {len(by_business)} businesses with {workers} workers")
+    t0 = time.perf_counter()
+    results = []
+    # spawn, not fork: each worker builds its own engine and connection pool
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = {pool.submit(import_business, bid, files, max(1, args.chunk_size)): (bid, files) for bid, files in by_business.items()}
+        for fut in as_completed(futures):
+            bid, files = futures[fut]
+            try:
+                results.extend(fut.result())
+            except Exception as e:
+                # the worker process itself died
+                results.extend({'business_id': bid, 'file': str(f), 'status': 'failed', 'error': str(e), 'seconds': 0.0} for f in files)
+    failed = print_report(results, time.perf_counter() - t0)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -35,18 +35,54 @@ This script:
 - Ensures inventory items exist for the given business (creates with default quantity 1000).
 - Creates Income transactions linked to the inventory item with `used_quantity` equal to `quantity`.
 - Sets transaction.created_at to the CSV `date` when parseable.
+
+Bulk mode (`--bulk`, PostgreSQL only) produces the same data for large files
+in a handful of round trips per chunk instead of several commits per row:
+
+```powershell
+python -m app.scripts.import_dataset --business-id 3 --file app/data/retail_dataset_with_costs.csv --bulk --chunk-size 5000
+```
+
+- The CSV is streamed in chunks of `--chunk-size` rows. New items in a chunk
+  are inserted with `INSERT .. ON CONFLICT (business_id, item_name)`, sales
+  are loaded with `COPY`, sold quantities are subtracted from stock with one
+  UPDATE per item, and the chunk is committed.
+- Rows already present for the business (same date, item, quantity and
+  amount from an earlier import) are skipped as duplicates, so re-running
+  over the same file does not double the data.
+- After every commit a checkpoint (`<file>.checkpoint.json` unless
+  `--checkpoint` is given) records the position; a re-run with the same
+  file resumes after the last committed chunk. It is removed on success.
+- Rows without a parseable date are stamped with the import start time.
+- At the end the daily operating expenses are added (days that already
+  have one are skipped), `business_daily_totals` is rebuilt for the
+  business and the touched tables are ANALYZEd.
 """
 import argparse
 import csv
+import io
+import json
+import os
 import sys
 import random
-from datetime import datetime
+import time
+from datetime import datetime, timezone
 from decimal import Decimal
 from pathlib import Path
-from collections import defaultdict
+from collections import Counter, defaultdict, namedtuple
+from itertools import islice
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app.db.session import SessionLocal
+from app.db import matviews
 from app import models, crud
 
+IMPORT_SOURCE = 'dataset_import'
+DEFAULT_STOCK = 1000
+COPY_COLUMNS = ('business_id', 'type', 'amount', 'category', 'source', 'inventory_id', 'used_quantity', 'unit_cost', 'cost_amount', 'created_at')
+# one transactions row in COPY_COLUMNS order, plus the item name for messages
+_Sale = namedtuple('_Sale', COPY_COLUMNS + ('item_name',))
+
 
 def parse_date(s: str):
     if not s:
@@ -56,9 +92,15 @@ def parse_date(s: str):
         return None
     # Try ISO first
     try:
-        return datetime.fromisoformat(s)
+        dt = datetime.fromisoformat(s)
     except Exception:
         pass
+    else:
+        # created_at is naive UTC; an offset would otherwise be dropped by
+        # COPY and never match the stored value when deduplicating
+        if dt.tzinfo is not None:
+            dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+        return dt
     # Common fallbacks
     fmts = ['%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%d/%m/%Y', '%m/%d/%Y', '%Y/%m/%d']
     for f in fmts:
@@ -69,10 +111,308 @@ def parse_date(s: str):
     return None
 
 
+def parse_row(row: dict):
+    """Normalize one CSV row: (date_raw, item_name, category, quantity, sales_amount, cost_price)."""
+    date_raw = row.get('date')
+    item_name = (row.get('item_name') or '').strip()
+    category = (row.get('category') or '').strip() or None
+    qty_raw = row.get('quantity') or '0'
+    sales_raw = row.get('sales_amount') or '0'
+    cost_per_unit_raw = row.get('cost_per_unit') or ''
+
+    try:
+        quantity = int(float(qty_raw))
+    except Exception:
+        quantity = 0
+    try:
+        sales_amount = float(sales_raw) if sales_raw not in (None, '') else 0.0
+    except Exception:
+        sales_amount = 0.0
+    try:
+        cost_price = float(cost_per_unit_raw) if cost_per_unit_raw not in (None, '') else 0.0
+    except Exception:
+        cost_price = 0.0
+    return date_raw, item_name, category, quantity, sales_amount, cost_price
+
+
+REQUIRED_COLUMNS = ('date', 'item_name', 'category', 'quantity', 'sales_amount')
+
+
+def validate_dataset(filepath: Path) -> dict:
+    """Parse a whole CSV without touching the database.
+
+    Returns row counts plus `errors`, which is non-empty when the file
+    cannot be imported at all (unreadable, missing columns, no rows).
+    """
+    out = {'rows': 0, 'undated': 0, 'missing_item': 0, 'missing_category': 0, 'errors': []}
+    try:
+        with open(filepath, newline='', encoding='utf-8') as csvfile:
+            reader = csv.DictReader(csvfile)
+            missing = [c for c in REQUIRED_COLUMNS if c not in (reader.fieldnames or [])]
+            if missing:
+                out['errors'].append(f"missing columns: {', '.join(missing)}")
+                return out
+            for row in reader:
+                out['rows'] += 1
+                date_raw, item_name, category, *_ = parse_row(row)
+                if parse_date(date_raw) is None:
+                    out['undated'] += 1
+                if not item_name:
+                    out['missing_item'] += 1
+                if not category:
+                    out['missing_category'] += 1
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        out['errors'].append(str(e))
+    if not out['errors'] and out['rows'] == 0:
+        out['errors'].append('no data rows')
+    return out
+
+
+def _money(value) -> Decimal:
+    return Decimal(str(value)).quantize(Decimal('0.01'))
+
+
+class Checkpoint:
+    """Resumable import position, rewritten atomically after every committed chunk."""
+
+    def __init__(self, path: Path, business_id: int, filepath: Path):
+        self.path = path
+        stat = filepath.stat()
+        self.identity = {'business_id': business_id, 'file': str(filepath), 'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+        self.rows_done = 0
+        self.started_at = datetime.utcnow().isoformat()
+        self.revenue_by_date = {}
+        self.counts = Counter()
+
+    def load(self) -> bool:
+        if not self.path.exists():
+            return False
+        data = json.loads(self.path.read_text())
+        if data.get('identity') != self.identity:
+            raise SystemExit(f"Checkpoint {self.path} belongs to a different file or business; delete it to start over.")
+        self.rows_done = data['rows_done']
+        self.started_at = data['started_at']
+        self.revenue_by_date = data['revenue_by_date']
+        self.counts = Counter(data['counts'])
+        return True
+
+    def save(self):
+        tmp = self.path.with_suffix(self.path.suffix + '.tmp')
+        tmp.write_text(json.dumps({
+            'identity': self.identity, 'rows_done': self.rows_done, 'started_at': self.started_at,
+            'revenue_by_date': self.revenue_by_date, 'counts': dict(self.counts),
+        }))
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        if self.path.exists():
+            self.path.unlink()
+
+
+def _copy(db, table: str, columns, rows):
+    """COPY `rows` (tuples matching `columns`) into `table` on the session's connection."""
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    buf.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+    finally:
+        cursor.close()
+
+
+def _ensure_inventory(db, business_id: int, parsed, inventory: dict) -> int:
+    """Insert the chunk's unseen items (ON CONFLICT DO NOTHING) and load them into `inventory`.
+
+    `inventory` maps item_name -> {'id', 'category', 'cost_price', 'stock'};
+    returns how many items were created.
+    """
+    new = {}
+    for _, item_name, category, _, _, cost_price in parsed:
+        # same requirements as crud.create_inventory; rows for rejected items fail
+        if item_name in inventory or item_name in new or not category or cost_price < 0:
+            continue
+        new[item_name] = {'business_id': business_id, 'item_name': item_name, 'category': category, 'quantity': DEFAULT_STOCK, 'cost_price': cost_price}
+    unseen = {item_name for _, item_name, *_ in parsed if item_name not in inventory}
+    if not unseen:
+        return 0
+    created = 0
+    if new:
+        table = models.Inventory.__table__
+        stmt = pg_insert(table).values(list(new.values())).on_conflict_do_nothing(index_elements=['business_id', 'item_name']).returning(table.c.id)
+        created = len(db.execute(stmt).all())
+    found = db.execute(
+        text("SELECT id, item_name, category, cost_price, quantity FROM inventory WHERE business_id = :bid AND item_name = ANY(:names)"),
+        {'bid': business_id, 'names': list(unseen)},
+    )
+    for r in found:
+        inventory[r.item_name] = {'id': r.id, 'category': r.category, 'cost_price': r.cost_price or 0, 'stock': int(r.quantity or 0)}
+    return created
+
+
+def _existing_keys(db, business_id: int, rows) -> Counter:
+    """Multiset of (created_at, inventory_id, used_quantity, amount) already imported in the chunk's date range."""
+    dates = [r.created_at for r in rows]
+    found = db.execute(
+        text("""
+            SELECT created_at, inventory_id, used_quantity, amount FROM transactions
+            WHERE business_id = :bid AND source = :source AND created_at BETWEEN :lo AND :hi
+        """),
+        {'bid': business_id, 'source': IMPORT_SOURCE, 'lo': min(dates), 'hi': max(dates)},
+    )
+    return Counter((r.created_at, r.inventory_id, r.used_quantity, _money(r.amount)) for r in found)
+
+
+def _import_chunk(db, business_id: int, chunk, inventory: dict, checkpoint: Checkpoint, default_dt: datetime, log=print):
+    parsed = [parse_row(row) for row in chunk]
+    checkpoint.counts['inventory_created'] += _ensure_inventory(db, business_id, parsed, inventory)
+
+    candidates = []
+    for date_raw, item_name, category, quantity, sales_amount, _ in parsed:
+        inv = inventory.get(item_name)
+        if inv is None:
+            checkpoint.counts['failed'] += 1
+            continue
+        dt = parse_date(date_raw) or default_dt
+        # transaction category: inventory first, CSV second (as in the per-row path)
+        tx_category = inv['category'] if inv['category'] not in (None, '') else category
+        unit_cost = _money(inv['cost_price'])
+        candidates.append(_Sale(business_id, 'Income', _money(sales_amount), tx_category, IMPORT_SOURCE, inv['id'], quantity, unit_cost, unit_cost * quantity, dt, item_name))
+    if not candidates:
+        return
+
+    existing = _existing_keys(db, business_id, candidates)
+    rows = []
+    sold = Counter()
+    for c in candidates:
+        key = (c.created_at, c.inventory_id, c.used_quantity, c.amount)
+        if existing[key] > 0:
+            existing[key] -= 1
+            checkpoint.counts['duplicates'] += 1
+            continue
+        inv = inventory[c.item_name]
+        if c.used_quantity < 0 or inv['stock'] < c.used_quantity:
+            log(f"Skipping sale of {c.used_quantity} x '{c.item_name}' on {c.created_at.date()}: insufficient inventory quantity")
+            checkpoint.counts['failed'] += 1
+            continue
+        inv['stock'] -= c.used_quantity
+        sold[c.inventory_id] += c.used_quantity
+        rows.append(c[:len(COPY_COLUMNS)])
+        date_key = c.created_at.date().isoformat()
+        checkpoint.revenue_by_date[date_key] = checkpoint.revenue_by_date.get(date_key, 0.0) + float(c.amount)
+
+    if rows:
+        _copy(db, 'transactions', COPY_COLUMNS, rows)
+    if sold:
+        db.execute(
+            text("UPDATE inventory SET quantity = quantity - :sold WHERE id = :id"),
+            [{'id': inv_id, 'sold': qty} for inv_id, qty in sold.items()],
+        )
+    checkpoint.counts['transactions_created'] += len(rows)
+
+
+def _add_operating_expenses(db, business_id: int, revenue_by_date: dict) -> int:
+    """COPY one 'Operating' expense (5-10% of revenue) per imported day that has none yet."""
+    if not revenue_by_date:
+        return 0
+    have = {
+        d.isoformat() for (d,) in db.execute(
+            text("""
+                SELECT DISTINCT created_at::date FROM transactions
+                WHERE business_id = :bid AND type = 'Expense' AND category = 'Operating'
+                  AND created_at >= :lo AND created_at < (:hi)::date + 1
+            """),
+            {'bid': business_id, 'lo': min(revenue_by_date), 'hi': max(revenue_by_date)},
+        )
+    }
+    rows = []
+    for date_key, daily_revenue in sorted(revenue_by_date.items()):
+        op_amount = round(daily_revenue * random.uniform(0.05, 0.10), 2)
+        if op_amount <= 0 or date_key in have:
+            continue
+        rows.append((business_id, 'Expense', _money(op_amount), 'Operating', None, None, 0, None, None, datetime.fromisoformat(date_key)))
+    if rows:
+        _copy(db, 'transactions', COPY_COLUMNS, rows)
+    return len(rows)
+
+
+def bulk_import(db, business_id: int, filepath: Path, chunk_size: int, checkpoint_path: Path, log=print) -> dict:
+    """Run the --bulk import of one file into one business; returns the summary counts."""
+    if db.bind.dialect.name != 'postgresql':
+        raise SystemExit('--bulk requires PostgreSQL (it loads rows with COPY).')
+    checkpoint = Checkpoint(checkpoint_path, business_id, filepath)
+    if checkpoint.load():
+        log(f"Resuming from checkpoint {checkpoint_path}: {checkpoint.rows_done} rows already imported")
+    default_dt = datetime.fromisoformat(checkpoint.started_at)
+    inventory = {}
+    t0 = time.perf_counter()
+    with open(filepath, newline='', encoding='utf-8') as csvfile:
+        reader = csv.DictReader(csvfile)
+        for _ in islice(reader, checkpoint.rows_done):
+            pass
+        while True:
+            chunk = list(islice(reader, chunk_size))
+            if not chunk:
+                break
+            try:
+                _import_chunk(db, business_id, chunk, inventory, checkpoint, default_dt, log)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            checkpoint.rows_done += len(chunk)
+            checkpoint.save()
+            elapsed = time.perf_counter() - t0
+            c = checkpoint.counts
+            log(f"{checkpoint.rows_done} rows: {c['transactions_created']} created, {c['duplicates']} duplicates, {c['failed']} failed ({elapsed:.1f}s)")
+
+    try:
+        expense_created = _add_operating_expenses(db, business_id, checkpoint.revenue_by_date)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    # COPY bypassed the incremental rollup and data version; rebuild both
+    crud.rebuild_daily_totals(db, business_id)
+    matviews.note_write(checkpoint.counts['transactions_created'] + expense_created)
+    for table in ('transactions', 'inventory', 'business_daily_totals'):
+        db.execute(text(f'ANALYZE {table}'))
+    db.commit()
+    checkpoint.clear()
+
+    c = checkpoint.counts
+    return {
+        'rows_processed': checkpoint.rows_done,
+        'inventory_created': c['inventory_created'],
+        'transactions_created': c['transactions_created'],
+        'duplicates': c['duplicates'],
+        'failed': c['failed'],
+        'expense_created': expense_created,
+    }
+
+
+SUMMARY_LABELS = (
+    ('rows_processed', 'Rows processed'),
+    ('inventory_created', 'Inventory items created'),
+    ('transactions_created', 'Income transactions created'),
+    ('duplicates', 'Duplicate rows skipped'),
+    ('failed', 'Rows failed'),
+    ('expense_created', 'Operating expense transactions created'),
+)
+
+
+def print_summary(summary: dict):
+    for key, label in SUMMARY_LABELS:
+        print(f"{label}: {summary[key]}")
+
+
 def main():
     p = argparse.ArgumentParser(description='Import dataset: inventory + income transactions')
     p.add_argument('--business-id', type=int, required=True)
     p.add_argument('--file', required=True)
+    p.add_argument('--bulk', action='store_true', help='stream the file with bulk upserts and COPY (PostgreSQL)')
+    p.add_argument('--chunk-size', type=int, default=5000, help='rows per committed chunk in --bulk mode')
+    p.add_argument('--checkpoint', default=None, help='checkpoint file for --bulk (default: <file>.checkpoint.json)')
     args = p.parse_args()
 
     db = SessionLocal()
@@ -110,6 +450,15 @@ def main():
         print("Please provide the path relative to the backend folder, e.g. 'app/data/yourfile.csv', or an absolute path.")
         sys.exit(1)
 
+    if args.bulk:
+        checkpoint_path = Path(args.checkpoint) if args.checkpoint else filepath.with_name(filepath.name + '.checkpoint.json')
+        try:
+            summary = bulk_import(db, args.business_id, filepath, max(1, args.chunk_size), checkpoint_path, log=lambda msg: print(msg, flush=True))
+        finally:
+            db.close()
+        print_summary(summary)
+        return
+
     try:
         revenue_by_date = defaultdict(float)
         with open(filepath, newline='', encoding='utf-8') as csvfile:
@@ -117,25 +466,7 @@ def main():
             for row in reader:
                 rows_processed += 1
                 # Read fields
-                date_raw = row.get('date')
-                item_name = (row.get('item_name') or '').strip()
-                category = (row.get('category') or '').strip() or None
-                qty_raw = row.get('quantity') or '0'
-                sales_raw = row.get('sales_amount') or '0'
-                cost_per_unit_raw = row.get('cost_per_unit') or ''
-
-                try:
-                    quantity = int(float(qty_raw))
-                except Exception:
-                    quantity = 0
-                try:
-                    sales_amount = float(sales_raw) if sales_raw not in (None, '') else 0.0
-                except Exception:
-                    sales_amount = 0.0
-                try:
-                    cost_price = float(cost_per_unit_raw) if cost_per_unit_raw not in (None, '') else 0.0
-                except Exception:
-                    cost_price = 0.0
+                date_raw, item_name, category, quantity, sales_amount, cost_price = parse_row(row)
 
                 # Ensure inventory item exists
                 inv = db.query(models.Inventory).filter(models.Inventory.business_id == args.business_id, models.Inventory.item_name == item_name).first()
@@ -154,19 +485,13 @@ def main():
 
                 # Create income transaction linked to inventory
                 try:
-                    tx = crud.create_transaction_with_inventory(db, args.business_id, models.TransactionTypeEnum.Income, sales_amount, tx_category, inventory_id=inv.id, used_quantity=quantity, source='dataset_import')
-                    # Set created_at from CSV if parseable
+                    # Set created_at from CSV if parseable (at creation so the
+                    # daily rollup records the sale on its real date)
                     dt = parse_date(date_raw)
+                    tx = crud.create_transaction_with_inventory(db, args.business_id, models.TransactionTypeEnum.Income, sales_amount, tx_category, inventory_id=inv.id, used_quantity=quantity, source='dataset_import', created_at=dt)
                     # Use date key as ISO date string (YYYY-MM-DD) for daily aggregation
                     date_key = None
                     if dt is not None:
-                        try:
-                            tx.created_at = dt
-                            db.add(tx)
-                            db.commit()
-                            db.refresh(tx)
-                        except Exception:
-                            db.rollback()
                         date_key = dt.date().isoformat()
                     else:
                         # fallback: use today's date
@@ -192,17 +517,9 @@ def main():
             if op_amount <= 0:
                 continue
             try:
-                # create an expense transaction (no inventory linkage)
-                exp_tx = crud.create_transaction(db, args.business_id, models.TransactionTypeEnum.Expense, op_amount, category='Operating')
-                # set created_at to the day's date
-                try:
-                    exp_dt = datetime.fromisoformat(date_key)
-                    exp_tx.created_at = exp_dt
-                    db.add(exp_tx)
-                    db.commit()
-                    db.refresh(exp_tx)
-                except Exception:
-                    db.rollback()
+                # create an expense transaction (no inventory linkage) dated to the day
+                exp_dt = datetime.fromisoformat(date_key)
+                crud.create_transaction(db, args.business_id, models.TransactionTypeEnum.Expense, op_amount, category='Operating', created_at=exp_dt)
                 expense_created += 1
             except Exception as e:
                 print(f"Failed to create operating expense for {date_key}: {e}")
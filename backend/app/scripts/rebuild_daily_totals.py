@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""Rebuild or verify the business_daily_totals rollup from raw transactions.
+
+The rollup is maintained incrementally by the transaction write paths in
+`crud.py`. Use this script to backfill it for existing data, or to check
+it for drift (e.g. after manual SQL edits to `transactions`). COGS comes
+from each sale's snapshotted `cost_amount`, so later inventory `cost_price`
+changes are intentionally not reflected.
+
+Usage (from the backend folder):
+
+```powershell
+python -m app.scripts.rebuild_daily_totals
+python -m app.scripts.rebuild_daily_totals --business-id 3
+python -m app.scripts.rebuild_daily_totals --verify
+```
+
+`--verify` only reports differences and exits with status 1 when the
+rollup has drifted; it never writes.
+"""
+import argparse
+import sys
+from app.db.session import SessionLocal
+from app import crud
+
+
+def main():
+    p = argparse.ArgumentParser(description='Rebuild or verify business_daily_totals')
+    p.add_argument('--business-id', type=int, default=None, help='limit to one business (default: all)')
+    p.add_argument('--verify', action='store_true', help='report drift without rebuilding')
+    args = p.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.verify:
+            drift = crud.verify_daily_totals(db, args.business_id)
+            for d in drift:
+                print(f"business={d['business_id']} day={d['day']} category={d['category']!r} {d['field']}: expected={d['expected']} actual={d['actual']}")
+            print(f"Drifted values: {len(drift)}")
+            sys.exit(1 if drift else 0)
+        rows = crud.rebuild_daily_totals(db, args.business_id)
+        print(f"Rollup rows written: {rows}")
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
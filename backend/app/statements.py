@@ -0,0 +1,124 @@
+"""Multi-page transaction statement PDFs drawn page by page.
+
+`render_statement` consumes an iterator of transaction rows (the dicts of
+`crud.iter_transactions_with_items`) and draws each page as soon as it is
+full, so only one page of rows is ever held in Python. ReportLab's canvas
+keeps just the finished, compressed page streams until `save()`, which
+writes them to `out`. Every page ends with its income/expense subtotals;
+the last one carries the period P&L.
+"""
+from datetime import datetime
+
+ROWS_PER_PAGE = 45
+_COLUMNS = (('Date', 40), ('ID', 110), ('Item / Category', 160), ('Type', 370), ('Qty', 430), ('Amount', 560))
+
+
+def _money(value) -> str:
+    return f'{float(value or 0.0):,.2f}'
+
+
+class _StatementWriter:
+    def __init__(self, out, title: str, subtitle: str):
+        from reportlab.lib.pagesizes import letter
+        from reportlab.pdfgen import canvas
+
+        self.canvas = canvas.Canvas(out, pagesize=letter, pageCompression=1)
+        self.width, self.height = letter
+        self.title = title
+        self.subtitle = subtitle
+        self.page = 0
+
+    def header(self):
+        c = self.canvas
+        self.page += 1
+        c.setFont('Helvetica-Bold', 14)
+        c.drawString(40, self.height - 50, self.title)
+        c.setFont('Helvetica', 9)
+        c.drawString(40, self.height - 66, self.subtitle)
+        c.drawRightString(self.width - 40, self.height - 50, f'Page {self.page}')
+        y = self.height - 92
+        c.setFont('Helvetica-Bold', 9)
+        for label, x in _COLUMNS:
+            if label in ('Qty', 'Amount'):
+                c.drawRightString(x, y, label)
+            else:
+                c.drawString(x, y, label)
+        c.line(40, y - 4, self.width - 40, y - 4)
+        return y - 16
+
+    def page_of_rows(self, rows):
+        c = self.canvas
+        y = self.header()
+        income = expense = 0.0
+        c.setFont('Helvetica', 8)
+        for r in rows:
+            label = r.get('item_name') or r.get('category') or ''
+            if r.get('item_name') and r.get('category'):
+                label = f"{r['item_name']} / {r['category']}"
+            c.drawString(40, y, (r.get('created_at') or '')[:16].replace('T', ' '))
+            c.drawString(110, y, str(r.get('id', '')))
+            c.drawString(160, y, label[:42])
+            c.drawString(370, y, r.get('type') or '')
+            c.drawRightString(430, y, str(r.get('used_quantity') or 0))
+            c.drawRightString(560, y, _money(r.get('amount')))
+            if r.get('type') == 'Income':
+                income += float(r.get('amount') or 0.0)
+            else:
+                expense += float(r.get('amount') or 0.0)
+            y -= 14
+        c.line(40, y + 6, self.width - 40, y + 6)
+        c.setFont('Helvetica-Bold', 8)
+        c.drawString(160, y - 8, 'Page subtotal')
+        c.drawRightString(430, y - 8, f'Income {_money(income)}')
+        c.drawRightString(560, y - 8, f'Expense {_money(expense)}')
+        return y - 8
+
+    def pnl(self, y, lines):
+        c = self.canvas
+        if y - 30 - 14 * len(lines) < 50:
+            c.showPage()
+            y = self.header()
+        y -= 30
+        c.setFont('Helvetica-Bold', 11)
+        c.drawString(40, y, 'Period P&L')
+        c.setFont('Helvetica', 10)
+        for label, value in lines:
+            y -= 14
+            c.drawString(60, y, label)
+            c.drawRightString(300, y, _money(value))
+
+    def finish_page(self):
+        self.canvas.showPage()
+
+    def save(self):
+        self.canvas.save()
+
+
+def render_statement(out, rows, business_name: str, start, end, pnl_lines) -> int:
+    """Write a statement PDF for `rows` to the binary file `out`; returns the page count.
+
+    `pnl_lines` is a list of (label, amount) pairs printed as the period P&L
+    footer on the last page.
+    """
+    writer = _StatementWriter(
+        out,
+        f'{business_name} - Statement',
+        f'Period {start.isoformat()} to {end.isoformat()} - generated {datetime.utcnow().strftime("%Y-%m-%d %H:%M")} UTC',
+    )
+    page, y = [], None
+    for row in rows:
+        page.append(row)
+        if len(page) == ROWS_PER_PAGE:
+            y = writer.page_of_rows(page)
+            page = []
+            writer.finish_page()
+    if page or y is None:
+        # last partial page (or an empty statement): P&L goes below the rows
+        y = writer.page_of_rows(page)
+    else:
+        # the rows ended on a full page; start a fresh one for the P&L
+        y = writer.header()
+    writer.pnl(y, pnl_lines)
+    writer.finish_page()
+    writer.save()
+    return writer.page
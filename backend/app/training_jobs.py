@@ -0,0 +1,182 @@
+"""On-demand profit model training jobs (`POST /ml/train/{business_id}`).
+
+Jobs are rows of the `training_jobs` table, so any API worker can report
+any job, and "one job per business" holds across workers: a partial unique
+index admits a single queued/running row per business, and a second request
+gets that job back. At most `ML_TRAIN_MAX_PENDING` jobs are queued or
+running at once, counted over all workers.
+
+The fit runs in the worker that accepted the request, in a small process
+pool (`ML_TRAIN_WORKERS` fits at a time; 0 runs them on one background
+thread instead), so pandas/scikit-learn work never holds the GIL or a
+threadpool token that API requests need; pool processes also run at a lower
+CPU priority. The pool marks the job running and the accepting worker
+records the result. If that worker dies first, the job stays active until
+`ML_TRAIN_JOB_TIMEOUT_SECONDS` after it was queued and is then marked
+failed, so the business can be trained again.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models
+from .core.config import settings
+
+_logger = logging.getLogger(__name__)
+
+TRAIN_WORKERS = int(getattr(settings, 'ML_TRAIN_WORKERS', 1))
+MAX_PENDING = int(getattr(settings, 'ML_TRAIN_MAX_PENDING', 50))
+JOB_TIMEOUT_SECONDS = int(getattr(settings, 'ML_TRAIN_JOB_TIMEOUT_SECONDS', 3600))
+ACTIVE = ('queued', 'running')
+
+_pool = None
+_lock = threading.Lock()
+
+
+class TooManyJobs(Exception):
+    pass
+
+
+def job_dict(job: models.TrainingJob) -> dict:
+    return {
+        'id': job.id,
+        'business_id': job.business_id,
+        'status': job.status,
+        'created_at': job.created_at.isoformat() + 'Z',
+        'finished_at': job.finished_at.isoformat() + 'Z' if job.finished_at else None,
+        'seconds': job.seconds,
+        'metrics': job.metrics or {},
+        'model_version': job.model_version,
+        'error': job.error,
+    }
+
+
+def _lower_priority():
+    # fits are background work; let the API processes win the CPU
+    if hasattr(os, 'nice'):
+        os.nice(10)
+
+
+def _update(job_id: int, values: dict, only_active: bool = False):
+    from .db.session import SessionLocal
+    db = SessionLocal()
+    try:
+        q = db.query(models.TrainingJob).filter(models.TrainingJob.id == job_id)
+        if only_active:
+            q = q.filter(models.TrainingJob.status.in_(ACTIVE))
+        q.update(values, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _train(job_id: int, business_id: int) -> dict:
+    # runs in the pool
+    _update(job_id, {'status': 'running'}, only_active=True)
+    from backend.ml.train_all import train_business
+    return train_business(business_id)
+
+
+def _executor():
+    global _pool
+    with _lock:
+        if _pool is None:
+            if TRAIN_WORKERS <= 0:
+                _pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ml-train')
+            else:
+                # spawn: forking a process that runs threads (anyio, matview refresh) is unsafe
+                _pool = ProcessPoolExecutor(max_workers=TRAIN_WORKERS, mp_context=multiprocessing.get_context('spawn'), initializer=_lower_priority)
+        return _pool
+
+
+def _finished(job_id: int, business_id: int, future):
+    try:
+        result = future.result()
+    except Exception as e:
+        # the worker process died or the pool was shut down
+        _logger.exception('Training job %s for business_id=%s crashed', job_id, business_id)
+        result = {'status': 'failed', 'seconds': None, 'metrics': {}, 'model_version': None, 'error': str(e) or e.__class__.__name__}
+    try:
+        _update(job_id, {
+            'status': 'succeeded' if result['status'] == 'trained' else 'failed',
+            'finished_at': datetime.utcnow(),
+            'seconds': result['seconds'],
+            'metrics': result['metrics'] or {},
+            'model_version': result['model_version'],
+            'error': result['error'],
+        })
+    except Exception:
+        _logger.exception('Could not record the result of training job %s', job_id)
+    if result['status'] == 'trained':
+        from .core.cache import model_cache
+        model_cache.invalidate(int(business_id))
+
+
+def _active_job(db: Session, business_id: int):
+    return db.query(models.TrainingJob).filter(
+        models.TrainingJob.business_id == business_id, models.TrainingJob.status.in_(ACTIVE)
+    ).first()
+
+
+def _expire_abandoned(db: Session):
+    # jobs of a worker that died before recording the result
+    cutoff = datetime.utcnow() - timedelta(seconds=JOB_TIMEOUT_SECONDS)
+    db.query(models.TrainingJob).filter(
+        models.TrainingJob.status.in_(ACTIVE), models.TrainingJob.created_at < cutoff
+    ).update({'status': 'failed', 'finished_at': datetime.utcnow(), 'error': 'Abandoned: no result recorded'}, synchronize_session=False)
+
+
+def submit(db: Session, business_id: int):
+    """Queue a training job, or return the business's queued/running one.
+
+    Returns `(job, created)`. Raises `TooManyJobs` when `MAX_PENDING` jobs
+    are already queued or running.
+    """
+    _expire_abandoned(db)
+    job = _active_job(db, business_id)
+    if job is not None:
+        db.commit()
+        return job, False
+    pending = db.query(models.TrainingJob.id).filter(models.TrainingJob.status.in_(ACTIVE)).count()
+    if pending >= MAX_PENDING:
+        db.commit()
+        raise TooManyJobs(f'{MAX_PENDING} training jobs already pending')
+    job = models.TrainingJob(business_id=business_id, status='queued')
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # another worker queued one for this business in the meantime
+        db.rollback()
+        job = _active_job(db, business_id)
+        if job is None:
+            raise
+        return job, False
+    job_id = job.id
+    try:
+        future = _executor().submit(_train, job_id, business_id)
+    except Exception as e:
+        _update(job_id, {'status': 'failed', 'finished_at': datetime.utcnow(), 'error': str(e) or e.__class__.__name__})
+        db.refresh(job)
+        return job, True
+    future.add_done_callback(lambda f: _finished(job_id, business_id, f))
+    return job, True
+
+
+def get(db: Session, job_id: int):
+    return db.get(models.TrainingJob, job_id)
+
+
+def shutdown():
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    # outside the lock: cancelling runs the jobs' done callbacks right here
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -57,6 +57,11 @@ def load_profit_model(*args, **kwargs):
     return _fn(*args, **kwargs)
 
 
+def get_profit_model(*args, **kwargs):
+    from backend.ml.model_store import get_profit_model as _fn
+    return _fn(*args, **kwargs)
+
+
 def predict_next_month_profit(*args, **kwargs):
     from backend.ml.model_store import predict_next_month_profit as _fn
     return _fn(*args, **kwargs)
@@ -64,6 +69,6 @@ def predict_next_month_profit(*args, **kwargs):
 
 __all__ = [
     'ensure_ml_dependencies', 'train_profit_model', 'save_profit_model',
-    'load_profit_model', 'predict_next_month_profit'
+    'load_profit_model', 'get_profit_model', 'predict_next_month_profit'
 ]
 
@@ -24,13 +24,48 @@ def _ensure_pandas():
         raise ImportError("pandas is required for ML data transformations; please install pandas") from e
 
 
-def _to_float(v):
-    try:
-        if v is None:
-            return 0.0
-        return float(v)
-    except Exception:
-        return 0.0
+def _read_copy_csv(buf, numeric=()):
+    """DataFrame from `COPY .. TO STDOUT WITH (FORMAT csv, HEADER)` output.
+
+    Only unquoted empty fields (NULL) become NaN, so item names such as 'NA'
+    survive; `numeric` columns are float64 with NULL -> 0.0, all others
+    stay strings.
+    """
+    from collections import defaultdict
+    pd = _ensure_pandas()
+    dtype = defaultdict(lambda: str, {k: 'float64' for k in numeric})
+    df = pd.read_csv(buf, dtype=dtype, keep_default_na=False, na_values=[''])
+    for key in numeric:
+        df[key] = df[key].fillna(0.0)
+    return df
+
+
+def _frame(db: Any, sql: str, params: dict, numeric=()):
+    """Run `sql` and return its rows as a DataFrame, columns filled column-wise.
+
+    On PostgreSQL the result is streamed with `COPY (..) TO STDOUT` as CSV
+    and parsed by pandas' C reader, so no Python object is created per row or
+    value. Other databases go through `pandas.read_sql`. `numeric` columns
+    are float64 with NULL -> 0.0 either way.
+    """
+    pd = _ensure_pandas()
+    stmt = text(sql).bindparams(**params)
+    bind = db.get_bind()
+    if bind.dialect.name == 'postgresql':
+        import io
+        query = stmt.compile(dialect=bind.dialect, compile_kwargs={'literal_binds': True})
+        buf = io.StringIO()
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(f'COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)', buf)
+        finally:
+            cursor.close()
+        buf.seek(0)
+        return _read_copy_csv(buf, numeric)
+    df = pd.read_sql(stmt, db.connection())
+    for key in numeric:
+        df[key] = pd.to_numeric(df[key]).astype('float64').fillna(0.0)
+    return df
 
 
 def get_monthly_profit_dataset(db: Any, business_id: int):
@@ -50,49 +85,33 @@ def get_monthly_profit_dataset(db: Any, business_id: int):
     """
     pd = _ensure_pandas()
 
-    sql = text("SELECT month, sales, cost, profit FROM analytics_monthly WHERE business_id = :bid ORDER BY month ASC")
-    rows = db.execute(sql, {"bid": business_id}).fetchall()
+    sql = "SELECT month, sales AS total_sales, cost AS total_cost, profit AS total_profit FROM analytics_monthly WHERE business_id = :bid ORDER BY month ASC"
+    df = _frame(db, sql, {"bid": int(business_id)}, numeric=('total_sales', 'total_cost', 'total_profit'))
 
     cols = ['month', 'year', 'month_num', 'total_sales', 'total_cost', 'total_profit', 'rolling_3m_sales', 'rolling_3m_profit']
 
-    if not rows:
+    if df.empty:
         return pd.DataFrame(columns=cols)
 
-    records = []
-    for row in rows:
-        mapping = row._mapping if hasattr(row, '_mapping') else dict(row)
-        month = mapping.get('month')
-        sales = _to_float(mapping.get('sales'))
-        cost = _to_float(mapping.get('cost'))
-        profit = _to_float(mapping.get('profit'))
-        records.append({'month': month, 'total_sales': sales, 'total_cost': cost, 'total_profit': profit})
-
-    df = pd.DataFrame.from_records(records)
     # parse month -> timestamp at start of month
     df['month_parsed'] = pd.to_datetime(df['month'].astype(str) + '-01', errors='coerce')
     df['year'] = df['month_parsed'].dt.year
     df['month_num'] = df['month_parsed'].dt.month
 
-    # ensure numeric types
-    df['total_sales'] = pd.to_numeric(df['total_sales'], errors='coerce').fillna(0.0)
-    df['total_cost'] = pd.to_numeric(df['total_cost'], errors='coerce').fillna(0.0)
-    df['total_profit'] = pd.to_numeric(df['total_profit'], errors='coerce').fillna(0.0)
-
     # rolling sums (window includes current row and previous 2 rows)
     df = df.sort_values('month_parsed').reset_index(drop=True)
     df['rolling_3m_sales'] = df['total_sales'].rolling(window=3, min_periods=1).sum()
     df['rolling_3m_profit'] = df['total_profit'].rolling(window=3, min_periods=1).sum()
 
-    out = df[['month', 'year', 'month_num', 'total_sales', 'total_cost', 'total_profit', 'rolling_3m_sales', 'rolling_3m_profit']].copy()
-    return out
+    return df[cols].copy()
 
 
 def get_item_sales_dataset(db: Any, business_id: int):
     """Return item-level monthly sales dataset as a pandas DataFrame.
 
     Steps:
-      - Query `ml_transactions` for the business
-      - Group by (`item_name`, `month`) and aggregate sums
+      - Aggregate `ml_transactions` for the business by (`item_name`, `month`)
+        in SQL, so only one row per item and month is fetched
       - Compute `margin = sales_amount - cost_amount`
       - Add `month_num` and per-item `rolling_3m_quantity`
 
@@ -103,54 +122,26 @@ def get_item_sales_dataset(db: Any, business_id: int):
     """
     pd = _ensure_pandas()
 
-    sql = text("SELECT item_name, month, COALESCE(quantity,0) AS quantity, COALESCE(sales_amount,0) AS sales_amount, COALESCE(cost_amount,0) AS cost_amount, COALESCE(profit,0) AS profit FROM ml_transactions WHERE business_id = :bid")
-    rows = db.execute(sql, {"bid": business_id}).fetchall()
+    sql = (
+        "SELECT item_name, month, SUM(COALESCE(quantity,0)) AS quantity, SUM(COALESCE(sales_amount,0)) AS sales_amount,"
+        " SUM(COALESCE(cost_amount,0)) AS cost_amount, SUM(COALESCE(profit,0)) AS profit"
+        " FROM ml_transactions WHERE business_id = :bid GROUP BY item_name, month"
+    )
+    agg = _frame(db, sql, {"bid": int(business_id)}, numeric=('quantity', 'sales_amount', 'cost_amount', 'profit'))
 
     cols = ['item_name', 'month', 'quantity', 'sales_amount', 'cost_amount', 'profit', 'margin', 'month_num', 'rolling_3m_quantity']
 
-    if not rows:
+    if agg.empty:
         return pd.DataFrame(columns=cols)
 
-    records = []
-    for row in rows:
-        mapping = row._mapping if hasattr(row, '_mapping') else dict(row)
-        item = mapping.get('item_name')
-        month = mapping.get('month')
-        qty = mapping.get('quantity')
-        sales_amount = mapping.get('sales_amount')
-        cost_amount = mapping.get('cost_amount')
-        profit = mapping.get('profit')
-        records.append({
-            'item_name': item,
-            'month': month,
-            'quantity': float(qty) if qty is not None else 0.0,
-            'sales_amount': _to_float(sales_amount),
-            'cost_amount': _to_float(cost_amount),
-            'profit': _to_float(profit)
-        })
-
-    df = pd.DataFrame.from_records(records)
-    # aggregate by item_name + month
-    agg = df.groupby(['item_name', 'month'], dropna=False).agg({
-        'quantity': 'sum',
-        'sales_amount': 'sum',
-        'cost_amount': 'sum',
-        'profit': 'sum'
-    }).reset_index()
-
     # derived features
     agg['margin'] = agg['sales_amount'] - agg['cost_amount']
     agg['month_parsed'] = pd.to_datetime(agg['month'].astype(str) + '-01', errors='coerce')
     agg['month_num'] = agg['month_parsed'].dt.month
 
-    # rolling 3-month quantity per item
+    # rolling 3-month quantity per item, as one grouped rolling window
     agg = agg.sort_values(['item_name', 'month_parsed']).reset_index(drop=True)
-    def _rolling_qty(g):
-        g = g.sort_values('month_parsed')
-        g['rolling_3m_quantity'] = g['quantity'].rolling(window=3, min_periods=1).sum()
-        return g
-
-    agg = agg.groupby('item_name', group_keys=False).apply(_rolling_qty).reset_index(drop=True)
+    rolling = agg.groupby('item_name', dropna=False, sort=False)['quantity'].rolling(window=3, min_periods=1).sum()
+    agg['rolling_3m_quantity'] = rolling.reset_index(level=0, drop=True)
 
-    out = agg[['item_name', 'month', 'quantity', 'sales_amount', 'cost_amount', 'profit', 'margin', 'month_num', 'rolling_3m_quantity']].copy()
-    return out
+    return agg[cols].copy()
@@ -3,20 +3,26 @@
 Functions:
 - save_profit_model(model, business_id, feature_columns, metrics)
 - load_profit_model(business_id) -> (model, metadata)
+- get_profit_model(business_id) -> ProfitModel (cached load_profit_model)
+- predict_next_month(db, business_id) -> (target month, predicted profit)
 - predict_next_month_profit(db, business_id) -> float
 
 Models and metadata are stored under `backend/ml/models/` using joblib
-and JSON for metadata.
+and JSON for metadata. Every save stamps a new `model_version` into the
+metadata; `get_profit_model` keeps loaded models in `model_cache` and
+reloads one as soon as its files change on disk.
 """
 from pathlib import Path
 import os
 import json
 from datetime import datetime
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, NamedTuple, Tuple
 import logging
 
 import joblib
 
+from backend.app.core.cache import model_cache
+
 
 BASE_DIR = Path(__file__).resolve().parent
 MODELS_DIR = BASE_DIR / 'models'
@@ -31,7 +37,23 @@ def _model_paths(business_id: int) -> Tuple[Path, Path]:
     return model_path, meta_path
 
 
-def save_profit_model(model: Any, business_id: int, feature_columns: list, metrics: Dict[str, float]):
+class ProfitModel(NamedTuple):
+    model: Any
+    meta: Dict
+    version: str
+
+
+def _write_atomic(path: Path, write):
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def save_profit_model(model: Any, business_id: int, feature_columns: list, metrics: Dict[str, float], dataset_fingerprint: str = None):
     """Serialize model and metadata for a business.
 
     Args:
@@ -39,19 +61,32 @@ def save_profit_model(model: Any, business_id: int, feature_columns: list, metri
         business_id: business identifier
         feature_columns: list of feature column names used for training
         metrics: dict containing evaluation metrics (e.g., r2, mae)
+        dataset_fingerprint: digest of the training data (see `train_all`)
+
+    Both files are replaced atomically, model first, so a concurrent reader
+    sees either version but never a partial file. Returns the metadata.
     """
     model_path, meta_path = _model_paths(business_id)
-    # write model
-    joblib.dump(model, str(model_path))
-    # write metadata
+    trained_at = datetime.utcnow()
     meta = {
         'business_id': int(business_id),
-        'trained_at': datetime.utcnow().isoformat() + 'Z',
+        'model_version': trained_at.strftime('%Y%m%dT%H%M%S%fZ'),
+        'trained_at': trained_at.isoformat() + 'Z',
         'feature_columns': list(feature_columns),
         'metrics': metrics
     }
-    with open(meta_path, 'w', encoding='utf-8') as f:
-        json.dump(meta, f, ensure_ascii=False, indent=2)
+    if dataset_fingerprint is not None:
+        meta['dataset_fingerprint'] = dataset_fingerprint
+
+    def _dump_meta(path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    _write_atomic(model_path, lambda path: joblib.dump(model, str(path)))
+    _write_atomic(meta_path, _dump_meta)
+    # drop this process's copy now; other workers see the new mtime
+    model_cache.invalidate(int(business_id))
+    return meta
 
 
 def load_profit_model(business_id: int) -> Tuple[Any, Dict]:
@@ -77,13 +112,71 @@ def load_profit_model(business_id: int) -> Tuple[Any, Dict]:
         raise
 
 
-def predict_next_month_profit(db: Any, business_id: int) -> float:
-    """Load model and predict next month's profit for the business.
+def load_profit_meta(business_id: int):
+    """The saved metadata of a business's model, or None when there is none."""
+    _, meta_path = _model_paths(business_id)
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
 
-    The feature vector is constructed from the latest row in
-    `get_monthly_profit_dataset(db, business_id)`. For the next-month
-    `month_num` the function increments the last month (wraps at 12).
-    Other numeric features are taken from the latest row as-is.
+def _file_stamp(business_id: int):
+    model_path, meta_path = _model_paths(business_id)
+    try:
+        m, j = model_path.stat(), meta_path.stat()
+    except FileNotFoundError:
+        raise FileNotFoundError('Model not trained')
+    return (m.st_mtime_ns, m.st_size, j.st_mtime_ns, j.st_size)
+
+
+def get_profit_model(business_id: int) -> ProfitModel:
+    """Return the business's profit model, loading it only when its files changed.
+
+    Raises FileNotFoundError if the model is not trained. Models saved before
+    versions were stamped report their `trained_at` as version.
+    """
+    key = int(business_id)
+    try:
+        stamp = _file_stamp(business_id)
+    except FileNotFoundError:
+        model_cache.invalidate(key)
+        raise
+    if model_cache.enabled:
+        cached = model_cache.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    model, meta = load_profit_model(business_id)
+    version = str(meta.get('model_version') or meta.get('trained_at') or f'mtime-{stamp[0]}')
+    loaded = ProfitModel(model, meta, version)
+    if model_cache.enabled:
+        # files replaced while loading get a newer stamp, so this entry is
+        # simply reloaded on the next call
+        model_cache.set(key, (stamp, loaded))
+    return loaded
+
+
+def next_month_label(month: str):
+    """'YYYY-MM' of the month after `month` ('YYYY-MM'), or None if malformed."""
+    parts = str(month).split('-')
+    if len(parts) != 2:
+        return None
+    try:
+        y, m = int(parts[0]), int(parts[1])
+    except ValueError:
+        return None
+    return f"{y + (m == 12):04d}-{m % 12 + 1:02d}"
+
+
+def predict_next_month(db: Any, business_id: int, loaded: ProfitModel = None) -> Tuple[str, float]:
+    """Predict next month's profit with `loaded` (default: `get_profit_model`).
+
+    Returns `(predicted_month, predicted_profit)`; both come from a single
+    `get_monthly_profit_dataset(db, business_id)` read. The feature vector is
+    constructed from the latest row. For the next-month `month_num` the
+    function increments the last month (wraps at 12). Other numeric features
+    are taken from the latest row as-is.
 
     Raises:
         FileNotFoundError: if model not found
@@ -101,7 +194,7 @@ def predict_next_month_profit(db: Any, business_id: int) -> float:
         raise
 
     _logger.info('Predicting next month profit for business_id=%s', business_id)
-    model, meta = load_profit_model(business_id)
+    model, meta, _ = loaded or get_profit_model(business_id)
     df = get_monthly_profit_dataset(db, business_id)
     if df is None or len(df) == 0:
         _logger.warning('No monthly data available for business_id=%s', business_id)
@@ -114,6 +207,7 @@ def predict_next_month_profit(db: Any, business_id: int) -> float:
 
     # Use the most recent month row as basis for next-month features
     last = df.sort_values('month', ascending=True).iloc[-1]
+    predicted_month = next_month_label(last.get('month'))
 
     # build feature vector dict
     fv = {}
@@ -147,6 +241,11 @@ def predict_next_month_profit(db: Any, business_id: int) -> float:
         raise ValueError(f'Model prediction failed: {e}') from e
 
     try:
-        return float(pred[0])
+        return predicted_month, float(pred[0])
     except Exception:
         raise ValueError('Model returned non-numeric prediction')
+
+
+def predict_next_month_profit(db: Any, business_id: int, loaded: ProfitModel = None) -> float:
+    """Next month's predicted profit only; see `predict_next_month`."""
+    return predict_next_month(db, business_id, loaded)[1]
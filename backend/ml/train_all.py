@@ -0,0 +1,164 @@
+"""Admin script: retrain the profit model of every business in parallel.
+
+Run as:
+  python -m backend.ml.train_all
+  python -m backend.ml.train_all --workers 8
+  python -m backend.ml.train_all --business-ids 3 7 12 --force
+
+The monthly dataset of every business is fingerprinted up front with one
+scan of `analytics_monthly`. A business whose fingerprint equals the one
+stored with its model (`dataset_fingerprint` in the metadata) has had no new
+data since `trained_at` and is skipped. The others are fitted in a process
+pool; each worker keeps pandas/scikit-learn imported across businesses and
+saves through `save_profit_model`, which replaces the model files
+atomically. A per-business timing and metrics summary is printed at the
+end; the exit status is 1 when any fit failed.
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from sqlalchemy import bindparam, text
+
+
+def dataset_fingerprints(db, business_ids=None):
+    """{business_id: sha256 of its analytics_monthly rows} in one ordered scan."""
+    if business_ids is None:
+        rows = db.execute(text('SELECT business_id, month, sales, cost, profit FROM analytics_monthly ORDER BY business_id, month'))
+    elif not business_ids:
+        return {}
+    else:
+        sql = text('SELECT business_id, month, sales, cost, profit FROM analytics_monthly WHERE business_id IN :ids ORDER BY business_id, month')
+        rows = db.execute(sql.bindparams(bindparam('ids', expanding=True)), {'ids': list(business_ids)})
+    out = {}
+    current, digest = None, None
+    for bid, month, sales, cost, profit in rows:
+        if bid != current:
+            if digest is not None:
+                out[current] = digest.hexdigest()
+            current, digest = bid, hashlib.sha256()
+        digest.update(f'{month}|{float(sales or 0)!r}|{float(cost or 0)!r}|{float(profit or 0)!r}\n'.encode())
+    if digest is not None:
+        out[current] = digest.hexdigest()
+    return out
+
+
+def train_business(business_id: int, fingerprint: str = None) -> dict:
+    """Worker: fit and save one business's model. Never raises.
+
+    Without `fingerprint` the dataset is fingerprinted here (used by the
+    API's on-demand training jobs).
+    """
+    from backend.app.db.session import SessionLocal
+    from backend.ml.train_profit_model import train_profit_model
+    from backend.ml.model_store import save_profit_model
+
+    result = {'business_id': business_id, 'status': 'trained', 'seconds': 0.0, 'metrics': {}, 'model_version': None, 'error': None}
+    t0 = time.perf_counter()
+    db = SessionLocal()
+    try:
+        if fingerprint is None:
+            fingerprint = dataset_fingerprints(db, [business_id]).get(business_id)
+        model, metrics, features = train_profit_model(db, business_id)
+        meta = save_profit_model(model, business_id, features, metrics, dataset_fingerprint=fingerprint)
+        result['metrics'] = metrics
+        result['model_version'] = meta['model_version']
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = (str(e).strip().splitlines() or [e.__class__.__name__])[0]
+    finally:
+        db.close()
+    result['seconds'] = time.perf_counter() - t0
+    return result
+
+
+def plan(db, business_ids=None, force: bool = False):
+    """Split the businesses into [(business_id, fingerprint)] to train and skip results."""
+    from backend.app import models
+    from backend.ml.model_store import load_profit_meta
+
+    q = db.query(models.Business.id).order_by(models.Business.id)
+    if business_ids:
+        q = q.filter(models.Business.id.in_(business_ids))
+    ids = [bid for (bid,) in q]
+    fingerprints = dataset_fingerprints(db, set(ids))
+    todo, skipped = [], []
+    for bid in ids:
+        fp = fingerprints.get(bid)
+        if fp is None:
+            skipped.append({'business_id': bid, 'status': 'no data', 'seconds': 0.0, 'metrics': {}, 'error': None})
+            continue
+        meta = load_profit_meta(bid) or {}
+        if not force and meta.get('dataset_fingerprint') == fp:
+            skipped.append({'business_id': bid, 'status': 'unchanged', 'seconds': 0.0, 'metrics': meta.get('metrics') or {}, 'error': None})
+            continue
+        todo.append((bid, fp))
+    return todo, skipped
+
+
+def train_all(todo, workers: int):
+    """Run `train_business` for every (business_id, fingerprint); 0 workers trains inline."""
+    if workers <= 0:
+        return [train_business(bid, fp) for bid, fp in todo]
+    results = []
+    # spawn, not fork: each worker builds its own engine and connection pool
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = {pool.submit(train_business, bid, fp): bid for bid, fp in todo}
+        for fut in as_completed(futures):
+            try:
+                results.append(fut.result())
+            except Exception as e:
+                # the worker process itself died
+                results.append({'business_id': futures[fut], 'status': 'failed', 'seconds': 0.0, 'metrics': {}, 'error': str(e)})
+    return results
+
+
+def _metric(metrics: dict, key: str) -> str:
+    value = metrics.get(key)
+    return f'{value:.4f}' if isinstance(value, (int, float)) else '-'
+
+
+def print_summary(results, elapsed: float):
+    print()
+    print(f"{'business':>8}  {'status':<9} {'seconds':>8} {'r2':>8} {'mae':>12}")
+    for r in sorted(results, key=lambda r: r['business_id']):
+        print(f"{r['business_id']:>8}  {r['status']:<9} {r['seconds']:>8.2f} {_metric(r['metrics'], 'r2'):>8} {_metric(r['metrics'], 'mae'):>12}"
+              + (f"  ({r['error']})" if r['error'] else ''))
+    counts = {}
+    for r in results:
+        counts[r['status']] = counts.get(r['status'], 0) + 1
+    print()
+    print(f"Businesses: {len(results)} (" + ', '.join(f'{n} {s}' for s, n in sorted(counts.items())) + f"), wall time: {elapsed:.1f}s")
+    return counts.get('failed', 0)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description='Retrain the profit model of every business whose data changed')
+    p.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1), help='parallel fits (0 trains in this process)')
+    p.add_argument('--business-ids', type=int, nargs='+', help='only these businesses')
+    p.add_argument('--force', action='store_true', help='retrain even when the dataset is unchanged')
+    args = p.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    from backend.app.db.session import SessionLocal
+    t0 = time.perf_counter()
+    db = SessionLocal()
+    try:
+        todo, skipped = plan(db, args.business_ids, args.force)
+    finally:
+        db.close()
+    workers = max(0, min(args.workers, len(todo)))
+    print(f"Training {len(todo)} of {len(todo) + len(skipped)} businesses with {workers or 'no'} worker processes")
+    results = skipped + train_all(todo, workers)
+    failed = print_summary(results, time.perf_counter() - t0)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Benchmark: /accountant/financials/overview, sequential vs concurrent plan.
+
+Seeds a scratch business with N synthetic transactions (committed, because
+the concurrent plan reads on separate connections), builds its daily rollup,
+then times the previous sequential handler body against
+`app.api.accountant.overview_payload`. The scratch user/business and their
+rows are deleted at the end.
+
+Usage (from the backend folder):
+    python scripts/bench_accountant_overview.py
+    python scripts/bench_accountant_overview.py --sizes 100000 1000000 --repeat 20
+"""
+import argparse
+import statistics
+import time
+from sqlalchemy import text
+from app.db.session import SessionLocal
+from app import crud
+from app.api.accountant import overview_payload
+
+
+def legacy_overview(db, business_id):
+    # Previous handler body: every part runs sequentially on one connection.
+    weekly = crud.report_weekly(db, business_id)
+    monthly = crud.report_monthly(db, business_id, with_cogs=True)
+    totals = crud.daily_totals(db, business_id)
+    expense_breakdown = crud.categories_for_accountant(db, business_id)
+    pl = crud.analytics_monthly(db, business_id)
+    return weekly, monthly, totals, expense_breakdown, pl
+
+
+def seed(db, size):
+    uid = db.execute(text("INSERT INTO users (username, password_hash, role) VALUES (:u, 'x', 'owner') RETURNING id"), {'u': f'bench_{time.time_ns()}'}).scalar()
+    bid = db.execute(text("INSERT INTO businesses (owner_id, name) VALUES (:uid, 'bench') RETURNING id"), {'uid': uid}).scalar()
+    db.execute(text("""
+        INSERT INTO transactions (business_id, type, amount, category, used_quantity, created_at)
+        SELECT :bid,
+               (CASE WHEN g % 4 = 0 THEN 'Expense' ELSE 'Income' END)::transaction_type_enum,
+               (g % 500) + 0.99,
+               'bench-' || (g % 12),
+               (g % 5) + 1,
+               now() - (g % 730) * interval '1 day'
+        FROM generate_series(1, :n) AS g
+    """), {'bid': bid, 'n': size})
+    db.commit()
+    crud.rebuild_daily_totals(db, bid)
+    db.execute(text("ANALYZE business_daily_totals"))
+    db.commit()
+    return uid, bid
+
+
+def cleanup(db, uid, bid):
+    db.execute(text("DELETE FROM business_daily_totals WHERE business_id = :bid"), {'bid': bid})
+    db.execute(text("DELETE FROM business_data_versions WHERE business_id = :bid"), {'bid': bid})
+    db.execute(text("DELETE FROM transactions WHERE business_id = :bid"), {'bid': bid})
+    db.execute(text("DELETE FROM businesses WHERE id = :bid"), {'bid': bid})
+    db.execute(text("DELETE FROM users WHERE id = :uid"), {'uid': uid})
+    db.commit()
+
+
+def measure(fn, repeat):
+    fn()  # warm up pool connections and caches
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    p95 = samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))]
+    return statistics.median(samples), p95
+
+
+def main():
+    p = argparse.ArgumentParser(description='Benchmark the accountant overview query plan')
+    p.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+    p.add_argument('--repeat', type=int, default=20)
+    args = p.parse_args()
+
+    print(f"{'rows':>10}  {'plan':<11} {'p50 ms':>9} {'p95 ms':>9}")
+    for size in args.sizes:
+        db = SessionLocal()
+        uid, bid = seed(db, size)
+        try:
+            for name, fn in (('sequential', lambda: legacy_overview(db, bid)), ('concurrent', lambda: overview_payload(db, bid))):
+                p50, p95 = measure(fn, args.repeat)
+                print(f"{size:>10}  {name:<11} {p50:>9.2f} {p95:>9.2f}")
+        finally:
+            cleanup(db, uid, bid)
+            db.close()
+
+
+if __name__ == '__main__':
+    main()
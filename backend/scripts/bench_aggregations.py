@@ -0,0 +1,108 @@
+"""Benchmark: Python-loop aggregation vs SQL aggregates vs the daily rollup.
+
+Seeds a scratch business with N synthetic transactions (and their
+`business_daily_totals` rollup) inside one DB transaction and times three
+ways of computing its income/expense totals:
+
+- legacy: the old summary loop that hydrates every Transaction row
+- sql:    `crud.transaction_totals`, one FILTERed SUM/COUNT query over
+          `transactions`
+- rollup: `crud.summary_for_business`, which the API serves from
+          `crud.daily_totals`
+
+Everything is rolled back at the end so the database is left untouched.
+
+Usage (from the backend folder):
+    python scripts/bench_aggregations.py
+    python scripts/bench_aggregations.py --sizes 10000 100000 1000000 --repeat 3
+"""
+import argparse
+import time
+import tracemalloc
+from sqlalchemy import text
+from app.db.session import SessionLocal
+from app import crud, models
+
+
+def legacy_summary(db, business_id):
+    # Previous implementation of crud.summary_for_business, kept here only
+    # as the baseline for comparison.
+    income = 0.0
+    expense = 0.0
+    txs = db.query(models.Transaction).filter(models.Transaction.business_id == business_id).all()
+    for t in txs:
+        try:
+            norm = crud._normalize_tx_type(t.type)
+        except ValueError:
+            continue
+        if norm == 'income':
+            income += float(t.amount)
+        elif norm == 'expense':
+            expense += float(t.amount)
+    return {'income': income, 'expense': expense}
+
+
+def seed(db, size):
+    uid = db.execute(text("INSERT INTO users (username, password_hash, role) VALUES (:u, 'x', 'owner') RETURNING id"), {'u': f'bench_{time.time_ns()}'}).scalar()
+    bid = db.execute(text("INSERT INTO businesses (owner_id, name) VALUES (:uid, 'bench') RETURNING id"), {'uid': uid}).scalar()
+    db.execute(text("""
+        INSERT INTO transactions (business_id, type, amount, category, used_quantity, created_at)
+        SELECT :bid,
+               (CASE WHEN g % 4 = 0 THEN 'Expense' ELSE 'Income' END)::transaction_type_enum,
+               (g % 500) + 0.99,
+               'bench',
+               (g % 5) + 1,
+               now() - (g % 365) * interval '1 day'
+        FROM generate_series(1, :n) AS g
+    """), {'bid': bid, 'n': size})
+    # build the rollup without rebuild_daily_totals, which would commit
+    table = models.BusinessDailyTotal.__table__
+    cols = ['business_id', 'day', 'category', *crud._DAILY_TOTAL_FIELDS]
+    db.execute(table.insert().from_select(cols, crud._daily_totals_source(bid)))
+    db.execute(text("ANALYZE transactions"))
+    db.execute(text("ANALYZE business_daily_totals"))
+    return bid
+
+
+def measure(fn, repeat):
+    best = None
+    peak = 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        _, p = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        best = elapsed if best is None else min(best, elapsed)
+        peak = max(peak, p)
+    return best, peak, result
+
+
+def main():
+    p = argparse.ArgumentParser(description='Benchmark transaction aggregation paths')
+    p.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    p.add_argument('--repeat', type=int, default=3)
+    args = p.parse_args()
+
+    print(f"{'rows':>10}  {'path':<8} {'best ms':>10} {'peak MiB':>10}")
+    for size in args.sizes:
+        db = SessionLocal()
+        try:
+            bid = seed(db, size)
+            for name, fn in (
+                ('legacy', lambda: legacy_summary(db, bid)),
+                ('sql', lambda: crud.transaction_totals(db, bid)),
+                ('rollup', lambda: crud.summary_for_business(db, bid)),
+            ):
+                elapsed, peak, result = measure(fn, args.repeat)
+                # drop hydrated ORM objects between runs so timings are independent
+                db.expunge_all()
+                print(f"{size:>10}  {name:<8} {elapsed * 1000:>10.1f} {peak / 2**20:>10.1f}   {result}")
+        finally:
+            db.rollback()
+            db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Benchmark: single-row transaction writes vs `crud.create_transactions_batch`.
+
+Seeds a scratch business with a few inventory items, then writes N sales
+(plus every tenth row a manual expense) once through the per-row
+`create_transaction_with_inventory` path used by POST /transactions and
+once through the batch path used by POST /transactions/batch. Both paths
+commit, so the scratch user/business and their rows are deleted at the end.
+
+Usage (from the backend folder):
+    python scripts/bench_batch_ingest.py
+    python scripts/bench_batch_ingest.py --sizes 1000 5000
+"""
+import argparse
+import time
+from sqlalchemy import text
+from app.db.session import SessionLocal
+from app import crud
+
+ITEMS = 20
+
+
+def seed(db):
+    uid = db.execute(text("INSERT INTO users (username, password_hash, role) VALUES (:u, 'x', 'owner') RETURNING id"), {'u': f'bench_{time.time_ns()}'}).scalar()
+    bid = db.execute(text("INSERT INTO businesses (owner_id, name) VALUES (:uid, 'bench') RETURNING id"), {'uid': uid}).scalar()
+    inv_ids = [
+        db.execute(text("INSERT INTO inventory (business_id, item_name, category, quantity, cost_price) VALUES (:bid, :name, 'bench', 1000000000, 1.50) RETURNING id"), {'bid': bid, 'name': f'item-{i}'}).scalar()
+        for i in range(ITEMS)
+    ]
+    db.commit()
+    return uid, bid, inv_ids
+
+
+def cleanup(db, uid, bid):
+    db.execute(text("DELETE FROM business_daily_totals WHERE business_id = :bid"), {'bid': bid})
+    db.execute(text("DELETE FROM business_data_versions WHERE business_id = :bid"), {'bid': bid})
+    db.execute(text("DELETE FROM transactions WHERE business_id = :bid"), {'bid': bid})
+    db.execute(text("DELETE FROM inventory WHERE business_id = :bid"), {'bid': bid})
+    db.execute(text("DELETE FROM businesses WHERE id = :bid"), {'bid': bid})
+    db.execute(text("DELETE FROM users WHERE id = :uid"), {'uid': uid})
+    db.commit()
+
+
+def make_items(size, inv_ids):
+    out = []
+    for i in range(size):
+        if i % 10 == 9:
+            out.append({'type': 'Expense', 'amount': 4.25, 'category': 'bench-expense'})
+        else:
+            out.append({'type': 'Income', 'amount': 9.99, 'inventory_id': inv_ids[i % len(inv_ids)], 'used_quantity': 1 + i % 3, 'source': 'inventory'})
+    return out
+
+
+def single_rows(db, bid, items):
+    for it in items:
+        crud.create_transaction_with_inventory(db, bid, it['type'], it['amount'], it.get('category'), inventory_id=it.get('inventory_id'), used_quantity=it.get('used_quantity'), source=it.get('source'))
+
+
+def batch(db, bid, items):
+    result = crud.create_transactions_batch(db, bid, items)
+    assert not result.errors, result.errors[:3]
+
+
+def main():
+    p = argparse.ArgumentParser(description='Benchmark single-row vs batch transaction ingestion')
+    p.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000])
+    args = p.parse_args()
+
+    print(f"{'rows':>8}  {'path':<7} {'total ms':>10} {'rows/s':>10}")
+    for size in args.sizes:
+        db = SessionLocal()
+        uid, bid, inv_ids = seed(db)
+        try:
+            items = make_items(size, inv_ids)
+            for name, fn in (('single', single_rows), ('batch', batch)):
+                t0 = time.perf_counter()
+                fn(db, bid, items)
+                elapsed = time.perf_counter() - t0
+                print(f"{size:>8}  {name:<7} {elapsed * 1000:>10.1f} {size / elapsed:>10.0f}")
+        finally:
+            cleanup(db, uid, bid)
+            db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Benchmark: row-by-row vs vectorized ML dataset loaders.
+
+Creates session-local TEMP tables named `ml_transactions` and
+`analytics_monthly` (they shadow the materialized views for this
+connection only) filled with N synthetic sales over `--items` items and 36
+months, then times the previous dict-per-row loaders against
+`backend.ml.data_loader` and reports tracemalloc peak memory. The temp
+tables vanish with the connection, so the database is left untouched.
+
+Usage (from the repo root):
+    python backend/scripts/bench_ml_loader.py
+    python backend/scripts/bench_ml_loader.py --sizes 100000 1000000 --items 5000
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from sqlalchemy import text
+from backend.app.db.session import SessionLocal
+from backend.ml import data_loader
+
+BUSINESS_ID = 1
+
+
+def _to_float(v):
+    try:
+        return 0.0 if v is None else float(v)
+    except Exception:
+        return 0.0
+
+
+def legacy_monthly(db, business_id):
+    # Previous implementation of data_loader.get_monthly_profit_dataset, kept
+    # here only as the baseline for comparison.
+    import pandas as pd
+    rows = db.execute(text("SELECT month, sales, cost, profit FROM analytics_monthly WHERE business_id = :bid ORDER BY month ASC"), {"bid": business_id}).fetchall()
+    records = []
+    for row in rows:
+        mapping = row._mapping
+        records.append({'month': mapping.get('month'), 'total_sales': _to_float(mapping.get('sales')), 'total_cost': _to_float(mapping.get('cost')), 'total_profit': _to_float(mapping.get('profit'))})
+    df = pd.DataFrame.from_records(records)
+    df['month_parsed'] = pd.to_datetime(df['month'].astype(str) + '-01', errors='coerce')
+    df['year'] = df['month_parsed'].dt.year
+    df['month_num'] = df['month_parsed'].dt.month
+    df = df.sort_values('month_parsed').reset_index(drop=True)
+    df['rolling_3m_sales'] = df['total_sales'].rolling(window=3, min_periods=1).sum()
+    df['rolling_3m_profit'] = df['total_profit'].rolling(window=3, min_periods=1).sum()
+    return df
+
+
+def legacy_items(db, business_id):
+    # Previous implementation of data_loader.get_item_sales_dataset.
+    import pandas as pd
+    rows = db.execute(text("SELECT item_name, month, COALESCE(quantity,0) AS quantity, COALESCE(sales_amount,0) AS sales_amount, COALESCE(cost_amount,0) AS cost_amount, COALESCE(profit,0) AS profit FROM ml_transactions WHERE business_id = :bid"), {"bid": business_id}).fetchall()
+    records = []
+    for row in rows:
+        mapping = row._mapping
+        qty = mapping.get('quantity')
+        records.append({'item_name': mapping.get('item_name'), 'month': mapping.get('month'), 'quantity': float(qty) if qty is not None else 0.0,
+                        'sales_amount': _to_float(mapping.get('sales_amount')), 'cost_amount': _to_float(mapping.get('cost_amount')), 'profit': _to_float(mapping.get('profit'))})
+    df = pd.DataFrame.from_records(records)
+    agg = df.groupby(['item_name', 'month'], dropna=False).agg({'quantity': 'sum', 'sales_amount': 'sum', 'cost_amount': 'sum', 'profit': 'sum'}).reset_index()
+    agg['margin'] = agg['sales_amount'] - agg['cost_amount']
+    agg['month_parsed'] = pd.to_datetime(agg['month'].astype(str) + '-01', errors='coerce')
+    agg['month_num'] = agg['month_parsed'].dt.month
+    agg = agg.sort_values(['item_name', 'month_parsed']).reset_index(drop=True)
+
+    def _rolling_qty(g):
+        g = g.sort_values('month_parsed')
+        g['rolling_3m_quantity'] = g['quantity'].rolling(window=3, min_periods=1).sum()
+        return g
+
+    return agg.groupby('item_name', group_keys=False).apply(_rolling_qty).reset_index(drop=True)
+
+
+def seed(db, size, items):
+    db.execute(text("DROP TABLE IF EXISTS pg_temp.ml_transactions"))
+    db.execute(text("DROP TABLE IF EXISTS pg_temp.analytics_monthly"))
+    db.execute(text(
+        "CREATE TEMP TABLE ml_transactions AS"
+        " SELECT :bid AS business_id, 'item-' || (g % :items) AS item_name,"
+        " to_char(date '2022-01-01' + ((g % 36) * interval '1 month'), 'YYYY-MM') AS month,"
+        " (1 + g % 4)::integer AS quantity, (10 + g % 7)::numeric AS sales_amount,"
+        " (4 + g % 3)::numeric AS cost_amount, (6 + g % 7 - g % 3)::numeric AS profit"
+        " FROM generate_series(1, :n) AS g"
+    ), {'bid': BUSINESS_ID, 'items': items, 'n': size})
+    db.execute(text(
+        "CREATE TEMP TABLE analytics_monthly AS"
+        " SELECT business_id, month, SUM(sales_amount) AS sales, SUM(cost_amount) AS cost, SUM(profit) AS profit"
+        " FROM ml_transactions GROUP BY business_id, month"
+    ))
+    db.execute(text("ANALYZE ml_transactions"))
+
+
+def measure(fn, db):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn(db, BUSINESS_ID)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    p = argparse.ArgumentParser(description='Benchmark the ML dataset loaders')
+    p.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000])
+    p.add_argument('--items', type=int, default=2000)
+    args = p.parse_args()
+
+    print(f"{'rows':>9}  {'loader':<8} {'path':<10} {'ms':>10} {'peak MB':>9}")
+    db = SessionLocal()
+    try:
+        for size in args.sizes:
+            seed(db, size, args.items)
+            for name, legacy, current in (('items', legacy_items, data_loader.get_item_sales_dataset), ('monthly', legacy_monthly, data_loader.get_monthly_profit_dataset)):
+                for path, fn in (('legacy', legacy), ('vectorized', current)):
+                    elapsed, peak = measure(fn, db)
+                    print(f"{size:>9}  {name:<8} {path:<10} {elapsed * 1000:>10.1f} {peak / 2**20:>9.1f}")
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Load test: requests/sec for the read-heavy endpoints under concurrency.
+
+Logs in once, then keeps `--concurrency` clients busy for `--duration`
+seconds cycling through the analytics, reports, summary and dashboard
+endpoints of one business, and prints throughput and latency percentiles.
+Run it against the server before and after a change to compare, e.g.
+`git stash` / start uvicorn / run / `git stash pop` / restart / run.
+
+Requires httpx (`pip install httpx`). Usage (from the backend folder):
+    python scripts/load_test.py --username owner --password secret --business-id 3
+    python scripts/load_test.py --base-url http://127.0.0.1:8002 --concurrency 200 --duration 30 ...
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+
+PATHS = (
+    '/analytics/summary/{bid}',
+    '/analytics/monthly/{bid}',
+    '/analytics/weekly/{bid}',
+    '/analytics/categories/{bid}',
+    '/analytics/expense_categories/{bid}',
+    '/analytics/profit_trend/{bid}',
+    '/reports/weekly/{bid}',
+    '/reports/monthly/{bid}',
+    '/summary/{bid}',
+    '/businesses/{bid}/dashboard',
+)
+
+
+async def worker(client, paths, deadline, latencies, errors):
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        t0 = time.perf_counter()
+        try:
+            r = await client.get(path)
+            if r.status_code >= 400:
+                errors.append(r.status_code)
+                continue
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append(time.perf_counter() - t0)
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        r = await client.post('/auth/login', json={'username': args.username, 'password': args.password})
+        r.raise_for_status()
+        client.headers['Authorization'] = f"Bearer {r.json()['access_token']}"
+        paths = [p.format(bid=args.business_id) for p in PATHS]
+        latencies, errors = [], []
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(worker(client, paths, deadline, latencies, errors) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    def pct(q):
+        return latencies[min(len(latencies) - 1, int(q * (len(latencies) - 1)))] * 1000 if latencies else 0.0
+    print(f"concurrency={args.concurrency} duration={elapsed:.1f}s")
+    print(f"ok={len(latencies)} errors={len(errors)} req/s={len(latencies) / elapsed:.1f}")
+    if latencies:
+        print(f"latency ms: mean={statistics.mean(latencies) * 1000:.1f} p50={pct(0.5):.1f} p95={pct(0.95):.1f} p99={pct(0.99):.1f}")
+    if errors:
+        print('error sample:', errors[:10])
+
+
+def main():
+    p = argparse.ArgumentParser(description='Load test read-heavy endpoints')
+    p.add_argument('--base-url', default='http://127.0.0.1:8002')
+    p.add_argument('--username', required=True)
+    p.add_argument('--password', required=True)
+    p.add_argument('--business-id', type=int, required=True)
+    p.add_argument('--concurrency', type=int, default=200)
+    p.add_argument('--duration', type=float, default=30.0)
+    asyncio.run(run(p.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,47 @@
--- Create ML-ready derived view for sales (do NOT modify core tables)
--- View: ml_transactions
--- Columns:
--- date (date), month (YYYY-MM), business_id, inventory_id, item_name, category,
--- quantity, sales_amount, cost_amount, profit
+-- Materialized, indexed analytics views (do NOT modify core tables)
+--
+-- Applied automatically on startup by app/db/matviews.py whenever the
+-- stored version in `matview_meta` differs from MATVIEWS_VERSION, and
+-- refreshed with REFRESH MATERIALIZED VIEW CONCURRENTLY on a schedule or
+-- after a number of transaction writes. Each view carries a UNIQUE index,
+-- which concurrent refresh requires.
+--
+-- Views (refresh order):
+--   ml_transactions      one row per inventory-linked Income transaction
+--                        transaction_id, date (date), month (YYYY-MM), business_id,
+--                        inventory_id, item_name, category, quantity,
+--                        sales_amount, cost_amount, profit
+--   analytics_monthly    business_id, month, sales, cost, profit, quantity
+--   analytics_top_items  business_id, inventory_id, item_name, category,
+--                        total_quantity, total_sales, total_cost, total_profit
+--
+-- cost_amount is the cost snapshot stored on the transaction at sale time
+-- (transactions.cost_amount), not the item's current cost_price.
+--
+-- NOTE: keep this file free of percent signs; it is executed as a single
+-- driver-level statement.
 
-CREATE OR REPLACE VIEW ml_transactions AS
+-- Drop previous definitions whether they were plain or materialized views.
+DO $$
+DECLARE r record;
+BEGIN
+  FOR r IN
+    SELECT c.relname, c.relkind
+    FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = current_schema()
+      AND c.relname IN ('analytics_top_items', 'analytics_monthly', 'ml_transactions')
+  LOOP
+    IF r.relkind = 'v' THEN
+      EXECUTE 'DROP VIEW IF EXISTS ' || quote_ident(r.relname) || ' CASCADE';
+    ELSIF r.relkind = 'm' THEN
+      EXECUTE 'DROP MATERIALIZED VIEW IF EXISTS ' || quote_ident(r.relname) || ' CASCADE';
+    END IF;
+  END LOOP;
+END $$;
+
+CREATE MATERIALIZED VIEW ml_transactions AS
 SELECT
+  t.id::integer AS transaction_id,
   (date_trunc('day', t.created_at))::date AS date,
   to_char(date_trunc('month', t.created_at), 'YYYY-MM') AS month,
   t.business_id::integer AS business_id,
@@ -14,12 +50,44 @@ SELECT
   i.category::text AS category,
   COALESCE(t.used_quantity, 1)::integer AS quantity,
   COALESCE(t.amount, 0)::numeric AS sales_amount,
-  (COALESCE(t.used_quantity, 1) * COALESCE(i.cost_price, 0))::numeric AS cost_amount,
-  (COALESCE(t.amount, 0) - (COALESCE(t.used_quantity, 1) * COALESCE(i.cost_price, 0)))::numeric AS profit
+  COALESCE(t.cost_amount, 0)::numeric AS cost_amount,
+  (COALESCE(t.amount, 0) - COALESCE(t.cost_amount, 0))::numeric AS profit
 FROM transactions t
 JOIN inventory i ON t.inventory_id = i.id
-WHERE t.type = 'Income' AND t.inventory_id IS NOT NULL
-ORDER BY date ASC;
+WHERE t.type = 'Income' AND t.inventory_id IS NOT NULL;
+
+CREATE UNIQUE INDEX ux_ml_transactions_tx ON ml_transactions (transaction_id);
+CREATE INDEX ix_ml_transactions_business_date ON ml_transactions (business_id, date);
+CREATE INDEX ix_ml_transactions_business_month ON ml_transactions (business_id, month);
+
+CREATE MATERIALIZED VIEW analytics_monthly AS
+SELECT
+  business_id,
+  month,
+  SUM(sales_amount)::numeric AS sales,
+  SUM(cost_amount)::numeric AS cost,
+  SUM(profit)::numeric AS profit,
+  SUM(quantity)::bigint AS quantity
+FROM ml_transactions
+GROUP BY business_id, month;
+
+CREATE UNIQUE INDEX ux_analytics_monthly_business_month ON analytics_monthly (business_id, month);
+
+CREATE MATERIALIZED VIEW analytics_top_items AS
+SELECT
+  business_id,
+  inventory_id,
+  MAX(item_name) AS item_name,
+  MAX(category) AS category,
+  SUM(quantity)::bigint AS total_quantity,
+  SUM(sales_amount)::numeric AS total_sales,
+  SUM(cost_amount)::numeric AS total_cost,
+  SUM(profit)::numeric AS total_profit
+FROM ml_transactions
+GROUP BY business_id, inventory_id;
+
+CREATE UNIQUE INDEX ux_analytics_top_items_business_item ON analytics_top_items (business_id, inventory_id);
+CREATE INDEX ix_analytics_top_items_business_qty ON analytics_top_items (business_id, total_quantity DESC);
 
 -- Validation queries (run in psql):
 -- 1) Total sales (sum of sales_amount)
@@ -29,6 +97,8 @@ ORDER BY date ASC;
 -- 3) Total profit
 -- SELECT SUM(profit) FROM ml_transactions;
 -- 4) Monthly profit trend
--- SELECT month, SUM(profit) AS month_profit FROM ml_transactions GROUP BY month ORDER BY month ASC;
+-- SELECT month, profit FROM analytics_monthly WHERE business_id = 3 ORDER BY month ASC;
 -- 5) Top-selling items (by quantity)
--- SELECT item_name, SUM(quantity) AS total_qty, SUM(sales_amount) AS total_sales FROM ml_transactions GROUP BY item_name ORDER BY total_qty DESC LIMIT 20;
+-- SELECT item_name, total_quantity, total_sales FROM analytics_top_items WHERE business_id = 3 ORDER BY total_quantity DESC LIMIT 20;
+-- 6) Last refresh per view
+-- SELECT name, version, refreshed_at FROM matview_meta;
@@ -94,3 +94,57 @@ END $$;
 -- NOTE: If your DB already uses `cost_price` this file will match the current model. If the table still has the old column name, run a migration to add/rename the column as needed; do NOT delete existing transactional data.
 -- Migration note: inventory table now includes `created_at` TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP.
 -- If you manage DB schema via migrations (Alembic, etc.), prefer creating a migration that adds this column without dropping or renaming existing data.
+
+-- Per-business daily rollup maintained by the transaction write paths
+-- (crud.create_transaction*, update_transaction, delete_transaction).
+-- Backfill / drift check: python -m app.scripts.rebuild_daily_totals [--verify]
+CREATE TABLE IF NOT EXISTS business_daily_totals (
+  id SERIAL PRIMARY KEY,
+  business_id INTEGER NOT NULL REFERENCES businesses(id) ON DELETE CASCADE,
+  day DATE NOT NULL,
+  category VARCHAR NOT NULL DEFAULT '',
+  income NUMERIC(14,2) NOT NULL DEFAULT 0,
+  operating_expense NUMERIC(14,2) NOT NULL DEFAULT 0,
+  cogs NUMERIC(14,2) NOT NULL DEFAULT 0,
+  units_sold INTEGER NOT NULL DEFAULT 0,
+  income_count INTEGER NOT NULL DEFAULT 0,
+  expense_count INTEGER NOT NULL DEFAULT 0,
+  CONSTRAINT uix_business_daily_totals_key UNIQUE (business_id, day, category)
+);
+
+-- Per-business data version, bumped by every transaction/inventory write;
+-- part of the analytics cache key.
+CREATE TABLE IF NOT EXISTS business_data_versions (
+  business_id INTEGER PRIMARY KEY REFERENCES businesses(id) ON DELETE CASCADE,
+  version BIGINT NOT NULL DEFAULT 0
+);
+
+-- On-demand profit model fits (POST /ml/train); at most one queued or
+-- running job per business.
+CREATE TABLE IF NOT EXISTS training_jobs (
+  id SERIAL PRIMARY KEY,
+  business_id INTEGER NOT NULL REFERENCES businesses(id) ON DELETE CASCADE,
+  status VARCHAR NOT NULL DEFAULT 'queued',
+  created_at TIMESTAMP NOT NULL DEFAULT now(),
+  finished_at TIMESTAMP,
+  seconds DOUBLE PRECISION,
+  metrics JSON,
+  model_version VARCHAR,
+  error TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS uix_training_jobs_active_business ON training_jobs (business_id) WHERE status IN ('queued', 'running');
+
+-- Cost snapshot on sales: inventory cost_price at sale time and
+-- COALESCE(used_quantity, 1) * unit_cost. Also applied on startup by
+-- app/db/upgrades.py. Backfill: python -m app.scripts.backfill_transaction_costs
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS unit_cost NUMERIC(12,2);
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS cost_amount NUMERIC(14,2);
+
+-- Keyset pagination of GET /transactions and /transactions/list:
+-- (created_at, id) per business, optionally behind one equality filter.
+-- Also applied on startup by app/db/upgrades.py.
+CREATE INDEX IF NOT EXISTS ix_transactions_business_created ON transactions (business_id, created_at, id);
+CREATE INDEX IF NOT EXISTS ix_transactions_business_type_created ON transactions (business_id, type, created_at, id);
+CREATE INDEX IF NOT EXISTS ix_transactions_business_category_created ON transactions (business_id, category, created_at, id);
+CREATE INDEX IF NOT EXISTS ix_transactions_business_inventory_created ON transactions (business_id, inventory_id, created_at, id);
+CREATE INDEX IF NOT EXISTS ix_transactions_business_source_created ON transactions (business_id, source, created_at, id);
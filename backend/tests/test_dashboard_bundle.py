@@ -0,0 +1,53 @@
+import pytest
+
+from backend.app import crud, models
+from backend.app.core.cache import analytics_cache
+import backend.ml.model_store as model_store
+
+
+def _pg_month_functions(dbapi_conn, _record):
+    # the monthly rollup groups with PostgreSQL's to_char(date_trunc('month', day), 'YYYY-MM')
+    dbapi_conn.create_function('date_trunc', 2, lambda unit, day: day[:7] + '-01')
+    dbapi_conn.create_function('to_char', 2, lambda day, fmt: day[:7])
+
+
+@pytest.fixture
+def env(app_db, monkeypatch, tmp_path):
+    env = app_db({'staff': 'staff', 'outsider': None}, connect=_pg_month_functions)
+    env.db.add(models.Inventory(business_id=1, item_name='Pen', category='Writing', quantity=2, cost_price=1))
+    env.db.commit()
+    crud.create_transaction(env.db, 1, 'Income', 40.0, 'Sales')
+    monkeypatch.setattr(analytics_cache, 'enabled', False)
+    monkeypatch.setattr(model_store, 'MODELS_DIR', tmp_path)
+    return env
+
+
+def test_bundle_owner_gets_every_section(env):
+    r = env.client.get('/businesses/1/dashboard-bundle')
+    assert r.status_code == 200
+    body = r.json()
+    assert body['role'] == 'owner'
+    assert body['dashboard']['total_income'] == 40.0
+    assert body['summary']['total_income'] == 40.0
+    assert [i['item_name'] for i in body['low_stock']] == ['Pen']
+    # every query section succeeds with the standalone endpoint's shape
+    for section, url in (('monthly', '/analytics/monthly/1'), ('profit_trend', '/analytics/profit_trend/1'),
+                         ('categories', '/analytics/categories/1'), ('expense_categories', '/analytics/expense_categories/1')):
+        assert body[section] == env.client.get(url).json()
+    assert [m['income'] for m in body['monthly']] == [40.0]
+    # no model has been trained: only the prediction is reported as failed
+    assert 'predict_profit' not in body
+    assert body['errors'] == {'predict_profit': {'status_code': 404, 'detail': 'Model not trained'}}
+
+
+def test_bundle_staff_is_role_filtered(env):
+    env.user.id = 2
+    body = env.client.get('/businesses/1/dashboard-bundle').json()
+    assert set(body) == {'business_id', 'role', 'errors', 'dashboard', 'low_stock'}
+    assert 'total_income' not in body['dashboard']
+
+
+def test_bundle_forbidden_without_membership(env):
+    env.user.id = 3
+    assert env.client.get('/businesses/1/dashboard-bundle').status_code == 403
+    assert env.client.get('/businesses/2/dashboard-bundle').status_code == 404
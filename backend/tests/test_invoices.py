@@ -0,0 +1,101 @@
+import hashlib
+from io import BytesIO
+import pytest
+
+from backend.app import invoices
+
+
+@pytest.fixture
+def env(app_db, monkeypatch, tmp_path):
+    env = app_db({'accountant': 'accountant', 'staff': 'staff', 'other': None})
+    env.storage = tmp_path / 'uploads'
+    monkeypatch.setattr(invoices, 'STORAGE_DIR', env.storage)
+    monkeypatch.setattr(invoices, 'CHUNK_BYTES', 1024)
+    return env
+
+
+def _upload(env, data: bytes, filename='invoice.pdf'):
+    return env.client.post('/transactions/upload', data={'business_id': '1'}, files={'file': (filename, data)})
+
+
+def test_upload_is_content_addressed_and_deduplicated(env):
+    data = b'%PDF-1.4 ' + b'x' * 5000
+    first = _upload(env, data, 'march.pdf')
+    assert first.status_code == 200
+    digest = hashlib.sha256(data).hexdigest()
+    assert first.json() == {'invoice_url': f'/uploads/1/{digest}.pdf', 'deduplicated': False}
+    again = _upload(env, data, 'march-copy.PDF')
+    assert again.json() == {'invoice_url': f'/uploads/1/{digest}.pdf', 'deduplicated': True}
+    assert sorted(p.name for p in (env.storage / '1').iterdir()) == [f'{digest}.pdf']
+
+
+def test_upload_size_limit_and_role(env, monkeypatch):
+    monkeypatch.setattr(invoices, 'MAX_BYTES', 2000)
+    assert _upload(env, b'x' * 2001).status_code == 413
+    assert list((env.storage / '1').iterdir()) == []
+    assert _upload(env, b'x' * 2000).status_code == 200
+    env.user.id = 2
+    assert _upload(env, b'y').status_code == 403
+
+
+def test_serving_supports_range_etag_and_access(env):
+    data = bytes(range(256)) * 8
+    url = _upload(env, data, 'scan.pdf').json()['invoice_url']
+    full = env.client.get(url)
+    assert full.status_code == 200 and full.content == data
+    etag = full.headers['etag']
+    assert etag == f'"{hashlib.sha256(data).hexdigest()}"'
+    assert 'immutable' in full.headers['cache-control']
+    assert env.client.get(url, headers={'If-None-Match': etag}).status_code == 304
+    part = env.client.get(url, headers={'Range': 'bytes=10-19'})
+    assert part.status_code == 206 and part.content == data[10:20]
+    assert env.client.get('/uploads/1/missing.pdf').status_code == 404
+    assert env.client.get('/uploads/1/.upload-abc').status_code == 404
+    env.user.id = 2
+    assert env.client.get(url).status_code == 200
+    env.user.id = 3
+    assert env.client.get(url).status_code == 403
+    env.user.id = 4
+    assert env.client.get(url).status_code == 403
+
+
+def test_legacy_upload_is_served(env):
+    folder = env.storage / '1'
+    folder.mkdir(parents=True)
+    (folder / '1700000000_old.pdf').write_bytes(b'old invoice')
+    r = env.client.get('/uploads/1/1700000000_old.pdf')
+    assert r.status_code == 200 and r.content == b'old invoice'
+    assert 'no-cache' in r.headers['cache-control']
+
+
+def test_image_upload_gets_a_thumbnail(env):
+    Image = pytest.importorskip('PIL.Image')
+    buf = BytesIO()
+    Image.new('RGB', (1600, 1200), (200, 30, 30)).save(buf, 'PNG')
+    url = _upload(env, buf.getvalue(), 'photo.png').json()['invoice_url']
+    # background tasks have run once the TestClient response is returned
+    thumb = env.client.get(url, params={'thumb': 'true'})
+    assert thumb.status_code == 200 and thumb.headers['content-type'] == 'image/jpeg'
+    with Image.open(BytesIO(thumb.content)) as im:
+        assert max(im.size) <= max(invoices.THUMBNAIL_SIZE)
+    assert thumb.headers['etag'].endswith('-thumb"')
+    assert env.client.get(url).content == buf.getvalue()
+
+
+def test_chunked_upload_is_cut_off_while_it_arrives(env, monkeypatch):
+    monkeypatch.setattr(invoices, 'MAX_BYTES', 2000)
+    monkeypatch.setattr(invoices, 'MULTIPART_OVERHEAD', 1000)
+    # rejected during body parsing, before the route or storage run
+    monkeypatch.setattr(invoices, 'store', lambda *a: pytest.fail('body was accepted'))
+
+    def body():
+        # no Content-Length: the request is sent chunked
+        yield b'--xyz\r\nContent-Disposition: form-data; name="business_id"\r\n\r\n1\r\n'
+        yield b'--xyz\r\nContent-Disposition: form-data; name="file"; filename="big.pdf"\r\n\r\n'
+        for _ in range(100):
+            yield b'x' * 1000
+        yield b'\r\n--xyz--\r\n'
+
+    r = env.client.post('/transactions/upload', content=body(), headers={'Content-Type': 'multipart/form-data; boundary=xyz'})
+    assert r.status_code == 413
+    assert env.client.post('/transactions/upload', content=b'x' * 4000, headers={'Content-Type': 'multipart/form-data; boundary=xyz'}).status_code == 413
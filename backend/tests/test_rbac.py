@@ -13,8 +13,12 @@ from backend.app import crud
 @pytest.fixture(autouse=True)
 def no_db(monkeypatch):
     """Prevent real DB access by stubbing CRUD functions used by tests."""
-    # Always pretend the business exists
+    # Always pretend the business exists; the role comes from whatever each
+    # test stubs crud.get_user_business_role with
     monkeypatch.setattr(crud, 'get_business', lambda db, bid: SimpleNamespace(id=bid, owner_id=1, name='TestBiz'))
+    monkeypatch.setattr(crud, 'get_user_business_role', lambda db, uid, bid: None)
+    monkeypatch.setattr(crud, 'get_business_access', lambda db, uid, bid: crud.BusinessAccess(
+        id=bid, owner_id=1, name='TestBiz', role=crud.get_user_business_role(db, uid, bid)))
     yield
 
 
@@ -42,8 +46,9 @@ def test_staff_cannot_access_financial_apis(monkeypatch):
 def test_accountant_cannot_access_ml_predictions(monkeypatch):
     client = TestClient(app)
     monkeypatch.setattr(crud, 'get_user_business_role', lambda db, uid, bid: 'accountant')
-    from backend.app.api.deps import get_current_user
-    app.dependency_overrides[get_current_user] = override_current_user('accountant')
+    # /ml/predict-profit is a sync route, which authenticates with the sync dependency
+    from backend.app.api.deps import get_current_user_sync
+    app.dependency_overrides[get_current_user_sync] = override_current_user('accountant')
 
     r = client.get('/ml/predict-profit/1')
     assert r.status_code == 403
@@ -54,16 +59,31 @@ def test_accountant_cannot_access_ml_predictions(monkeypatch):
 def test_owner_can_access_ml_predictions(monkeypatch):
     client = TestClient(app)
     monkeypatch.setattr(crud, 'get_user_business_role', lambda db, uid, bid: 'owner')
-    from backend.app.api.deps import get_current_user
-    app.dependency_overrides[get_current_user] = override_current_user('owner')
+    from backend.app.api.deps import get_current_user_sync
+    app.dependency_overrides[get_current_user_sync] = override_current_user('owner')
 
     # stub ML model store functions to avoid heavy deps
     import backend.ml.model_store as model_store
-    monkeypatch.setattr(model_store, 'load_profit_model', lambda bid: (object(), {'metrics': {}}))
-    monkeypatch.setattr(model_store, 'predict_next_month_profit', lambda db, bid: 123.45)
+    monkeypatch.setattr(model_store, 'get_profit_model', lambda bid: model_store.ProfitModel(object(), {'metrics': {}}, 'v1'))
+    monkeypatch.setattr(model_store, 'predict_next_month', lambda db, bid, loaded=None: ('2024-02', 123.45))
+    monkeypatch.setattr(crud, 'get_data_version', lambda db, bid: 0)
+    # no matview_meta table without PostgreSQL: stub the view refresh time
+    from datetime import datetime, timezone
+    from backend.app.db import matviews
+    refreshed = datetime(2024, 2, 1, tzinfo=timezone.utc)
+    monkeypatch.setattr(matviews, 'last_refreshed_at', lambda db, name: refreshed)
+    monkeypatch.setattr(matviews, 'refreshed_at_header', lambda db, name: {'X-Data-Refreshed-At': refreshed.isoformat()})
+    from backend.app.core.cache import analytics_cache
+    analytics_cache.clear()
 
     r = client.get('/ml/predict-profit/1')
     assert r.status_code == 200
     assert r.json().get('predicted_profit') == 123.45
+    assert r.headers['x-model-version'] == r.json()['model_version'] == 'v1'
+    assert r.headers['x-data-refreshed-at'] == refreshed.isoformat()
+    assert r.json()['predicted_month'] == '2024-02'
+    assert analytics_cache.get(('predict_profit', 1, 'v1', 0, refreshed))['predicted_profit'] == 123.45
+    analytics_cache.clear()
 
     app.dependency_overrides.clear()
+
@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+import pytest
+
+from backend.app import crud, models, receipts
+
+
+@pytest.fixture
+def env(app_db, monkeypatch, tmp_path):
+    env = app_db({'staff': 'staff'})
+    env.db.add(models.Inventory(id=1, business_id=1, item_name='Pen', category='Writing', quantity=10, cost_price=2))
+    env.db.commit()
+    env.tx = crud.create_transaction_with_inventory(env.db, 1, 'Income', 25.0, inventory_id=1, used_quantity=3, source='inventory')
+    env.cache = tmp_path / 'cache'
+    monkeypatch.setattr(receipts, 'CACHE_DIR', env.cache)
+    monkeypatch.setattr(receipts, 'RENDER_WORKERS', 0)
+    yield env
+    receipts.shutdown()
+
+
+def _files(env):
+    return sorted(p.name.split('-')[0] for p in (env.cache / str(env.tx.id)).glob('*.pdf'))
+
+
+def test_receipt_fields_hide_cost_from_staff():
+    row = SimpleNamespace(id=7, created_at=None, used_quantity=3, amount=25, unit_cost=2, cost_amount=6, item_name='Pen', cost_price=4)
+    full = receipts.receipt_fields(row, 'Shop', 'owner')
+    # the sale's cost snapshot wins over the item's current cost_price
+    assert (full['variant'], full['cost_price'], full['profit']) == ('full', 2.0, 19.0)
+    basic = receipts.receipt_fields(row, 'Shop', 'staff')
+    assert basic['variant'] == 'basic' and 'cost_price' not in basic and 'profit' not in basic
+    legacy = receipts.receipt_fields(SimpleNamespace(id=9, created_at=None, used_quantity=3, amount=25, unit_cost=None, cost_amount=None, item_name='Pen', cost_price=2), 'Shop', 'owner')
+    assert (legacy['cost_price'], legacy['profit']) == (2.0, 19.0)
+    manual = receipts.receipt_fields(SimpleNamespace(id=8, created_at=None, used_quantity=None, amount=5, unit_cost=None, cost_amount=None, item_name=None, cost_price=None), 'Shop', 'owner')
+    assert (manual['item_name'], manual['quantity'], manual['cost_price']) == ('Manual Transaction', 1, 0.0)
+
+
+def test_receipt_is_rendered_once_per_variant_and_reused(env):
+    first = env.client.get(f'/transactions/{env.tx.id}/receipt')
+    assert first.status_code == 200
+    assert first.content.startswith(b'%PDF')
+    assert 'transaction_' in first.headers['content-disposition']
+    renders = receipts.stats.renders
+    again = env.client.get(f'/transactions/{env.tx.id}/receipt')
+    assert again.content == first.content
+    assert receipts.stats.renders == renders
+    env.user.id = 2
+    assert env.client.get(f'/transactions/{env.tx.id}/receipt').status_code == 200
+    assert _files(env) == ['basic', 'full']
+
+
+def test_update_and_delete_invalidate(env):
+    env.client.get(f'/transactions/{env.tx.id}/receipt')
+    assert _files(env) == ['full']
+    crud.update_transaction(env.db, env.tx.id, amount=30.0)
+    assert _files(env) == []
+    env.client.get(f'/transactions/{env.tx.id}/receipt')
+    assert _files(env) == ['full']
+    crud.delete_transaction(env.db, env.tx.id)
+    assert _files(env) == []
+    assert env.client.get(f'/transactions/{env.tx.id}/receipt').status_code == 404
+
+
+def test_cold_render_in_process_pool(env, monkeypatch):
+    monkeypatch.setattr(receipts, 'RENDER_WORKERS', 1)
+    r = env.client.get(f'/transactions/{env.tx.id}/receipt')
+    assert r.status_code == 200 and r.content.startswith(b'%PDF')
+
+
+def test_item_edits_keep_cost_and_replace_stale_file(env):
+    env.client.get(f'/transactions/{env.tx.id}/receipt')
+    inv = env.db.get(models.Inventory, 1)
+    inv.cost_price = 5
+    inv.item_name = 'Gel Pen'
+    env.db.commit()
+    fields = receipts.receipt_fields(crud.get_receipt_row(env.db, env.tx.id), 'TestBiz', 'owner')
+    assert (fields['item_name'], fields['cost_price'], fields['profit']) == ('Gel Pen', 2.0, 19.0)
+    # the renamed item is a new render; the old file of the variant is removed
+    env.client.get(f'/transactions/{env.tx.id}/receipt')
+    assert _files(env) == ['full']
@@ -0,0 +1,62 @@
+import re
+from datetime import date, datetime
+from io import BytesIO
+import pytest
+
+from backend.app import crud, models, statements
+from backend.app.api import reports
+
+
+def _pages(pdf: bytes) -> int:
+    return len(re.findall(rb'/Type /Page\b(?!s)', pdf))
+
+
+@pytest.fixture
+def env(app_db):
+    env = app_db({'staff': 'staff'})
+    env.db.add(models.Inventory(id=1, business_id=1, item_name='Pen', category='Writing', quantity=1000, cost_price=2))
+    env.db.commit()
+    # 100 sales in March, 10 expenses in April
+    sales = [{'type': 'Income', 'amount': 10.0, 'inventory_id': 1, 'used_quantity': 1, 'source': 'inventory'}] * 100
+    assert not crud.create_transactions_batch(env.db, 1, sales, created_at=datetime(2024, 3, 10)).errors
+    rent = [{'type': 'Expense', 'amount': 5.0, 'category': 'Rent'}] * 10
+    assert not crud.create_transactions_batch(env.db, 1, rent, created_at=datetime(2024, 4, 2)).errors
+    return env
+
+
+def test_statement_is_one_pdf_for_the_period(env, monkeypatch):
+    monkeypatch.setattr(reports, 'STATEMENT_CHUNK_BYTES', 1024)
+    r = env.client.get('/reports/statement/1', params={'from': '2024-03-01', 'to': '2024-03-31'})
+    assert r.status_code == 200
+    assert r.headers['content-type'] == 'application/pdf'
+    assert 'statement_1_2024-03-01_2024-03-31.pdf' in r.headers['content-disposition']
+    assert r.content.startswith(b'%PDF')
+    # 100 rows at 45 per page
+    assert _pages(r.content) == 3
+    whole = env.client.get('/reports/statement/1', params={'from': '2024-03-01', 'to': '2024-04-30'})
+    assert _pages(whole.content) == 3
+    empty = env.client.get('/reports/statement/1', params={'from': '2023-01-01', 'to': '2023-01-31'})
+    assert empty.status_code == 200 and _pages(empty.content) == 1
+
+
+def test_statement_access_and_validation(env):
+    bad = env.client.get('/reports/statement/1', params={'from': '2024-04-01', 'to': '2024-03-01'})
+    assert bad.status_code == 400
+    assert env.client.get('/reports/statement/1', params={'from': '2024-04-01'}).status_code == 422
+    env.user.id = 2
+    assert env.client.get('/reports/statement/1', params={'from': '2024-03-01', 'to': '2024-03-31'}).status_code == 403
+
+
+def test_statement_pnl_hides_cogs_from_accountants(env):
+    totals = crud.daily_totals(env.db, 1, date(2024, 3, 1), date(2024, 5, 1))
+    owner = dict(reports._statement_pnl(totals, 'owner'))
+    assert owner == {'Total income': 1000.0, 'Operating expense': 50.0, 'Cost of goods sold': 200.0, 'Net profit': 750.0}
+    accountant = dict(reports._statement_pnl(totals, 'accountant'))
+    assert accountant == {'Total income': 1000.0, 'Total expense': 50.0, 'Net': 950.0}
+
+
+def test_full_last_page_puts_pnl_on_its_own_page():
+    rows = [{'id': i, 'created_at': '2024-03-10T00:00:00', 'type': 'Income', 'amount': 1.0} for i in range(statements.ROWS_PER_PAGE * 2)]
+    out = BytesIO()
+    assert statements.render_statement(out, iter(rows), 'Shop', date(2024, 3, 1), date(2024, 3, 31), [('Net', 1.0)]) == 3
+    assert _pages(out.getvalue()) == 3
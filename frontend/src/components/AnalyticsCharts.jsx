@@ -2,7 +2,7 @@ import React, { useEffect, useState } from 'react'
 import 'chart.js/auto'
 import { Bar, Line, Pie } from 'react-chartjs-2'
 
-export default function AnalyticsCharts({ businessId, role, api }){
+export default function AnalyticsCharts({ businessId, role, bundle, api }){
   const [weekly, setWeekly] = useState(null)
   const [monthly, setMonthly] = useState(null)
   const [categories, setCategories] = useState(null)
@@ -13,7 +13,7 @@ export default function AnalyticsCharts({ businessId, role, api }){
 
   useEffect(()=>{
     if(!businessId) return
-    // Do not fetch analytics at all for staff users
+    // Do not show analytics at all for staff users
     if (role === 'staff'){
       setWeekly(null)
       setMonthly(null)
@@ -22,43 +22,40 @@ export default function AnalyticsCharts({ businessId, role, api }){
       setLoading(false)
       return
     }
-    setLoading(true)
-    // Default to fetching full monthly dataset (all history) and categories; weekly can be requested via toggle
-    Promise.all([
-      api.get(`/analytics/monthly/${businessId}`).then(r=>r.data).catch(()=>[]),
-      api.get(`/analytics/categories/${businessId}`).then(r=>r.data).catch(()=>[]),
-      api.get(`/analytics/expense_categories/${businessId}`).then(r=>r.data).catch(()=>[]),
-      (role === 'owner' ? api.get(`/analytics/profit_trend/${businessId}`).then(r=>r.data).catch(()=>[]) : Promise.resolve([]))
-    ]).then(([monthlyRes, c, expCats, p])=>{
-      setWeekly([])
-      setMonthly(monthlyRes || [])
-      setCategories(c)
-      setExpenseCats(expCats)
-      setProfit(p)
-    }).finally(()=>setLoading(false))
-  }, [businessId, role])
+    // The page fetches the dashboard bundle; render its monthly, category
+    // and (owner-only) profit trend sections. Weekly is fetched on toggle.
+    if(!bundle){
+      setLoading(true)
+      return
+    }
+    setView('all')
+    setWeekly([])
+    setMonthly(bundle.monthly || [])
+    setCategories(bundle.categories || [])
+    setExpenseCats(bundle.expense_categories || [])
+    setProfit(bundle.profit_trend || [])
+    setLoading(false)
+  }, [businessId, role, bundle])
 
   // Re-fetch only the analytics dataset when toggling view
   const handleToggle = (newView) => {
     if(!businessId) return
     if(newView === view) return
-    setLoading(true)
     setView(newView)
-    // switch between All (charts), weekly, and monthly endpoints
+    // All (charts) shows the bundled monthly data; weekly and monthly have their own endpoints
     if(newView === 'all'){
-      api.get(`/analytics/monthly/${businessId}`).then(r=>r.data).then(data=>{
-        setWeekly([])
-        setMonthly(data || [])
-      }).catch(()=>{}).finally(()=>setLoading(false))
-    } else {
-      const endpoint = `/analytics/${newView}/${businessId}`
-      api.get(endpoint).then(r => r.data).then(data => {
-        if(newView === 'weekly') setWeekly(data)
-        else setMonthly(data)
-      }).catch(()=>{
-        // keep previous data on error
-      }).finally(()=>setLoading(false))
+      setWeekly([])
+      setMonthly((bundle && bundle.monthly) || [])
+      return
     }
+    setLoading(true)
+    const endpoint = `/analytics/${newView}/${businessId}`
+    api.get(endpoint).then(r => r.data).then(data => {
+      if(newView === 'weekly') setWeekly(data)
+      else setMonthly(data)
+    }).catch(()=>{
+      // keep previous data on error
+    }).finally(()=>setLoading(false))
   }
 
   if(loading) return <div className="text-sm text-slate-500">Loading charts...</div>
@@ -0,0 +1,46 @@
+import React, {useEffect, useState} from 'react'
+import api from '../api/axios'
+
+const IMAGE = /\.(png|jpe?g|gif|webp|bmp)$/i
+
+// Invoices are served behind auth, so they are fetched through the API
+// client. Image invoices show their (small, cached) thumbnail in lists.
+export default function InvoiceLink({url, thumbnail=false}){
+  const [thumb, setThumb] = useState(null)
+
+  useEffect(()=>{
+    if(!thumbnail || !url || !IMAGE.test(url)) return
+    let objectUrl = null
+    let cancelled = false
+    api.get(url, { params: { thumb: true }, responseType: 'blob' })
+      .then(res => {
+        if(cancelled) return
+        objectUrl = window.URL.createObjectURL(res.data)
+        setThumb(objectUrl)
+      })
+      .catch(()=>{})
+    return ()=>{
+      cancelled = true
+      if(objectUrl) window.URL.revokeObjectURL(objectUrl)
+    }
+  }, [url, thumbnail])
+
+  const open = async (e) => {
+    e.preventDefault()
+    try{
+      const res = await api.get(url, { responseType: 'blob' })
+      const objectUrl = window.URL.createObjectURL(res.data)
+      window.open(objectUrl, '_blank')
+      setTimeout(()=>window.URL.revokeObjectURL(objectUrl), 60000)
+    }catch(err){
+      alert(err?.response?.status === 404 ? 'Invoice not found' : 'Failed to open invoice')
+    }
+  }
+
+  if(!url) return '-'
+  return (
+    <a className="text-fintech-accent inline-flex items-center gap-2" href={url} onClick={open}>
+      {thumb ? <img src={thumb} alt="invoice" className="h-10 w-10 object-cover rounded border" /> : 'View'}
+    </a>
+  )
+}
@@ -6,6 +6,7 @@ import Button from '../components/ui/Button'
 import Input from '../components/ui/Input'
 import api from '../api/axios'
 import AnalyticsCharts from '../components/AnalyticsCharts'
+import InvoiceLink from '../components/InvoiceLink'
 
 function Metric({title, value, children, className=''}){
   return (
@@ -26,11 +27,13 @@ export default function Dashboard(){
   const { user } = useContext(AuthContext)
   const { businesses, activeBusiness } = useContext(BusinessContext)
   const [summary, setSummary] = useState({income:0, expense:0})
+  const [bundle, setBundle] = useState(null)
   const [dashboard, setDashboard] = useState(null)
   const [analyticsSummary, setAnalyticsSummary] = useState(null)
   const [prediction, setPrediction] = useState(null)
   const [predictionLoading, setPredictionLoading] = useState(false)
   const [predictionError, setPredictionError] = useState(null)
+  const [trainingStatus, setTrainingStatus] = useState(null)
   const [members, setMembers] = useState([])
   const [weeklyReport, setWeeklyReport] = useState(null)
   const [monthlyReport, setMonthlyReport] = useState(null)
@@ -49,53 +52,39 @@ export default function Dashboard(){
   useEffect(()=>{
     if(!activeBusiness) return
     let cancelled = false
-    // fetch dashboard first to determine user's role for this business
-    api.get(`/businesses/${activeBusiness.id}/dashboard`).then(res=>{
+    setBundle(null)
+    setPrediction(null); setPredictionError(null)
+    setLowStockLoading(true)
+    // one round trip for the cards, prediction, low-stock banner and charts;
+    // the bundle only carries the sections the user's role may see
+    api.get(`/businesses/${activeBusiness.id}/dashboard-bundle`).then(res=>{
       if(cancelled) return
-      setDashboard(res.data)
-      // fetch authoritative analytics summary for financial cards
-      api.get(`/analytics/summary/${activeBusiness.id}`).then(r=>{
-        if(!cancelled) setAnalyticsSummary(r.data || { total_income:0, total_expense:0, profit:0 })
-      }).catch(()=>{ if(!cancelled) setAnalyticsSummary({ total_income:0, total_expense:0, profit:0 }) })
-      // fetch ML prediction only for owners
-      setPrediction(null); setPredictionError(null)
-      if (res.data?.role === 'owner'){
-        api.get(`/ml/predict-profit/${activeBusiness.id}`).then(r=>{
-          if(cancelled) return
-          setPrediction(r.data)
-        }).catch(err=>{
-          if(cancelled) return
-          // 404 -> model not trained; other errors show generic message
-          const status = err?.response?.status
-          if(status === 404){
-            setPredictionError('Model not trained for this business')
-          } else {
-            setPredictionError('Failed to load prediction')
-          }
-        }).finally(()=>{ if(!cancelled) setPredictionLoading(false) })
-      } else {
-        setPredictionLoading(false)
+      const data = res.data
+      setBundle(data)
+      setDashboard(data.dashboard || {role: data.role})
+      setAnalyticsSummary(data.summary || { total_income:0, total_expense:0, profit:0 })
+      setLowStock(data.low_stock || [])
+      if(data.predict_profit){
+        setPrediction(data.predict_profit)
+      } else if(data.errors?.predict_profit){
+        // 404 -> model not trained; other errors show generic message
+        if(data.errors.predict_profit.status_code === 404){
+          setPredictionError('Model not trained for this business')
+        } else {
+          setPredictionError('Failed to load prediction')
+        }
       }
+      setPredictionLoading(false)
       // load members only for owners (members API is owner-only)
-      if(res.data?.role === 'owner'){
+      if(data.role === 'owner'){
         api.get(`/businesses/${activeBusiness.id}/members`).then(r=> setMembers(r.data)).catch(()=> setMembers([]))
       } else {
         setMembers([])
       }
-    }).catch(()=>{})
-    // fetch analytics handled by AnalyticsCharts component
-    // also fetch low-stock items for alert banner
-    const fetchLow = async ()=>{
-      try{
-        setLowStockLoading(true)
-        const r = await api.get('/inventory/low_stock', { params: { business_id: activeBusiness.id } })
-        if(!cancelled) setLowStock(r.data || [])
-      }catch(err){
-        console.error('fetch low stock', err)
-        if(!cancelled) setLowStock([])
-      }finally{ if(!cancelled) setLowStockLoading(false) }
-    }
-    fetchLow()
+    }).catch(err=>{
+      console.error('fetch dashboard bundle', err)
+      if(!cancelled){ setBundle({errors: {}}); setLowStock([]); setPredictionLoading(false) }
+    }).finally(()=>{ if(!cancelled) setLowStockLoading(false) })
     return ()=>{ cancelled = true }
   }, [activeBusiness])
 
@@ -148,6 +137,27 @@ export default function Dashboard(){
   // Use analyticsSummary.profit as net profit when available
   const net = analyticsSummary ? analyticsSummary.profit : ((dashboard?.total_income||0) - (dashboard?.total_expense||0))
 
+  // queue a training job, poll it, then reload the prediction
+  const trainModel = async () => {
+    const businessId = activeBusiness.id
+    try{
+      let job = (await api.post(`/ml/train/${businessId}`)).data
+      setTrainingStatus(job.status)
+      while(job.status === 'queued' || job.status === 'running'){
+        await new Promise(r => setTimeout(r, 2000))
+        job = (await api.get(`/ml/jobs/${job.id}`)).data
+        setTrainingStatus(job.status)
+      }
+      if(job.status !== 'succeeded') return alert(job.error || 'Training failed')
+      const r = await api.get(`/ml/predict-profit/${businessId}`)
+      setPrediction(r.data); setPredictionError(null)
+    }catch(err){
+      alert(err?.response?.data?.detail || 'Training failed')
+    }finally{
+      setTrainingStatus(null)
+    }
+  }
+
   return (
     <div>
       {/* Low-stock alert banner: visible when backend reports low-stock items */}
@@ -180,6 +190,11 @@ export default function Dashboard(){
               {prediction ? prediction.predicted_month : (predictionError ? predictionError : 'ML-based estimate')}
             </div>
             {predictionError ? <div className="text-sm text-red-600">{predictionError}</div> : null}
+            {dashboard?.role === 'owner' ? (
+              <Button className="mt-2" onClick={trainModel} disabled={!!trainingStatus}>
+                {trainingStatus ? `Training (${trainingStatus})...` : (prediction ? 'Retrain model' : 'Train model')}
+              </Button>
+            ) : null}
           </Metric>
         </>
       ) : (
@@ -253,7 +268,7 @@ export default function Dashboard(){
           }} className="flex items-center gap-2">
             <input type="file" accept="application/pdf,image/*" onChange={e=>setInvoiceFile(e.target.files[0])} />
             <Button type="submit">Upload</Button>
-            {invoiceUrl && <a className="text-sm text-blue-600" href={invoiceUrl}>View invoice</a>}
+            {invoiceUrl && <span className="text-sm"><InvoiceLink url={invoiceUrl} /></span>}
           </form>
         </Card>
       )}
@@ -313,7 +328,7 @@ export default function Dashboard(){
       {/* Analytics charts */}
       <Card className="md:col-span-3">
         <div className="text-lg font-semibold mb-2">Insights</div>
-        <AnalyticsCharts businessId={activeBusiness?.id} role={dashboard?.role} api={api} />
+        <AnalyticsCharts businessId={activeBusiness?.id} role={bundle?.role} bundle={bundle} api={api} />
       </Card>
 
       {showAddMember && (
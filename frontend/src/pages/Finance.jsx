@@ -5,6 +5,7 @@ import Card from '../components/ui/Card'
 import Button from '../components/ui/Button'
 import api from '../api/axios'
 import TransactionModal from '../components/TransactionModal'
+import InvoiceLink from '../components/InvoiceLink'
 
 export default function Finance(){
   const { activeBusiness } = useContext(BusinessContext)
@@ -22,6 +23,8 @@ export default function Finance(){
   const [invoiceFile, setInvoiceFile] = useState(null)
   const [transactions, setTransactions] = useState([])
   const [loadingTx, setLoadingTx] = useState(false)
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [saving, setSaving] = useState(false)
   const [editingTx, setEditingTx] = useState(null)
   const [viewingTx, setViewingTx] = useState(null)
@@ -68,12 +71,26 @@ export default function Finance(){
       // use joined transactions endpoint to include inventory item_name
       const res = await api.get('/transactions/list', { params: { business_id: activeBusiness.id } })
       setTransactions(res.data || [])
+      setNextCursor(res.headers['x-next-cursor'] || null)
     }catch(err){
       console.error('fetch transactions', err)
       setTransactions([])
+      setNextCursor(null)
     }finally{ setLoadingTx(false) }
   }
 
+  const fetchMoreTransactions = async ()=>{
+    if(!activeBusiness || !nextCursor) return
+    setLoadingMore(true)
+    try{
+      const res = await api.get('/transactions/list', { params: { business_id: activeBusiness.id, cursor: nextCursor } })
+      setTransactions(prev => [...prev, ...(res.data || [])])
+      setNextCursor(res.headers['x-next-cursor'] || null)
+    }catch(err){
+      console.error('fetch more transactions', err)
+    }finally{ setLoadingMore(false) }
+  }
+
   const save = async (e)=>{
     e.preventDefault()
     if(!activeBusiness) return alert('Select a business')
@@ -323,7 +340,7 @@ export default function Finance(){
                               <td className="p-3">{tx.type}</td>
                               <td className="p-3">₹ {Number(tx.amount).toFixed(2)}</td>
                               <td className="p-3">{tx.category || '-'}</td>
-                              <td className="p-3">{tx.invoice_url ? <a className="text-fintech-accent" href={tx.invoice_url}>View</a> : '-'}</td>
+                              <td className="p-3"><InvoiceLink url={tx.invoice_url} thumbnail /></td>
                               <td className="p-3">{new Date(tx.created_at).toLocaleString()}</td>
                               <td className="p-3">
                                 <div className="flex gap-2 items-center">
@@ -356,6 +373,11 @@ export default function Finance(){
                       ))}
                     </tbody>
                   </table>
+                  {nextCursor && (
+                    <div className="mt-2 text-center">
+                      <Button size="sm" onClick={fetchMoreTransactions} disabled={loadingMore}>{loadingMore ? 'Loading...' : 'Load more'}</Button>
+                    </div>
+                  )}
                 </div>
               )}
             </div>
@@ -393,7 +415,7 @@ export default function Finance(){
               <div><strong>Type:</strong> {viewingTx.type}</div>
               <div><strong>Amount:</strong> ₹ {Number(viewingTx.amount).toFixed(2)}</div>
               <div><strong>Category:</strong> {viewingTx.category || '-'}</div>
-              <div><strong>Invoice:</strong> {viewingTx.invoice_url ? <a className="text-fintech-accent" href={viewingTx.invoice_url}>View</a> : '-'}</div>
+              <div><strong>Invoice:</strong> <InvoiceLink url={viewingTx.invoice_url} /></div>
               <div><strong>Date:</strong> {new Date(viewingTx.created_at).toLocaleString()}</div>
               <div className="flex justify-end mt-3"><Button variant="ghost" onClick={()=>setViewingTx(null)}>Close</Button></div>
             </div>
@@ -496,7 +518,7 @@ export default function Finance(){
               <div>
                 <label className="text-sm">Invoice (replace)</label>
                 <input type="file" onChange={e=>setEditInvoiceFile(e.target.files[0])} className="px-3 py-2 rounded border" />
-                {editingTx.invoice_url && <div className="text-sm mt-1">Current: <a className="text-blue-600" href={editingTx.invoice_url}>{editingTx.invoice_url}</a></div>}
+                {editingTx.invoice_url && <div className="text-sm mt-1">Current: <InvoiceLink url={editingTx.invoice_url} /></div>}
               </div>
               <div className="flex gap-2 justify-end">
                 <Button type="submit" disabled={updating}>{updating? 'Saving...':'Save'}</Button>